@@ -5,29 +5,45 @@ Airalogy Mock Server - 本地 HTTP 服务
 """
 
 # 从真实 airalogy SDK 导出类型和 assigner
-from airalogy.types import (
-    UserName,
-    CurrentTime,
-    CurrentRecordId,
-    CurrentProtocolId,
-    VersionStr,
-    RecordId,
-    ProtocolId,
-    FileIdPNG,
-    FileIdJPG,
-    FileIdTIFF,
-    FileIdPDF,
-    FileIdCSV,
-    FileIdMP4,
-    FileIdMP3,
-    FileIdMD,
-    FileIdJSON,
-    AiralogyMarkdown,
-    PyStr,
-    IgnoreStr,
-)
-from airalogy.assigner import assigner, AssignerResult, AssignerBase, DefaultAssigner
-from airalogy.models import CheckValue, StepValue
+# 存储相关模块 (client、versions、indexes 等) 不依赖 SDK，未安装 SDK 时仍可单独使用
+try:
+    from airalogy.types import (
+        UserName,
+        CurrentTime,
+        CurrentRecordId,
+        CurrentProtocolId,
+        VersionStr,
+        RecordId,
+        ProtocolId,
+        FileIdPNG,
+        FileIdJPG,
+        FileIdTIFF,
+        FileIdPDF,
+        FileIdCSV,
+        FileIdMP4,
+        FileIdMP3,
+        FileIdMD,
+        FileIdJSON,
+        AiralogyMarkdown,
+        PyStr,
+        IgnoreStr,
+    )
+    from airalogy.assigner import assigner, AssignerResult, AssignerBase, DefaultAssigner
+    from airalogy.models import CheckValue, StepValue
+except ModuleNotFoundError as e:
+    if (e.name or "").split(".")[0] != "airalogy":
+        raise
+    _SDK_EXPORTS = []
+else:
+    _SDK_EXPORTS = [
+        "UserName", "CurrentTime", "CurrentRecordId", "CurrentProtocolId",
+        "VersionStr", "RecordId", "ProtocolId",
+        "FileIdPNG", "FileIdJPG", "FileIdTIFF", "FileIdPDF", "FileIdCSV",
+        "FileIdMP4", "FileIdMP3", "FileIdMD", "FileIdJSON",
+        "AiralogyMarkdown", "PyStr", "IgnoreStr",
+        "assigner", "AssignerResult", "AssignerBase", "DefaultAssigner",
+        "CheckValue", "StepValue",
+    ]
 
 # 本地客户端 (文件/记录存储)
 from .client import Airalogy, RecordSession
@@ -36,11 +52,5 @@ __version__ = "0.2.0"
 __all__ = [
     "Airalogy",
     "RecordSession",
-    "UserName", "CurrentTime", "CurrentRecordId", "CurrentProtocolId",
-    "VersionStr", "RecordId", "ProtocolId",
-    "FileIdPNG", "FileIdJPG", "FileIdTIFF", "FileIdPDF", "FileIdCSV",
-    "FileIdMP4", "FileIdMP3", "FileIdMD", "FileIdJSON",
-    "AiralogyMarkdown", "PyStr", "IgnoreStr",
-    "assigner", "AssignerResult", "AssignerBase", "DefaultAssigner",
-    "CheckValue", "StepValue",
+    *_SDK_EXPORTS,
 ]
@@ -0,0 +1,129 @@
+"""
+Async Facade - 在有界线程池中执行阻塞的存储和 Assigner 调用
+
+Airalogy 客户端是同步的 (磁盘读写、扫描记录、base64 解码)，FastAPI 的
+async 路由直接调用会阻塞事件循环，一个慢请求拖住所有请求。AsyncAiralogy
+把每个方法调用放到工作线程执行，并用 CapacityLimiter 限制并发线程数：
+
+    aclient = AsyncAiralogy(client)
+    record = await aclient.get_record(record_id)
+    await aclient.run(session.set_var, "temp", 37.0)
+    async for chunk in aclient.iterate(client.iter_records_ndjson):
+        ...
+
+线程数默认读取 AIRALOGY_IO_THREADS 环境变量 (默认 16)。
+传入 observe(方法名, 秒) 时，客户端方法的执行时间 (不含排队) 会在工作线程中回报，
+用于存储操作耗时指标。
+每次调用在工作线程中开启一个 trace span (见 tracing)，挂在发起请求的 span 下。
+客户端内部已有存储锁和会话锁，可以安全地从多个线程调用。
+"""
+
+import os
+import time
+import functools
+from typing import Any, AsyncIterator, Callable, Iterable, Optional, TypeVar
+
+import anyio
+import anyio.to_thread
+
+from .tracing import span
+
+T = TypeVar("T")
+
+DEFAULT_IO_THREADS = 16
+
+
+class AsyncAiralogy:
+    """
+    Airalogy 客户端的异步外观
+
+    属性原样返回，方法调用返回在线程池中执行的协程。
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        max_threads: Optional[int] = None,
+        observe: Optional[Callable[[str, float], None]] = None,
+    ):
+        """
+        Args:
+            client: Airalogy 实例
+            max_threads: 同时执行阻塞调用的最大线程数
+            observe: 客户端方法执行完成后回调 (方法名, 耗时秒)
+        """
+        if max_threads is None:
+            max_threads = int(os.environ.get("AIRALOGY_IO_THREADS") or DEFAULT_IO_THREADS)
+        self.client = client
+        self.max_threads = max(1, max_threads)
+        self.observe = observe
+        self._limiter: Optional[anyio.CapacityLimiter] = None
+
+    @property
+    def limiter(self) -> anyio.CapacityLimiter:
+        # CapacityLimiter 需要在事件循环中创建
+        if self._limiter is None:
+            self._limiter = anyio.CapacityLimiter(self.max_threads)
+        return self._limiter
+
+    async def run(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """在线程池中执行任意阻塞函数 (会话操作、Assigner 计算等)"""
+        name = getattr(func, "__qualname__", None) or getattr(func, "__name__", None) or repr(func)
+        return await self.run_span(name, "worker", func, *args, **kwargs)
+
+    async def run_span(self, name: str, cat: str, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """同 run()，指定 trace span 的名称和类别"""
+        def call() -> T:
+            with span(name, cat):
+                return func(*args, **kwargs)
+
+        return await anyio.to_thread.run_sync(call, limiter=self.limiter)
+
+    async def iterate(self, func: Callable[..., Iterable[T]], *args: Any, **kwargs: Any) -> AsyncIterator[T]:
+        """
+        在线程池中逐项执行阻塞的迭代器 (例如流式导出)
+
+        每取一项占用一个线程名额，两项之间 (等待客户端读取时) 不占用线程。
+        """
+        name = getattr(func, "__qualname__", None) or getattr(func, "__name__", None) or repr(func)
+        done = object()
+        iterator = await self.run_span(name, "storage", lambda: iter(func(*args, **kwargs)))
+        try:
+            while True:
+                item = await self.run_span(name, "storage", next, iterator, done)
+                if item is done:
+                    return
+                yield item
+        finally:
+            # 客户端提前断开时关闭生成器 (释放打开的文件)
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self.client, name)
+        if not callable(attr):
+            return attr
+
+        def timed(*args: Any, **kwargs: Any) -> Any:
+            started = time.perf_counter()
+            try:
+                return attr(*args, **kwargs)
+            finally:
+                if self.observe is not None:
+                    self.observe(name, time.perf_counter() - started)
+
+        @functools.wraps(attr)
+        async def call(*args: Any, **kwargs: Any) -> Any:
+            return await self.run_span(f"Airalogy.{name}", "storage", timed, *args, **kwargs)
+
+        return call
+
+    def stats(self) -> dict:
+        """线程池占用情况"""
+        limiter = self.limiter
+        return {
+            "max_threads": self.max_threads,
+            "busy": limiter.borrowed_tokens,
+            "waiting": limiter.statistics().tasks_waiting,
+        }
@@ -0,0 +1,141 @@
+"""
+Assigner Modules - 加载用户的 assigner.py
+
+DefaultAssigner 的注册表是进程内的全局状态，多 worker 部署时每个 worker 都需要加载
+同样的模块：
+
+- 启动时加载 AIRALOGY_ASSIGNER_MODULES 中配置的模块 (多个路径用 os.pathsep 分隔)
+- 共享模式下，通过 /api/assigner/load 加载的模块记录到存储目录的 assigners.json；
+  其他 worker 在下一次 Assigner 请求前发现文件变化 (一次 stat) 并加载。同一路径再次
+  加载时重新执行，与单进程下修改 assigner.py 后重新加载的行为一致。
+"""
+
+import os
+import json
+import time
+import threading
+import importlib.util
+from pathlib import Path
+from typing import Optional
+
+from .fsutil import atomic_write_text
+from .locking import StoreLock
+
+REGISTRY_FILE = "assigners.json"
+
+
+def exec_assigner_module(path: Path) -> None:
+    """执行 assigner.py (模块中的装饰器会注册到 DefaultAssigner)"""
+    spec = importlib.util.spec_from_file_location("assigner_module", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+
+def configured_modules() -> list[str]:
+    """AIRALOGY_ASSIGNER_MODULES 中配置的模块路径"""
+    value = os.environ.get("AIRALOGY_ASSIGNER_MODULES") or ""
+    return [path for path in value.split(os.pathsep) if path.strip()]
+
+
+class AssignerModules:
+    """
+    本进程已加载的 Assigner 模块
+
+    Args:
+        storage_dir: 共享模式下的存储目录 (模块列表写入其中的 assigners.json，
+            与客户端共用存储锁)；None 时只在本进程加载
+    """
+
+    def __init__(self, storage_dir: Optional[Path] = None):
+        self.registry_path = Path(storage_dir) / REGISTRY_FILE if storage_dir else None
+        self._store_lock = StoreLock.for_path(Path(storage_dir) / ".lock") if storage_dir else None
+        # {绝对路径: 列表文件中的 loaded_at}，用于判断其他 worker 是否重新加载过
+        self._versions: dict[str, float] = {}
+        self._loaded: list[dict] = []
+        self._stamp: Optional[tuple] = None
+        self._lock = threading.Lock()
+
+    @property
+    def shared(self) -> bool:
+        return self.registry_path is not None
+
+    @property
+    def loaded(self) -> list[dict]:
+        """本进程加载过的模块 [{"path", "loaded_at"}]"""
+        return list(self._loaded)
+
+    def _exec(self, path: str, loaded_at: float) -> None:
+        exec_assigner_module(Path(path))
+        self._versions[path] = loaded_at
+        self._loaded.append({"path": path, "loaded_at": loaded_at})
+
+    def load(self, path: Path) -> str:
+        """加载模块，共享模式下同时写入列表文件，返回绝对路径"""
+        resolved = str(Path(path).resolve())
+        loaded_at = time.time()
+        with self._lock:
+            self._exec(resolved, loaded_at)
+            if self.shared:
+                with self._store_lock:
+                    entries = {entry["path"]: entry for entry in self._read_registry()}
+                    entries[resolved] = {"path": resolved, "loaded_at": loaded_at}
+                    atomic_write_text(
+                        self.registry_path,
+                        json.dumps(list(entries.values()), ensure_ascii=False, indent=2),
+                    )
+        return resolved
+
+    def reset(self) -> None:
+        """清空共享的模块列表 (服务启动时，避免加载上次运行留下的模块)"""
+        if self.shared:
+            with self._store_lock:
+                self.registry_path.unlink(missing_ok=True)
+
+    def load_configured(self, paths: list[str]) -> list[str]:
+        """启动时加载配置的模块，返回错误信息 (单个模块失败不影响其他模块)"""
+        errors = []
+        for path in paths:
+            try:
+                with self._lock:
+                    self._exec(str(Path(path).resolve()), time.time())
+            except Exception as e:
+                errors.append(f"{path}: {type(e).__name__}: {e}")
+        return errors
+
+    def _read_registry(self) -> list[dict]:
+        try:
+            entries = json.loads(self.registry_path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            return []
+        return [entry for entry in entries if isinstance(entry, dict) and "path" in entry]
+
+    def _stat_registry(self) -> Optional[tuple]:
+        try:
+            st = self.registry_path.stat()
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def sync(self) -> list[str]:
+        """加载其他 worker 新加载或重新加载的模块，返回错误信息"""
+        if not self.shared:
+            return []
+        stamp = self._stat_registry()
+        if stamp == self._stamp:
+            return []
+        errors = []
+        with self._lock:
+            if stamp == self._stamp:
+                return []
+            for entry in self._read_registry():
+                path, loaded_at = entry["path"], entry.get("loaded_at", 0)
+                if self._versions.get(path, -1) >= loaded_at:
+                    continue
+                try:
+                    self._exec(path, loaded_at)
+                except Exception as e:
+                    # 记为已处理，避免每次请求都重试失败的模块
+                    self._versions[path] = loaded_at
+                    errors.append(f"{path}: {type(e).__name__}: {e}")
+            self._stamp = stamp
+        return errors
@@ -0,0 +1,100 @@
+"""
+Assign Plan - 按依赖顺序执行 Assigner
+
+assign-all 以前按注册顺序执行，依赖其他 Assigner 输出的字段可能先于其依赖执行
+而失败。这里先按依赖关系做拓扑排序 (同层保持注册顺序，循环依赖的字段放在最后)，
+再逐个执行并产出每个字段的结果，供 SSE 流式接口和普通接口共用：
+
+    {"field": "od_mean", "status": "ok", "assigned_fields": {...}, "elapsed_ms": 12.3}
+    {"field": "ic50", "status": "error", "error": "...", "elapsed_ms": 3.1}
+    {"field": "report", "status": "skipped", "error": "Dependency failed: ic50", "elapsed_ms": 0.0}
+
+同一个 Assigner 函数一次输出多个字段时，后面的字段已在本次执行中得到，不再重复执行。
+"""
+
+import time
+from typing import Any, Callable, Iterator, Optional
+
+from .tracing import span
+
+
+def assignment_order(fields: dict[str, dict], dependencies: Callable[[str], list[str]]) -> list[str]:
+    """
+    按依赖关系排序 Assigner 字段
+
+    Args:
+        fields: 已注册的字段 (DefaultAssigner.all_assigned_fields())，保持注册顺序
+        dependencies: 返回字段依赖的字段列表
+    """
+    pending = {field: [d for d in dependencies(field) or [] if d in fields and d != field] for field in fields}
+    order: list[str] = []
+    done: set[str] = set()
+    while pending:
+        ready = [field for field, deps in pending.items() if all(d in done for d in deps)]
+        if not ready:
+            # 循环依赖：按注册顺序追加，执行时由 Assigner 自行报告缺失的依赖
+            order.extend(pending)
+            break
+        for field in ready:
+            order.append(field)
+            done.add(field)
+            del pending[field]
+    return order
+
+
+def iter_assign(
+    assigner: Any,
+    data: dict[str, Any],
+    mode: Optional[str] = None,
+    serialize: Callable[[dict], dict] = dict,
+) -> Iterator[dict]:
+    """
+    依次执行 Assigner，每完成一个字段产出一条结果
+
+    data 会被原地更新为包含所有已计算字段的数据 (后续字段依赖前面的输出)。
+
+    Args:
+        assigner: DefaultAssigner
+        data: 输入数据
+        mode: 只执行该 mode 的 Assigner (None 表示全部)
+        serialize: 把 Assigner 输出转换为 JSON 兼容的值
+    """
+    all_fields = assigner.all_assigned_fields()
+    dependencies = assigner.get_dependent_fields_of_assigned_key
+    produced: set[str] = set()
+    failed: set[str] = set()
+
+    for field in assignment_order(all_fields, dependencies):
+        if mode and all_fields[field].get("mode") != mode:
+            continue
+        if field in produced:
+            continue
+        blocked = [d for d in dependencies(field) or [] if d in failed and d not in data]
+        if blocked:
+            failed.add(field)
+            yield {
+                "field": field,
+                "status": "skipped",
+                "error": f"Dependency failed: {', '.join(blocked)}",
+                "elapsed_ms": 0.0,
+            }
+            continue
+
+        started = time.perf_counter()
+        with span(f"assign {field}", "assigner") as assign_span:
+            try:
+                result = assigner.assign(field, data)
+                error = None if result.success else (result.error_message or "Assigner failed")
+            except Exception as e:
+                result, error = None, f"{type(e).__name__}: {e}"
+            assign_span.set(status="ok" if error is None else "error")
+        elapsed_ms = round((time.perf_counter() - started) * 1000, 3)
+
+        if error is not None:
+            failed.add(field)
+            yield {"field": field, "status": "error", "error": error, "elapsed_ms": elapsed_ms}
+            continue
+        assigned = serialize(result.assigned_fields or {})
+        data.update(assigned)
+        produced.update(assigned)
+        yield {"field": field, "status": "ok", "assigned_fields": assigned, "elapsed_ms": elapsed_ms}
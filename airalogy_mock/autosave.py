@@ -0,0 +1,107 @@
+"""
+Autosave Scheduler - 后台防抖自动保存
+
+跟踪有未保存修改的 RecordSession，在后台线程中按固定间隔合并写入：
+一个间隔内的多次编辑只触发一次保存，避免每次按键都重写整条 Record。
+"""
+
+import sys
+import time
+import threading
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from .client import RecordSession
+
+
+class AutosaveScheduler:
+    """
+    脏 Session 调度器
+
+    第一次 mark_dirty() 时设定截止时间 (now + interval)，之后窗口内的修改
+    不会推迟截止时间；到期后后台线程一次性保存所有脏 Session。
+    """
+
+    def __init__(self, interval: float):
+        """
+        Args:
+            interval: 合并写入的间隔 (秒)
+        """
+        self.interval = interval
+        self._dirty: dict[int, "RecordSession"] = {}
+        self._cond = threading.Condition()
+        self._deadline: Optional[float] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+
+        # 统计信息
+        self.writes = 0
+        self.last_error: Optional[str] = None
+
+    def mark_dirty(self, session: "RecordSession") -> None:
+        """标记 Session 有未保存修改"""
+        with self._cond:
+            if self._stopped:
+                return
+            self._dirty[id(session)] = session
+            if self._deadline is None:
+                self._deadline = time.monotonic() + self.interval
+                self._cond.notify()
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="airalogy-autosave", daemon=True
+                )
+                self._thread.start()
+
+    def discard(self, session: "RecordSession") -> None:
+        """取消 Session 的待保存状态 (已手动保存或已结束)"""
+        with self._cond:
+            self._dirty.pop(id(session), None)
+
+    def pending(self) -> int:
+        """待保存的 Session 数量"""
+        with self._cond:
+            return len(self._dirty)
+
+    def flush(self) -> int:
+        """立即保存所有脏 Session，返回保存数量"""
+        with self._cond:
+            sessions = list(self._dirty.values())
+            self._dirty.clear()
+            self._deadline = None
+        return self._save_all(sessions)
+
+    def stop(self) -> None:
+        """保存剩余修改并停止后台线程"""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        self.flush()
+
+    def _save_all(self, sessions: list["RecordSession"]) -> int:
+        saved = 0
+        for session in sessions:
+            try:
+                session.save()
+                saved += 1
+            except Exception as e:
+                self.last_error = f"{session.airalogy_record_id}: {e}"
+                print(f"[autosave] Failed to save {self.last_error}", file=sys.stderr, flush=True)
+        self.writes += saved
+        return saved
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._stopped and self._deadline is None:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                remaining = self._deadline - time.monotonic()
+                if remaining > 0:
+                    self._cond.wait(remaining)
+                    continue
+                sessions = list(self._dirty.values())
+                self._dirty.clear()
+                self._deadline = None
+            self._save_all(sessions)
@@ -0,0 +1,217 @@
+"""
+Blob Store - 大表格变量的外部存储
+
+超过阈值的 list/dict 变量按内容寻址写入 blobs/<sha256 前两位>/<sha256>.json，
+记录中只保存带类型的引用：
+
+    {"$blob": "<sha256>", "type": "table", "rows": 500, "columns": ["well", "od"], "bytes": 12345}
+
+- type=table：每行都是 dict 且键顺序相同的表格按列存储
+  {"type": "table", "columns": [...], "data": {列名: [值...]}}，还原时逐行重建
+- type=json：其他 list/dict 原样存储 {"type": "json", "value": ...}
+
+内容相同的表格只存一份，未修改的表格在各版本之间共享，历史补丁中也只有引用。
+Merkle 叶子哈希基于引用计算 (引用中包含内容哈希)。
+"""
+
+import os
+import re
+import json
+import time
+import shutil
+import hashlib
+from pathlib import Path
+from typing import Any, Callable, Iterable, Optional
+
+from .cache import RecordCache, copy_json
+from .fsutil import atomic_write_text
+
+# 序列化后不小于该字节数的 list/dict 变量外部存储
+DEFAULT_OFFLOAD_BYTES = 256 * 1024
+
+BLOB_REF_RE = re.compile(r'"\$blob":\s*"([0-9a-f]{64})"')
+BLOB_DIGEST_RE = re.compile(r"[0-9a-f]{64}")
+
+
+def is_blob_ref(value: Any) -> bool:
+    """是否为 blob 引用"""
+    return isinstance(value, dict) and isinstance(value.get("$blob"), str)
+
+
+def find_blob_ids(text: str) -> set[str]:
+    """从任意文本 (记录 JSON、补丁) 中提取被引用的 blob 哈希"""
+    return set(BLOB_REF_RE.findall(text))
+
+
+def _dumps(obj: Any) -> str:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+def encode(value: Any) -> dict:
+    """编码为 blob 内容：同构的行表格按列存储，其余原样保存"""
+    if isinstance(value, list) and value and all(isinstance(row, dict) for row in value):
+        columns = list(value[0])
+        if columns and all(list(row) == columns for row in value):
+            return {
+                "type": "table",
+                "columns": columns,
+                "data": {column: [row[column] for row in value] for column in columns},
+            }
+    return {"type": "json", "value": value}
+
+
+def decode(payload: dict) -> Any:
+    """还原 blob 内容 (payload 来自共享缓存，返回副本，调用方修改不影响缓存)"""
+    if payload["type"] == "table":
+        columns = payload["columns"]
+        data = [payload["data"][column] for column in columns]
+        return [dict(zip(columns, map(copy_json, values))) for values in zip(*data)]
+    return copy_json(payload["value"])
+
+
+class BlobValue:
+    """会话中尚未读取的 blob 变量"""
+
+    __slots__ = ("ref", "_store")
+
+    def __init__(self, ref: dict, store: "BlobStore"):
+        self.ref = ref
+        self._store = store
+
+    @property
+    def size(self) -> int:
+        """blob 文件大小"""
+        return self.ref.get("bytes", 0)
+
+    def resolve(self) -> Any:
+        return self._store.get(self.ref)
+
+
+class BlobStore:
+    """
+    内容寻址的 blob 存储
+
+    读取经过 RecordCache (按 mtime/size 校验)，同一个表格多次读取只解析一次。
+    """
+
+    def __init__(self, blobs_dir: Path, cache: RecordCache):
+        self.blobs_dir = Path(blobs_dir)
+        self._cache = cache
+
+    def path(self, digest: str) -> Path:
+        return self.blobs_dir / digest[:2] / f"{digest}.json"
+
+    def offload(self, value: Any, threshold: Optional[int]) -> Optional[dict]:
+        """
+        value 是不小于 threshold 字节的 list/dict 时写入 blob，返回引用；否则返回 None
+
+        threshold 为 None 或 0 时不外部存储。
+        """
+        if not threshold or not isinstance(value, (list, dict)) or is_blob_ref(value):
+            return None
+        if len(_dumps(value).encode("utf-8")) < threshold:
+            return None
+        return self.put(value)
+
+    def put(self, value: Any) -> dict:
+        """写入 blob (内容已存在时跳过)，返回引用"""
+        payload = encode(value)
+        text = _dumps(payload)
+        data = text.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path(digest)
+        try:
+            # 已存在：刷新 mtime，避免被正在进行的 GC 当作过期的孤立 blob
+            os.utime(path)
+        except FileNotFoundError:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            atomic_write_text(path, text)
+        ref = {"$blob": digest, "type": payload["type"]}
+        if payload["type"] == "table":
+            ref["rows"] = len(value)
+            ref["columns"] = payload["columns"]
+        ref["bytes"] = len(data)
+        return ref
+
+    def get(self, ref: dict) -> Any:
+        """按引用读取完整数据"""
+        digest = ref["$blob"]
+        try:
+            payload = self._cache.load(f"blob:{digest}", self.path(digest))
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Blob not found: {digest}")
+        return decode(payload)
+
+    def inline(self, variables: dict) -> dict:
+        """把变量中的引用替换为完整数据 (没有引用时原样返回)"""
+        if not any(is_blob_ref(value) for value in variables.values()):
+            return variables
+        return {
+            var_id: self.get(value) if is_blob_ref(value) else value
+            for var_id, value in variables.items()
+        }
+
+    def references(self, digests: Iterable[str], extract: Callable[[str], set[str]]) -> set[str]:
+        """
+        blob 内容中的引用 (例如表格单元格中的文件 ID)，GC 标记用
+
+        digests 中不是 blob 哈希的项 (文件 ID 等) 和不存在的 blob 跳过。
+        """
+        found: set[str] = set()
+        for digest in digests:
+            if not BLOB_DIGEST_RE.fullmatch(digest):
+                continue
+            try:
+                found |= extract(self.path(digest).read_text(encoding="utf-8", errors="replace"))
+            except FileNotFoundError:
+                continue
+        return found
+
+    def sweep(
+        self,
+        referenced: set[str],
+        grace_period: float,
+        dry_run: bool = True,
+        quarantine_dir: Optional[Path] = None,
+    ) -> dict:
+        """
+        删除或隔离未被引用的 blob (需持有存储锁)
+
+        Returns:
+            {"orphans", "reclaimable_bytes", "removed", "skipped_recent"}
+        """
+        cutoff = time.time() - grace_period
+        orphans, reclaimable, removed, skipped_recent = 0, 0, 0, 0
+        if not self.blobs_dir.exists():
+            return {"orphans": 0, "reclaimable_bytes": 0, "removed": 0, "skipped_recent": 0}
+
+        for path in sorted(self.blobs_dir.glob("*/*.json")):
+            digest = path.stem
+            if digest in referenced:
+                continue
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            if st.st_mtime > cutoff:
+                skipped_recent += 1
+                continue
+            orphans += 1
+            reclaimable += st.st_size
+            if dry_run:
+                continue
+            if quarantine_dir is not None:
+                target = quarantine_dir / "blobs"
+                target.mkdir(parents=True, exist_ok=True)
+                shutil.move(str(path), str(target / path.name))
+            else:
+                path.unlink()
+            self._cache.discard(f"blob:{digest}")
+            removed += 1
+
+        return {
+            "orphans": orphans,
+            "reclaimable_bytes": reclaimable,
+            "removed": removed,
+            "skipped_recent": skipped_recent,
+        }
@@ -0,0 +1,136 @@
+"""
+Record Cache - 已解析记录的内存 LRU 缓存
+
+按记录 ID 缓存解析后的 Record，总大小 (按 JSON 文件字节数估算) 不超过上限。
+每次读取先 stat 文件，mtime/size 与缓存时一致才命中，因此其他进程或
+手动修改文件后不会读到旧数据。
+
+缓存中的对象是共享的：调用方不得原地修改，需要修改时先复制 (copy_json)。
+"""
+
+import json
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Optional
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def copy_json(value: Any) -> Any:
+    """逐层复制 JSON 结构 (dict/list 复制，标量共享)，比 copy.deepcopy 快"""
+    if isinstance(value, dict):
+        return {key: copy_json(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [copy_json(item) for item in value]
+    return value
+
+
+def _validator(path: Path) -> Optional[tuple[int, int, int]]:
+    """(mtime, size, inode)：原子替换会换 inode，即使 mtime 精度不足也能发现"""
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+class RecordCache:
+    """
+    按字节数限制的 LRU 缓存
+
+    Attributes:
+        hits: 命中次数
+        misses: 未命中次数 (包括文件已修改)
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Args:
+            max_bytes: 缓存总大小上限 (字节)，0 表示关闭缓存
+        """
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, tuple[tuple[int, int, int], Any]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def load(self, key: str, path: Path) -> Any:
+        """读取并解析 JSON 文件，mtime/size 未变化时直接返回缓存"""
+        validator = _validator(path)
+        if validator is None:
+            self.discard(key)
+            raise FileNotFoundError(str(path))
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == validator:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        # 先 stat 再读取：读取期间文件被替换时，下次校验会失败并重新读取
+        value = json.loads(path.read_text(encoding="utf-8"))
+        self._store(key, validator, value)
+        return value
+
+    def peek(self, key: str, path: Path) -> Any:
+        """只查缓存：命中且文件未变化时返回缓存值，否则返回 None (不读取文件)"""
+        validator = _validator(path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or validator is None or entry[0] != validator:
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: str, path: Path, value: Any) -> None:
+        """写入文件后更新缓存 (value 必须与文件内容一致)"""
+        validator = _validator(path)
+        if validator is None:
+            self.discard(key)
+            return
+        self._store(key, validator, value)
+
+    def _store(self, key: str, validator: tuple[int, int, int], value: Any) -> None:
+        size = validator[1]
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[0][1]
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (validator, value)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted[1]
+
+    def discard(self, key: str) -> None:
+        """移除缓存项"""
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[0][1]
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        """命中率统计"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
@@ -10,9 +10,31 @@ import json
 import uuid
 import base64
 import hashlib
+import time
+import atexit
+import weakref
+import threading
+from contextlib import contextmanager, nullcontext
 from pathlib import Path
 from datetime import datetime
-from typing import Optional, Any
+from collections import OrderedDict
+from typing import Optional, Any, BinaryIO, Iterable, Iterator
+
+from .journal import RecordJournal
+from .autosave import AutosaveScheduler
+from .fsutil import atomic_write_bytes, atomic_write_text
+from .locking import StoreLock, GenerationCounter
+from .merkle import MerkleHasher
+from .versions import VersionStore
+from .indexes import RecordIndex, FileIndex, SummaryStore, summarize_record, summarize_file
+from .search import SearchIndex
+from .cache import RecordCache, DEFAULT_MAX_BYTES, copy_json
+from .ndjson import dumps_line, gzip_chunks, iter_lines
+from . import filegc
+from .packs import PackStore
+from .lazyload import LazyValue, dumps_record, has_lazy, parse_record, resolve_lazy
+from .blobs import BlobStore, BlobValue, DEFAULT_OFFLOAD_BYTES, is_blob_ref, find_blob_ids
+from .events import SessionEvents
 
 
 def _generate_user_id(name: str = "mock-user") -> str:
@@ -30,10 +52,59 @@ def _generate_file_id(ext: str) -> str:
     return f"airalogy.id.file.{uuid.uuid4()}.{ext}"
 
 
-def _calculate_sha1(data: dict) -> str:
-    """计算数据的 SHA1 哈希"""
-    json_str = json.dumps(data, sort_keys=True, ensure_ascii=False)
-    return hashlib.sha1(json_str.encode()).hexdigest()
+def _parse_record_id(record_id: str) -> tuple[str, Optional[int]]:
+    """解析 airalogy.id.record.<uuid>.v.<version>，返回 (uuid, version)"""
+    parts = record_id.split(".")
+    if len(parts) == 6 and parts[:3] == ["airalogy", "id", "record"] and parts[4] == "v":
+        try:
+            return parts[3], int(parts[5])
+        except ValueError:
+            pass
+    return record_id, None
+
+
+def _find_references(text: str) -> set[str]:
+    """GC 标记：文本中引用的文件 ID 和 blob 哈希"""
+    return filegc.find_file_ids(text) | find_blob_ids(text)
+
+
+def _op_to_entry(op: dict) -> dict:
+    """校验批量修改中的一条操作，转换为 journal 条目"""
+    if not isinstance(op, dict):
+        raise ValueError(f"Invalid op: {op!r}")
+    kind = op.get("op")
+    if kind == "var":
+        if not isinstance(op.get("id"), str):
+            raise ValueError("var op requires a string 'id'")
+        return {"op": "var", "id": op["id"], "value": op.get("value")}
+    if kind == "vars":
+        if not isinstance(op.get("value"), dict):
+            raise ValueError("vars op requires an object 'value'")
+        return {"op": "vars", "value": dict(op["value"])}
+    if kind in ("step", "check"):
+        if not isinstance(op.get("id"), str):
+            raise ValueError(f"{kind} op requires a string 'id'")
+        checked = op.get("checked")
+        if kind == "check" and not isinstance(checked, bool):
+            raise ValueError("check op requires a boolean 'checked'")
+        return {
+            "op": kind,
+            "id": op["id"],
+            "value": {"checked": checked, "annotation": op.get("annotation", "")},
+        }
+    raise ValueError(f"Unknown op: {kind!r}")
+
+
+def _copy_for_update(record: dict) -> dict:
+    """复制缓存中的记录以便修改 (复制顶层、metadata、data 及各 section)"""
+    record = dict(record)
+    if "metadata" in record:
+        record["metadata"] = dict(record["metadata"])
+    record["data"] = {
+        section: dict(entries) if isinstance(entries, dict) else entries
+        for section, entries in record.get("data", {}).items()
+    }
+    return record
 
 
 class RecordSession:
@@ -44,6 +115,12 @@ class RecordSession:
     - 跟踪所有 var/step/check 的值
     - 自动生成完整的 Record JSON
     - 支持保存和加载
+    
+    每次修改都会追加到 journal (见 RecordJournal)，save() 时压缩进快照。
+    
+    client.shared_sessions 为 True 时 (多 worker 部署)，同一个 Session 可能同时存在于
+    多个进程中。修改在存储锁内先 sync() 合并其他进程的修改再追加；其他进程保存过
+    (head 文件变化) 或清空过 journal 时从磁盘重新加载。
     """
     
     def __init__(
@@ -70,6 +147,14 @@ class RecordSession:
         self._step_data: dict[str, dict] = {}
         self._check_data: dict[str, dict] = {}
         
+        # 分段哈希缓存，只重新计算修改过的条目
+        self._hasher = MerkleHasher()
+        
+        # 已外部存储的变量 {var_id: blob 引用}，变量被重新设置时失效
+        self._blob_refs: dict[str, dict] = {}
+        # 已确认不需要外部存储的变量，保存时不再重新序列化检查
+        self._inline_vars: set[str] = set()
+        
         # 元数据
         self._created_at = datetime.now().isoformat()
         self._created_by = client.get_current_user()
@@ -77,6 +162,29 @@ class RecordSession:
         self._record_num = 1
         
         self._is_active = True
+        self.last_access = time.monotonic()
+        
+        # 后台自动保存与请求线程并发访问
+        self._lock = threading.RLock()
+        # end_record_session(save=False) 后为 True，之后的保存不再写入
+        self._discarded = False
+        
+        # 追加式变更日志
+        self._journal = RecordJournal(
+            client.journal_dir / f"{self.airalogy_record_id}.jsonl",
+            fsync=client.journal_fsync,
+        )
+        
+        # 变更事件 (推送给 WebSocket 订阅者，支持按 seq 续传)
+        self.events = SessionEvents()
+        
+        # 最近一次加载/保存时 head 文件的状态，变化说明其他进程保存过
+        self._head_stamp: Optional[tuple] = None
+    
+    @property
+    def session_id(self) -> str:
+        """会话 ID (记录 UUID，跨版本不变)"""
+        return self._record_uuid
     
     @property
     def airalogy_record_id(self) -> str:
@@ -94,22 +202,46 @@ class RecordSession:
     
     def set_var(self, var_id: str, value: Any) -> None:
         """设置变量值"""
-        self._var_data[var_id] = value
-        self._updated_at = datetime.now().isoformat()
+        self._mutate({"op": "var", "id": var_id, "value": value})
     
     def get_var(self, var_id: str, default: Any = None) -> Any:
-        """获取变量值"""
-        return self._var_data.get(var_id, default)
+        """获取变量值 (懒加载的大变量和 blob 在第一次访问时读取)"""
+        value = self._var_data.get(var_id, default)
+        if isinstance(value, _DEFERRED):
+            value = self._materialize(var_id)
+        return value
     
     def set_vars(self, data: dict[str, Any]) -> None:
         """批量设置变量"""
-        self._var_data.update(data)
-        self._updated_at = datetime.now().isoformat()
+        self._mutate({"op": "vars", "value": dict(data)})
     
     def get_all_vars(self) -> dict[str, Any]:
         """获取所有变量"""
+        self._materialize_all()
         return dict(self._var_data)
     
+    def lazy_vars(self) -> dict[str, int]:
+        """尚未读取的大变量 {var_id: 字节数}"""
+        with self._lock:
+            return {
+                var_id: value.size
+                for var_id, value in self._var_data.items()
+                if isinstance(value, _DEFERRED)
+            }
+    
+    def _materialize(self, var_id: str) -> Any:
+        with self._lock:
+            value = self._var_data.get(var_id)
+            if isinstance(value, _DEFERRED):
+                value = self._var_data[var_id] = value.resolve()
+            return value
+    
+    def _materialize_all(self) -> None:
+        with self._lock:
+            for var_id, value in self._var_data.items():
+                if isinstance(value, _DEFERRED):
+                    self._var_data[var_id] = value.resolve()
+    
     # ========================================================
     # 步骤操作
     # ========================================================
@@ -121,11 +253,11 @@ class RecordSession:
         annotation: str = "",
     ) -> None:
         """设置步骤状态"""
-        self._step_data[step_id] = {
-            "checked": checked,
-            "annotation": annotation,
-        }
-        self._updated_at = datetime.now().isoformat()
+        self._mutate({
+            "op": "step",
+            "id": step_id,
+            "value": {"checked": checked, "annotation": annotation},
+        })
     
     def get_step(self, step_id: str) -> Optional[dict]:
         """获取步骤状态"""
@@ -150,11 +282,11 @@ class RecordSession:
         annotation: str = "",
     ) -> None:
         """设置检查点状态"""
-        self._check_data[check_id] = {
-            "checked": checked,
-            "annotation": annotation,
-        }
-        self._updated_at = datetime.now().isoformat()
+        self._mutate({
+            "op": "check",
+            "id": check_id,
+            "value": {"checked": checked, "annotation": annotation},
+        })
     
     def get_check(self, check_id: str) -> Optional[dict]:
         """获取检查点状态"""
@@ -172,17 +304,194 @@ class RecordSession:
         """获取所有检查点"""
         return dict(self._check_data)
     
+    # ========================================================
+    # 变更日志
+    # ========================================================
+    
+    def _apply(self, entry: dict) -> None:
+        """将一条 delta 应用到内存数据"""
+        op = entry["op"]
+        if op == "var":
+            self._var_data[entry["id"]] = entry["value"]
+            self._blob_refs.pop(entry["id"], None)
+            self._inline_vars.discard(entry["id"])
+            self._hasher.invalidate("var", [entry["id"]])
+        elif op == "vars":
+            self._var_data.update(entry["value"])
+            for var_id in entry["value"]:
+                self._blob_refs.pop(var_id, None)
+            self._inline_vars.difference_update(entry["value"])
+            self._hasher.invalidate("var", entry["value"].keys())
+        elif op == "step":
+            self._step_data[entry["id"]] = entry["value"]
+            self._hasher.invalidate("step", [entry["id"]])
+        elif op == "check":
+            self._check_data[entry["id"]] = entry["value"]
+            self._hasher.invalidate("check", [entry["id"]])
+        if entry.get("ts"):
+            self._updated_at = entry["ts"]
+    
+    def _mutate(self, entry: dict) -> None:
+        """应用修改并追加到 journal，日志过长时自动压缩，否则交给自动保存"""
+        with self._lock, self.client._session_lock():
+            self.sync()
+            self.last_access = time.monotonic()
+            entry["ts"] = datetime.now().isoformat()
+            self._apply(entry)
+            count = self._journal.append(entry)
+            self.events.publish(**entry)
+            if count >= self.client.journal_compact_threshold:
+                self.save()
+                return
+        self.client._mark_session_dirty(self)
+    
+    def _replay_journal(self, publish: bool = False) -> int:
+        """重放 journal 中尚未应用的修改 (加载时为全部未压缩的修改)，返回重放条数"""
+        replayed = 0
+        for entry in self._journal.read_new() or []:
+            try:
+                self._apply(entry)
+            except (KeyError, TypeError, AttributeError):
+                continue
+            replayed += 1
+            if publish:
+                self.events.publish(**entry)
+        return replayed
+    
+    # ========================================================
+    # 多进程同步
+    # ========================================================
+    
+    def _stat_head(self) -> Optional[tuple]:
+        try:
+            st = (self.client.records_dir / f"{self.airalogy_record_id}.json").stat()
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+    
+    def sync(self) -> bool:
+        """
+        合并其他进程对该 Session 的修改 (仅 client.shared_sessions 时)，返回是否有变化
+        
+        head 文件未变时只读取 journal 新追加的行 (一次 stat + 一次 seek)，
+        否则从磁盘重新加载并发布 reloaded 事件。记录已被删除时抛出 FileNotFoundError。
+        """
+        if not self.client.shared_sessions:
+            return False
+        with self._lock:
+            if self._stat_head() == self._head_stamp:
+                entries = self._journal.read_new()
+                if entries is not None:
+                    for entry in entries:
+                        try:
+                            self._apply(entry)
+                        except (KeyError, TypeError, AttributeError):
+                            continue
+                        self.events.publish(**entry)
+                    return bool(entries)
+            self._reload()
+            return True
+    
+    def _reload(self) -> None:
+        """从磁盘重新加载最新版本 (保留事件流、锁等进程内状态)"""
+        head = self.client._head_version(self._record_uuid)
+        if head is None:
+            raise FileNotFoundError(f"Session not found: {self._record_uuid}")
+        fresh = RecordSession.load(self.client, f"airalogy.id.record.{self._record_uuid}.v.{head}", lazy=True)
+        for name, value in vars(fresh).items():
+            if name not in _SESSION_LOCAL_ATTRS:
+                setattr(self, name, value)
+        self.events.publish("reloaded", record_id=self.airalogy_record_id)
+    
+    def discard_journal(self) -> None:
+        """丢弃未保存的修改日志"""
+        self._journal.truncate()
+    
+    def apply_ops(self, ops: list[dict]) -> int:
+        """
+        批量应用修改，返回最后一个事件的 seq
+        
+        每条操作的格式：
+            {"op": "var", "id": "temp", "value": 37.0}
+            {"op": "vars", "value": {"temp": 37.0, "ph": 7.4}}
+            {"op": "step", "id": "step_1", "checked": true, "annotation": ""}
+            {"op": "check", "id": "check_1", "checked": false, "annotation": "..."}
+        
+        先校验全部操作，有任何一条无效时抛出 ValueError，不应用任何修改。
+        """
+        entries = [_op_to_entry(op) for op in ops]
+        with self._lock:
+            for entry in entries:
+                self._mutate(entry)
+            return self.events.seq
+    
+    def snapshot(self) -> dict:
+        """完整快照及其对应的事件位置 {seq, epoch, record}"""
+        with self._lock:
+            return {
+                "seq": self.events.seq,
+                "epoch": self.events.epoch,
+                "record": self.to_record(inline=True),
+            }
+    
     # ========================================================
     # Record 生成
     # ========================================================
     
-    def to_record(self) -> dict:
-        """生成完整的 Airalogy Record JSON"""
-        data_block = {
-            "var": self._var_data,
-            "step": self._step_data,
-            "check": self._check_data,
-        }
+    def _stored_vars(self, keep_lazy: bool = False) -> dict[str, Any]:
+        """
+        写入记录的变量：超过阈值的表格写入 blob 存储，只保留引用
+        
+        只检查上次保存后修改过的变量。keep_lazy 为 True 时，未读取的懒加载变量
+        保留为 LazyValue (由 dumps_record 原样写回)，不解析。
+        """
+        variables = {}
+        for var_id, value in list(self._var_data.items()):
+            ref = self._blob_refs.get(var_id)
+            if ref is not None:
+                variables[var_id] = ref
+                continue
+            if (
+                keep_lazy
+                and isinstance(value, LazyValue)
+                and self._hasher.has_leaf("var", var_id)
+            ):
+                variables[var_id] = value
+                continue
+            value = self.get_var(var_id)
+            if var_id not in self._inline_vars:
+                ref = self.client._blobs.offload(value, self.client.blob_threshold)
+                if ref is not None:
+                    self._blob_refs[var_id] = ref
+                    # 叶子哈希改为基于引用
+                    self._hasher.invalidate("var", [var_id])
+                    variables[var_id] = ref
+                    continue
+                self._inline_vars.add(var_id)
+            variables[var_id] = value
+        return variables
+    
+    def to_record(self, inline: bool = False) -> dict:
+        """
+        生成完整的 Airalogy Record JSON
+        
+        Args:
+            inline: 把外部存储的表格替换为完整数据 (哈希仍基于 blob 引用)；
+                默认记录中只包含引用
+        """
+        return self._build_record(inline=inline)
+    
+    def _build_record(self, inline: bool = False, keep_lazy: bool = False) -> dict:
+        with self._lock:
+            # 浅复制：保存后的记录会进入读取缓存，不能与会话继续修改的字典共享
+            data_block = {
+                "var": self._stored_vars(keep_lazy=keep_lazy and not inline),
+                "step": dict(self._step_data),
+                "check": dict(self._check_data),
+            }
+            merkle = self._hasher.compute(data_block)
+            if inline:
+                data_block = dict(data_block, var=self.get_all_vars())
         
         record = {
             "airalogy_record_id": self.airalogy_record_id,
@@ -199,41 +508,95 @@ class RecordSession:
                 "record_current_version_submission_user_id": self.client.get_current_user(),
                 "record_initial_version_submission_time": self._created_at,
                 "record_initial_version_submission_user_id": self._created_by,
-                "sha1": _calculate_sha1(data_block),
+                "sha1": merkle["root"],
+                "merkle": {
+                    "sections": merkle["sections"],
+                    "leaves": merkle["leaves"],
+                },
             },
             "data": data_block,
         }
         
         return record
     
+    def preview(self) -> dict:
+        """
+        会话概要：只包含已解析的变量，不解析懒加载的大变量
+        
+        Returns:
+            {"data": {"var", "step", "check"}, "lazy_vars": {var_id: 字节数}}
+        """
+        with self._lock:
+            variables = {
+                var_id: value
+                for var_id, value in self._var_data.items()
+                if not isinstance(value, _DEFERRED)
+            }
+            return {
+                "data": {
+                    "var": variables,
+                    "step": dict(self._step_data),
+                    "check": dict(self._check_data),
+                },
+                "lazy_vars": self.lazy_vars(),
+            }
+    
     def to_json(self, indent: int = 2) -> str:
         """生成 JSON 字符串"""
-        return json.dumps(self.to_record(), ensure_ascii=False, indent=indent)
+        with self._lock:
+            return json.dumps(self.to_record(inline=True), ensure_ascii=False, indent=indent)
     
     # ========================================================
     # 保存和加载
     # ========================================================
     
     def save(self) -> str:
-        """保存 Record 到本地存储，返回 record_id"""
-        record = self.to_record()
-        record_path = self.client.records_dir / f"{self.airalogy_record_id}.json"
-        record_path.write_text(self.to_json(), encoding="utf-8")
+        """保存 Record 到本地存储 (快照，原子写入)，并清空 journal，返回 record_id"""
+        with self._lock, self.client._write_locked():
+            if self._discarded:
+                # 已结束且放弃修改 (例如自动保存在 end_record_session(save=False) 之后到达)
+                return self.airalogy_record_id
+            # 其他进程的修改也要进入快照 (随后会清空共享的 journal)
+            self.sync()
+            head = self.client._head_version(self._record_uuid)
+            if head is not None and head > self._record_version:
+                # 基于历史版本继续编辑：保存为新的最新版本
+                self._record_version = head
+                self.increment_version()
+            # 未读取的懒加载变量原样写回，不解析
+            self.client._commit_record(self._build_record(keep_lazy=True))
+            self._journal.truncate()
+            self._head_stamp = self._stat_head()
+            self.events.publish("saved", record_id=self.airalogy_record_id)
+        self.client._discard_session_dirty(self)
+        if self.client._active_session is self:
+            # 版本号可能已变化，保持活跃会话标记指向最新版本
+            self.client._save_active_session_id(self.airalogy_record_id)
         return self.airalogy_record_id
     
     def increment_version(self) -> None:
         """增加版本号（用于更新）"""
-        self._record_version += 1
-        self._updated_at = datetime.now().isoformat()
+        with self._lock:
+            self._record_version += 1
+            self._updated_at = datetime.now().isoformat()
+            # 未保存的修改属于新版本
+            self._journal.move_to(self.client.journal_dir / f"{self.airalogy_record_id}.jsonl")
     
     @classmethod
-    def load(cls, client: "Airalogy", record_id: str) -> "RecordSession":
-        """从本地存储加载 Record"""
-        record_path = client.records_dir / f"{record_id}.json"
-        if not record_path.exists():
-            raise FileNotFoundError(f"Record not found: {record_id}")
+    def load(cls, client: "Airalogy", record_id: str, lazy: bool = False) -> "RecordSession":
+        """
+        从本地存储加载 Record (支持历史版本)
         
-        record = json.loads(record_path.read_text(encoding="utf-8"))
+        Args:
+            lazy: 大的 list/dict 变量 (表格等) 先不解析，第一次访问时再解析
+        """
+        # 共享 Session 时在锁内读取快照和 journal，保证 head 状态与读到的内容一致
+        with client._session_lock():
+            return cls._load(client, record_id, lazy)
+    
+    @classmethod
+    def _load(cls, client: "Airalogy", record_id: str, lazy: bool) -> "RecordSession":
+        record = client._read_record_lazy(record_id) if lazy else client._read_record(record_id)
         
         # 解析 record_id
         # 格式: airalogy.id.record.<uuid>.v.<version>
@@ -254,23 +617,63 @@ class RecordSession:
         
         # 恢复数据
         session._record_version = record_version
-        session._var_data = record["data"].get("var", {})
-        session._step_data = record["data"].get("step", {})
-        session._check_data = record["data"].get("check", {})
+        # 记录来自读取缓存，复制后再交给会话修改
+        session._var_data = dict(record["data"].get("var", {}))
+        for var_id, value in session._var_data.items():
+            if is_blob_ref(value):
+                # 外部存储的表格：第一次访问时再读取，未修改时保存仍复用同一引用
+                session._var_data[var_id] = BlobValue(value, client._blobs)
+                session._blob_refs[var_id] = value
+            else:
+                # 按存储时的形式保存，修改后才重新检查是否需要外部存储
+                session._inline_vars.add(var_id)
+        session._step_data = dict(record["data"].get("step", {}))
+        session._check_data = dict(record["data"].get("check", {}))
         session._created_at = metadata["record_initial_version_submission_time"]
         session._created_by = metadata["record_initial_version_submission_user_id"]
         session._updated_at = metadata["record_current_version_submission_time"]
         session._record_num = metadata.get("record_num", 1)
+        # 复用已保存的叶子哈希 (compute() 会补算新增/删除的键)
+        session._hasher = MerkleHasher.from_tree(metadata.get("merkle"))
+        
+        # 恢复上次保存后的修改 (例如崩溃前未 save 的编辑)
+        session._journal = RecordJournal(
+            client.journal_dir / f"{session.airalogy_record_id}.jsonl",
+            fsync=client.journal_fsync,
+        )
+        session._replay_journal()
+        session._head_stamp = session._stat_head()
         
         return session
 
 
+# 尚未读取的变量值 (懒加载的原始 JSON 或外部 blob)
+_DEFERRED = (LazyValue, BlobValue)
+
+# 重新加载 Session 时保留的进程内状态
+_SESSION_LOCAL_ATTRS = frozenset({"client", "events", "_lock", "last_access", "_is_active", "_discarded"})
+
+# 启用自动保存的客户端 (弱引用，不延长客户端生命周期)；进程退出时统一写入剩余修改
+_autosave_clients: "weakref.WeakSet[Airalogy]" = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_autosave_clients() -> None:
+    for client in list(_autosave_clients):
+        client._autosave.stop()
+
+
 class Airalogy:
     """
     Airalogy 客户端 - 本地模拟版
     
     文件存储在 .airalogy_mock/files/ 目录
-    记录存储在 .airalogy_mock/records/ 目录
+    记录存储在 .airalogy_mock/records/ 目录 (每条记录只保留最新版本)
+    历史版本存储在 .airalogy_mock/history/ 目录 (快照 + 增量补丁)
+    全文检索索引在 .airalogy_mock/index/ 目录
+    未保存的会话修改日志在 .airalogy_mock/journal/ 目录
+    冷数据包 (compact 后的旧版本和文件元数据) 在 .airalogy_mock/packs/ 目录
+    外部存储的大表格变量在 .airalogy_mock/blobs/ 目录
     
     支持 Record 模式：
         client = Airalogy()
@@ -287,6 +690,15 @@ class Airalogy:
         api_key: str = None,
         protocol_id: str = None,
         storage_dir: str = None,
+        journal_compact_threshold: int = 500,
+        journal_fsync: bool = False,
+        autosave_interval: Optional[float] = None,
+        snapshot_interval: int = 10,
+        cache_max_bytes: int = DEFAULT_MAX_BYTES,
+        max_sessions: int = 32,
+        session_idle_timeout: Optional[float] = 1800,
+        blob_threshold: Optional[int] = DEFAULT_OFFLOAD_BYTES,
+        shared_sessions: bool = False,
     ):
         """
         初始化客户端
@@ -296,6 +708,19 @@ class Airalogy:
             api_key: API 密钥 (模拟模式下忽略)
             protocol_id: 协议 ID
             storage_dir: 本地存储目录，默认 .airalogy_mock
+            journal_compact_threshold: journal 累积多少条修改后自动压缩为快照
+            journal_fsync: journal 每次追加后是否 fsync
+            autosave_interval: 后台自动保存间隔 (秒)，默认读取
+                AIRALOGY_AUTOSAVE_INTERVAL 环境变量，未设置或 <= 0 则关闭
+            snapshot_interval: 历史版本每隔多少个版本保存一个完整快照，
+                其余版本只保存增量补丁
+            cache_max_bytes: 已解析记录 LRU 缓存的大小上限 (字节)，0 关闭
+            max_sessions: 内存中最多保留的 Record Session 数量
+            session_idle_timeout: Session 空闲多少秒后写盘并移出内存，None 不限
+            blob_threshold: 序列化后不小于该字节数的 list/dict 变量写入 blobs/，
+                记录中只保存引用；None 或 0 关闭
+            shared_sessions: 多个进程 (例如多 worker 服务) 同时操作同一批 Session：
+                每次访问前从存储同步其他进程的修改，活跃会话跟随 active_session.id
         """
         self.endpoint = endpoint or os.environ.get("AIRALOGY_ENDPOINT", "http://localhost:4000")
         self.api_key = api_key or os.environ.get("AIRALOGY_API_KEY", "mock-api-key")
@@ -312,21 +737,92 @@ class Airalogy:
         )
         self.files_dir = self.storage_dir / "files"
         self.records_dir = self.storage_dir / "records"
+        self.journal_dir = self.storage_dir / "journal"
+        self.history_dir = self.storage_dir / "history"
+        self.index_dir = self.storage_dir / "index"
+        self.packs_dir = self.storage_dir / "packs"
+        self.blobs_dir = self.storage_dir / "blobs"
+        self.blob_threshold = blob_threshold
+        self.journal_compact_threshold = journal_compact_threshold
+        self.journal_fsync = journal_fsync
+        self.shared_sessions = shared_sessions
         
         # 确保目录存在
         self.files_dir.mkdir(parents=True, exist_ok=True)
         self.records_dir.mkdir(parents=True, exist_ok=True)
+        self.journal_dir.mkdir(parents=True, exist_ok=True)
+        
+        # 历史版本 (增量压缩)；compact() 后冷数据和文件元数据进入包文件
+        self._versions = VersionStore(
+            self.history_dir, snapshot_interval, pack=PackStore(self.packs_dir, "history"),
+        )
+        self._meta_pack = PackStore(self.packs_dir, "file_meta")
+        
+        # 多进程共享存储目录：写入加锁，代数计数器通知其他进程的缓存失效
+        self._store_lock = StoreLock.for_path(self.storage_dir / ".lock")
+        self._generation = GenerationCounter(self.storage_dir / "generation")
+        self._seen_generation = self._generation.read()
+        self._write_depth = 0
+        
+        # 已解析记录的 LRU 缓存 (按文件 mtime/size 校验)
+        self._cache = RecordCache(cache_max_bytes)
+        
+        # 大表格变量的内容寻址存储 (读取共用记录缓存)
+        self._blobs = BlobStore(self.blobs_dir, self._cache)
+        
+        # 记录摘要与二级索引 (首次查询时从 index/ 的快照加载，之后随写入维护)
+        self._lock = threading.RLock()
+        self._record_index: Optional[RecordIndex] = None
+        self._file_index: Optional[FileIndex] = None
+        self._record_store = SummaryStore(self.index_dir, "records")
+        self._file_store = SummaryStore(self.index_dir, "files")
+        
+        # 全文检索索引 (写入时追加日志，检索时加载)
+        self._search_index = SearchIndex(self.index_dir)
+        self._init_empty_indexes()
         
         # 当前用户 (模拟)
         self._current_user = _generate_user_id("mock-user")
         
-        # 当前活跃的 Record Session
+        # 后台自动保存 (合并一段时间内的修改为一次原子写入)
+        if autosave_interval is None:
+            autosave_interval = float(os.environ.get("AIRALOGY_AUTOSAVE_INTERVAL") or 0)
+        self._autosave: Optional[AutosaveScheduler] = None
+        if autosave_interval > 0:
+            self._autosave = AutosaveScheduler(autosave_interval)
+            _autosave_clients.add(self)
+            # 客户端被回收时停止后台线程 (有未保存 Session 时客户端不会被回收)
+            weakref.finalize(self, self._autosave.stop).atexit = False
+        
+        # Record Session 表 (按 session_id，LRU 顺序)；空闲或超出上限的会话写盘后移出，
+        # 再次访问时从磁盘恢复
+        self.max_sessions = max(1, max_sessions)
+        self.session_idle_timeout = session_idle_timeout
+        self._sessions: OrderedDict[str, RecordSession] = OrderedDict()
+        self._sessions_lock = threading.RLock()
+        
+        # 当前活跃的 Record Session (未指定 session_id 时的默认会话)
         self._active_session: Optional[RecordSession] = None
         self._active_session_file = self.storage_dir / "active_session.id"
+        # 最近一次读写 active_session.id 时的文件状态 (shared_sessions 时检测其他进程的切换)
+        self._active_stamp: Optional[tuple] = None
         
         # 尝试恢复活跃会话
         self._restore_active_session()
 
+    def _init_empty_indexes(self) -> None:
+        """空存储直接创建空的索引快照：之后的写入都记入变更日志，不需要全量扫描"""
+        if self._record_store.active and self._file_store.active and not self._search_index.needs_rebuild:
+            return
+        with self._store_lock:
+            if not any(self.records_dir.glob("*.json")):
+                if not self._record_store.active:
+                    self._record_store.save(RecordIndex())
+                if self._search_index.needs_rebuild:
+                    self._search_index.rebuild({})
+            if not self._file_store.active and not any(self.files_dir.iterdir()) and not len(self._meta_pack):
+                self._file_store.save(FileIndex())
+
     def _restore_active_session(self):
         """尝试从磁盘恢复活跃会话"""
         if self._active_session_file.exists():
@@ -346,18 +842,123 @@ class Airalogy:
     def _save_active_session_id(self, record_id: str):
         """保存活跃会话 ID"""
         try:
-            self._active_session_file.write_text(record_id)
+            with self._store_lock:
+                atomic_write_text(self._active_session_file, record_id)
+                self._active_stamp = self._stat_active_file()
         except Exception:
             pass
 
     def _clear_active_session_file(self):
         """清除活跃会话标记"""
         try:
-            if self._active_session_file.exists():
-                self._active_session_file.unlink()
+            with self._store_lock:
+                if self._active_session_file.exists():
+                    self._active_session_file.unlink()
+                self._active_stamp = None
         except Exception:
             pass
     
+    def _stat_active_file(self) -> Optional[tuple]:
+        try:
+            st = self._active_session_file.stat()
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+    
+    def _sync_active_session(self) -> None:
+        """其他进程切换或结束了活跃会话时跟随 active_session.id"""
+        stamp = self._stat_active_file()
+        if stamp == self._active_stamp:
+            return
+        self._active_stamp = stamp
+        try:
+            record_id = self._active_session_file.read_text().strip() if stamp else ""
+        except OSError:
+            record_id = ""
+        if not record_id:
+            self._active_session = None
+            return
+        session_id, _ = _parse_record_id(record_id)
+        if self._active_session is not None and self._active_session.session_id == session_id:
+            return
+        try:
+            self._active_session = self.get_session(session_id)
+        except FileNotFoundError:
+            self._active_session = None
+    
+    # ========================================================
+    # 多进程协调
+    # ========================================================
+    
+    @contextmanager
+    def _write_locked(self):
+        """
+        写入临界区：持有存储锁，退出最外层时代数加一
+        
+        进入时先同步代数，保证基于其他进程的最新写入做修改。
+        锁顺序：存储锁在外，self._lock 在内。
+        """
+        with self._store_lock:
+            self._sync_generation()
+            self._write_depth += 1
+            try:
+                yield
+            finally:
+                self._write_depth -= 1
+                if self._write_depth == 0:
+                    expected = self._seen_generation + 1
+                    self._seen_generation = self._generation.bump()
+                    if self._seen_generation != expected:
+                        self._invalidate_views()
+    
+    def _sync_generation(self) -> None:
+        """其他进程修改过存储时，更新进程内的索引 (记录缓存自行按 mtime 校验)"""
+        generation = self._generation.read()
+        if generation != self._seen_generation:
+            self._invalidate_views()
+            self._seen_generation = generation
+    
+    def _invalidate_views(self) -> None:
+        """
+        应用其他进程记入 index/ 变更日志的修改，不重新扫描记录
+        
+        日志已被压缩时丢弃对应的索引，下次查询时从快照重新加载。
+        """
+        with self._lock:
+            if self._record_index is not None and not self._record_store.refresh(self._record_index):
+                self._record_index = None
+            if self._file_index is not None and not self._file_store.refresh(self._file_index):
+                self._file_index = None
+            self._search_index.refresh()
+
+    def store_generation(self) -> int:
+        """
+        存储代数：任何进程的每次写入 (记录、文件、删除、GC) 都会加一
+
+        用作列表类接口的 ETag，代数不变时列表内容一定不变。
+        """
+        return self._generation.read()
+
+    def _session_lock(self):
+        """修改 Session 时的锁：shared_sessions 时为存储锁，否则不加锁"""
+        return self._store_lock if self.shared_sessions else nullcontext()
+
+    def _mark_session_dirty(self, session: RecordSession) -> None:
+        """Session 有未保存修改，交给自动保存调度"""
+        if self._autosave is not None:
+            self._autosave.mark_dirty(session)
+
+    def _discard_session_dirty(self, session: RecordSession) -> None:
+        """Session 已保存或已结束，取消待保存状态"""
+        if self._autosave is not None:
+            self._autosave.discard(session)
+
+    def flush_sessions(self) -> int:
+        """立即写入所有待自动保存的 Session，返回保存数量"""
+        if self._autosave is None:
+            return 0
+        return self._autosave.flush()
+    
     # ========================================================
     # Record Session 管理
     # ========================================================
@@ -368,11 +969,16 @@ class Airalogy:
         lab_id: str = "mock-lab",
         project_id: str = "mock-project",
         protocol_version: str = "1.0.0",
+        activate: bool = True,
     ) -> RecordSession:
         """
         启动 Record 模式，创建新的记录会话
+        
+        Args:
+            activate: 是否设为当前活跃会话 (默认会话)；为 False 时只能通过
+                session_id 访问，可同时打开多个会话
         """
-        self._active_session = RecordSession(
+        session = RecordSession(
             client=self,
             protocol_id=protocol_id,
             lab_id=lab_id,
@@ -381,39 +987,279 @@ class Airalogy:
         )
         
         # 立即保存初始状态，确保重启后能找到
-        self._active_session.save()
-        self._save_active_session_id(self._active_session.airalogy_record_id)
-        
-        return self._active_session
+        session.save()
+        self._register_session(session, activate=activate)
+        return session
     
-    def load_record_session(self, record_id: str) -> RecordSession:
+    def load_record_session(self, record_id: str, activate: bool = True, lazy: bool = False) -> RecordSession:
         """
         加载已有的 Record 会话
+        
+        Args:
+            lazy: 只立即解析元数据和标量变量，大表格等在第一次 get_var 时解析
         """
-        self._active_session = RecordSession.load(self, record_id)
-        self._save_active_session_id(self._active_session.airalogy_record_id)
-        return self._active_session
+        session = RecordSession.load(self, record_id, lazy=lazy)
+        self._register_session(session, activate=activate)
+        return session
     
     def get_active_session(self) -> Optional[RecordSession]:
         """获取当前活跃的 Record Session"""
+        if self.shared_sessions:
+            self._sync_active_session()
+            session = self._active_session
+            if session is not None:
+                session.sync()
+            return session
         return self._active_session
     
-    def end_record_session(self, save: bool = True) -> Optional[str]:
+    def get_session(self, session_id: Optional[str] = None) -> Optional[RecordSession]:
         """
-        结束 Record 模式
+        按 ID 获取 Record Session (也接受完整的 record_id)
+        
+        不传 session_id 时返回当前活跃会话。已被移出内存的会话从磁盘懒加载恢复
+        (快照 + journal)，会话对应的记录不存在时抛出 FileNotFoundError。
         """
-        if self._active_session is None:
+        if session_id is None:
+            return self.get_active_session()
+        
+        session_id, _ = _parse_record_id(session_id)
+        with self._sessions_lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                session.last_access = time.monotonic()
+                self._sessions.move_to_end(session_id)
+        if session is None:
+            head = self._head_version(session_id)
+            if head is None:
+                raise FileNotFoundError(f"Session not found: {session_id}")
+            session = RecordSession.load(self, f"airalogy.id.record.{session_id}.v.{head}", lazy=True)
+            self._register_session(session, activate=False)
+        else:
+            session.sync()
+            self._evict_sessions()
+        return session
+    
+    def list_sessions(self) -> list[dict]:
+        """列出内存中的 Record Session (最近访问的在后)"""
+        now = time.monotonic()
+        with self._sessions_lock:
+            sessions = list(self._sessions.values())
+        return [
+            {
+                "session_id": session.session_id,
+                "record_id": session.airalogy_record_id,
+                "protocol_id": session.airalogy_protocol_id,
+                "active": session is self._active_session,
+                "idle_seconds": round(now - session.last_access, 1),
+                "unsaved_changes": session._journal.count(),
+            }
+            for session in sessions
+        ]
+    
+    def end_record_session(self, save: bool = True, session_id: Optional[str] = None) -> Optional[str]:
+        """
+        结束 Record 模式 (不传 session_id 时结束当前活跃会话)
+        """
+        session = self.get_session(session_id)
+        if session is None:
             return None
         
         record_id = None
         if save:
-            record_id = self._active_session.save()
+            record_id = session.save()
+        else:
+            # 在 Session 锁内取消：已被自动保存线程取出的保存会看到 discarded，不再写入
+            with session._lock:
+                session._discarded = True
+                self._discard_session_dirty(session)
+                session.discard_journal()
         
-        self._active_session = None
-        self._clear_active_session_file()
+        with self._sessions_lock:
+            if self._sessions.get(session.session_id) is session:
+                del self._sessions[session.session_id]
+        if session is self._active_session:
+            self._active_session = None
+            self._clear_active_session_file()
         
+        session.events.publish("ended", record_id=record_id)
         return record_id
     
+    def _register_session(self, session: RecordSession, activate: bool) -> None:
+        """加入会话表，必要时设为活跃会话，并淘汰空闲/超额会话"""
+        with self._sessions_lock:
+            previous = self._sessions.pop(session.session_id, None)
+            self._sessions[session.session_id] = session
+        if previous is not None and previous is not session:
+            # 同一记录重新加载：旧对象的修改已在 journal 中，由新对象接管
+            self._discard_session_dirty(previous)
+            if previous is self._active_session:
+                activate = True
+        if activate:
+            self._active_session = session
+            self._save_active_session_id(session.airalogy_record_id)
+        self._evict_sessions()
+    
+    def _evict_sessions(self) -> int:
+        """
+        淘汰空闲超时或超出数量上限的会话 (活跃会话和有事件订阅者的会话除外)，返回淘汰数量
+        
+        被淘汰的会话先写盘，之后通过 get_session() 可以从磁盘恢复。
+        """
+        now = time.monotonic()
+        victims = []
+        with self._sessions_lock:
+            candidates = [
+                s for s in self._sessions.values()
+                if s is not self._active_session and not s.events.subscribers
+            ]
+            for session in candidates:
+                if self.session_idle_timeout is not None and now - session.last_access > self.session_idle_timeout:
+                    victims.append(session)
+            excess = len(self._sessions) - len(victims) - self.max_sessions
+            for session in candidates:  # LRU 顺序
+                if excess <= 0:
+                    break
+                if session not in victims:
+                    victims.append(session)
+                    excess -= 1
+            for session in victims:
+                del self._sessions[session.session_id]
+        
+        for session in victims:
+            if session._journal.count():
+                session.save()
+            else:
+                self._discard_session_dirty(session)
+        return len(victims)
+    
+    # ========================================================
+    # 批量操作
+    # ========================================================
+    
+    def apply_batch(
+        self,
+        operations: list[dict],
+        session_id: Optional[str] = None,
+        atomic: bool = False,
+        save: bool = False,
+    ) -> dict:
+        """
+        在一次调用中按顺序执行多个 Session 操作
+        
+        操作格式与 RecordSession.apply_ops() 相同，另外支持上传文件并设置到变量：
+            {"op": "upload", "var_id": "image", "file_name": "a.png", "file_base64": "..."}
+        
+        Args:
+            operations: 操作列表
+            session_id: 目标 Session，None 表示当前活跃 Session
+            atomic: 全部成功或全部不应用。先校验所有操作、完成所有上传，再一次性
+                应用修改；任何一步失败时删除已上传的文件，Session 不变
+            save: 结束后保存一次 (否则交给自动保存)
+        
+        Returns:
+            {"success", "applied", "failed", "results": [{"index", "op", "status", ...}],
+             "seq", "record_id"}
+        """
+        session = self.get_session(session_id)
+        if session is None:
+            raise ValueError("No active session")
+        
+        # 1. 校验：解析全部操作，上传内容先解码
+        prepared: list[Optional[tuple]] = []
+        results: list[dict] = []
+        for index, op in enumerate(operations):
+            kind = op.get("op") if isinstance(op, dict) else None
+            results.append({"index": index, "op": kind, "status": "pending"})
+            try:
+                if kind == "upload":
+                    if not op.get("var_id") or not op.get("file_name") or not op.get("file_base64"):
+                        raise ValueError("upload op requires 'var_id', 'file_name' and 'file_base64'")
+                    try:
+                        content = base64.b64decode(op["file_base64"], validate=True)
+                    except ValueError:
+                        raise ValueError("Invalid base64 in 'file_base64'")
+                    prepared.append(("upload", op["var_id"], op["file_name"], content))
+                else:
+                    prepared.append(("entry", _op_to_entry(op)))
+            except ValueError as e:
+                prepared.append(None)
+                results[index].update(status="error", error=str(e))
+        
+        invalid = any(item is None for item in prepared)
+        if atomic and invalid:
+            for result in results:
+                if result["status"] == "pending":
+                    result["status"] = "skipped"
+            return self._batch_report(session, results, None)
+        
+        # 2. 执行
+        if atomic:
+            uploaded: list[str] = []
+            entries: list[dict] = []
+            try:
+                for index, item in enumerate(prepared):
+                    if item[0] == "upload":
+                        _, var_id, file_name, content = item
+                        file_id = self.upload_file_bytes(file_name, content)["id"]
+                        uploaded.append(file_id)
+                        results[index]["file_id"] = file_id
+                        entries.append({"op": "var", "id": var_id, "value": file_id})
+                    else:
+                        entries.append(item[1])
+            except Exception as e:
+                for file_id in uploaded:
+                    self.delete_file(file_id)
+                for result in results:
+                    result.pop("file_id", None)
+                    result["status"] = "skipped"
+                return self._batch_report(session, results, f"{type(e).__name__}: {e}")
+            with session._lock:
+                for entry in entries:
+                    session._mutate(entry)
+            for result in results:
+                result["status"] = "ok"
+        else:
+            for index, item in enumerate(prepared):
+                if item is None:
+                    continue
+                try:
+                    if item[0] == "upload":
+                        _, var_id, file_name, content = item
+                        file_id = self.upload_file_bytes(file_name, content)["id"]
+                        results[index]["file_id"] = file_id
+                        session.set_var(var_id, file_id)
+                    else:
+                        session._mutate(item[1])
+                    results[index]["status"] = "ok"
+                except (OSError, ValueError) as e:
+                    results[index].update(status="error", error=str(e))
+        
+        record_id = None
+        if save and any(result["status"] == "ok" for result in results):
+            record_id = session.save()
+        return self._batch_report(session, results, None, record_id)
+    
+    @staticmethod
+    def _batch_report(
+        session: RecordSession,
+        results: list[dict],
+        error: Optional[str],
+        record_id: Optional[str] = None,
+    ) -> dict:
+        applied = sum(1 for result in results if result["status"] == "ok")
+        failed = sum(1 for result in results if result["status"] == "error")
+        report = {
+            "success": failed == 0 and error is None,
+            "applied": applied,
+            "failed": failed,
+            "results": results,
+            "seq": session.events.seq,
+            "record_id": record_id,
+        }
+        if error is not None:
+            report["error"] = error
+        return report
+    
     # ========================================================
     # 文件操作
     # ========================================================
@@ -435,19 +1281,25 @@ class Airalogy:
         
         file_id = _generate_file_id(ext)
         
-        # 保存文件
-        file_path = self.files_dir / file_id
-        file_path.write_bytes(file_bytes)
-        
         # 保存元数据
-        meta_path = self.files_dir / f"{file_id}.meta.json"
-        meta_path.write_text(json.dumps({
+        meta = {
             "id": file_id,
             "file_name": file_name,
             "size": len(file_bytes),
+            "sha256": hashlib.sha256(file_bytes).hexdigest(),
             "uploaded_at": datetime.now().isoformat(),
             "uploaded_by": str(self._current_user),
-        }, ensure_ascii=False, indent=2))
+        }
+        meta_path = self.files_dir / f"{file_id}.meta.json"
+        with self._write_locked():
+            # 先写文件内容再写元数据：有元数据的文件一定完整
+            atomic_write_bytes(self.files_dir / file_id, file_bytes)
+            atomic_write_text(meta_path, json.dumps(meta, ensure_ascii=False, indent=2))
+            summary = summarize_file(meta)
+            with self._lock:
+                if self._file_index is not None:
+                    self._file_index.upsert(file_id, summary)
+                self._file_store.append({"op": "put", "key": file_id, "doc": summary}, self._file_index)
         
         return {"id": file_id, "file_name": file_name}
     
@@ -463,6 +1315,26 @@ class Airalogy:
             raise FileNotFoundError(f"File not found: {file_id}")
         return file_path.read_bytes()
     
+    def stat_file(self, file_id: str) -> dict:
+        """
+        文件路径、大小、修改时间和内容哈希 (用于流式下载，不读取内容)
+        
+        Returns:
+            {"path", "size", "mtime", "sha256"}；旧文件没有 sha256 时为 None
+        """
+        file_path = self.files_dir / file_id
+        try:
+            st = file_path.stat()
+        except FileNotFoundError:
+            raise FileNotFoundError(f"File not found: {file_id}")
+        meta = self.get_file_meta(file_id) or {}
+        return {
+            "path": file_path,
+            "size": st.st_size,
+            "mtime": st.st_mtime,
+            "sha256": meta.get("sha256"),
+        }
+    
     def download_file_base64(self, file_id: str) -> str:
         """下载文件 (base64)"""
         file_bytes = self.download_file_bytes(file_id)
@@ -481,21 +1353,395 @@ class Airalogy:
         meta_path = self.files_dir / f"{file_id}.meta.json"
         
         deleted = False
-        if file_path.exists():
-            file_path.unlink()
-            deleted = True
-        if meta_path.exists():
-            meta_path.unlink()
+        with self._write_locked():
+            if meta_path.exists():
+                meta_path.unlink()
+            self._meta_pack.remove([file_id])
+            if file_path.exists():
+                file_path.unlink()
+                deleted = True
+            self._unindex_files([file_id])
         
         return deleted
     
     def list_files(self) -> list[dict]:
-        """列出所有文件"""
-        files = []
+        """列出所有文件 (散文件元数据 + 已打包的元数据)"""
+        files = {}
+        for file_id, data in self._meta_pack.items():
+            files[file_id] = json.loads(data)
         for meta_file in self.files_dir.glob("*.meta.json"):
             meta = json.loads(meta_file.read_text())
-            files.append(meta)
-        return files
+            files[meta.get("id") or meta_file.name[:-len(".meta.json")]] = meta
+        return list(files.values())
+    
+    def get_file_meta(self, file_id: str) -> Optional[dict]:
+        """读取文件元数据，不存在返回 None"""
+        meta_path = self.files_dir / f"{file_id}.meta.json"
+        try:
+            return json.loads(meta_path.read_text())
+        except FileNotFoundError:
+            data = self._meta_pack.get(file_id)
+            return json.loads(data) if data is not None else None
+    
+    def _get_file_index(self) -> FileIndex:
+        """获取文件索引，首次调用时从快照加载 (没有快照时扫描 files/ 构建)"""
+        if self._file_index is not None:
+            return self._file_index
+        with self._store_lock, self._lock:
+            if self._file_index is None:
+                index = FileIndex()
+                if not self._file_store.load(index):
+                    index = FileIndex()
+                    for meta in self.list_files():
+                        if meta.get("id"):
+                            index.upsert(meta["id"], summarize_file(meta))
+                    self._file_store.save(index)
+                self._file_index = index
+            return self._file_index
+    
+    def _unindex_files(self, file_ids: Iterable[str]) -> None:
+        """删除文件后从文件索引移除 (调用方持有存储锁)"""
+        with self._lock:
+            for file_id in file_ids:
+                if self._file_index is not None:
+                    self._file_index.remove(file_id)
+                self._file_store.append({"op": "delete", "key": file_id}, self._file_index)
+    
+    def list_files_page(
+        self,
+        sort: str = "-uploaded_at",
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        fields: Optional[list[str]] = None,
+        filter: Optional[dict] = None,
+    ) -> dict:
+        """
+        分页列出文件 (基于文件索引，不读取 .meta.json)
+        
+        Args:
+            sort: 排序字段 (uploaded_at/file_name/size/ext)，前缀 "-" 表示降序
+            limit: 每页条数
+            cursor: 上一页返回的 next_cursor
+            fields: 字段投影
+            filter: 过滤条件，例如 {"ext": "png", "size": {"$gt": 1024}}
+        
+        Returns:
+            {"total", "items", "next_cursor"}
+        """
+        self._sync_generation()
+        index = self._get_file_index()
+        with self._lock:
+            return index.page(filter, sort=sort, limit=limit, cursor=cursor, fields=fields)
+    
+    def collect_garbage(
+        self,
+        dry_run: bool = True,
+        quarantine: bool = False,
+        grace_period: float = filegc.DEFAULT_GRACE_PERIOD,
+    ) -> dict:
+        """
+        清理未被任何记录版本或未保存会话引用的上传文件和外部存储的表格 (blob)
+        
+        标记阶段不加锁，只在清除阶段短暂持有存储锁。
+        
+        Args:
+            dry_run: 只报告可回收的文件和字节数，不修改 (默认)
+            quarantine: 移动到 quarantine/<时间戳>/ 而不是删除
+            grace_period: 最近多少秒内上传的文件不清理
+        
+        Returns:
+            {"dry_run", "referenced", "orphans": [{"id", "size", "file_name", ...}],
+             "reclaimable_bytes", "removed", "skipped_recent", "quarantine_dir",
+             "blobs": {"orphans", "reclaimable_bytes", "removed", "skipped_recent"}}
+        """
+        roots = [self.records_dir, self.history_dir, self.journal_dir]
+        # 留 1 秒余量，避免文件系统 mtime 精度导致漏扫
+        started_ns = time.time_ns() - 1_000_000_000
+        started_generation = self._generation.read()
+        referenced = filegc.mark(roots, extract=_find_references) | self._mark_packed_history()
+        # 外部存储的表格中也可能引用文件 (blob 不可变，只扫描被引用的)
+        scanned = set(referenced)
+        referenced |= self._blobs.references(scanned, filegc.find_file_ids)
+        
+        quarantine_dir = filegc.quarantine_path(self.storage_dir) if quarantine and not dry_run else None
+        lock = self._store_lock if dry_run else self._write_locked()
+        with lock:
+            if self._generation.read() != started_generation:
+                # 标记期间有写入：补扫之后修改过的文件
+                referenced |= filegc.mark(roots, since_ns=started_ns, extract=_find_references)
+                referenced |= self._mark_packed_history()
+                referenced |= self._blobs.references(referenced - scanned, filegc.find_file_ids)
+            report = filegc.sweep(
+                self.files_dir,
+                referenced,
+                grace_period=grace_period,
+                dry_run=dry_run,
+                quarantine_dir=quarantine_dir,
+                read_meta=self.get_file_meta,
+            )
+            if report["removed"]:
+                self._meta_pack.remove(orphan["id"] for orphan in report["orphans"])
+                self._unindex_files(orphan["id"] for orphan in report["orphans"])
+            report["blobs"] = self._blobs.sweep(
+                referenced,
+                grace_period=grace_period,
+                dry_run=dry_run,
+                quarantine_dir=quarantine_dir,
+            )
+        
+        report.update({
+            "dry_run": dry_run,
+            "referenced": len(referenced),
+            "quarantine_dir": (
+                str(quarantine_dir)
+                if quarantine_dir and (report["removed"] or report["blobs"]["removed"])
+                else None
+            ),
+        })
+        return report
+    
+    def _mark_packed_history(self) -> set[str]:
+        """已打包的历史版本中引用的文件 ID 和 blob"""
+        referenced = set()
+        for _, data in self._versions.pack.items():
+            referenced |= _find_references(data.decode("utf-8", errors="replace"))
+        return referenced
+    
+    # ========================================================
+    # 冷数据打包
+    # ========================================================
+    
+    def compact(self, cold_after: float = 7 * 24 * 3600, codec: Optional[str] = None) -> dict:
+        """
+        把冷数据打包为压缩包文件，减少小文件数量
+        
+        - 历史版本：修改时间早于 cold_after 秒的快照/补丁
+        - 文件元数据：全部 .meta.json
+        
+        记录 head、journal 和较新的历史版本保持散文件。打包后的数据读取方式不变
+        (get_record、list_files 等自动从包中读取)。
+        
+        Args:
+            cold_after: 历史版本多久未修改视为冷数据 (秒)
+            codec: "zstd" (需要 zstandard) 或 "zlib" ("gzip" 为旧别名)，默认可用时使用 zstd
+        
+        Returns:
+            {"history": {"packed", "loose_bytes", "objects", "pack_bytes"},
+             "file_meta": {...}}
+        """
+        with self._write_locked():
+            history = self._versions.pack_cold(time.time() - cold_after, codec=codec)
+            
+            meta_files = list(self.files_dir.glob("*.meta.json"))
+            items = {path.name[:-len(".meta.json")]: path.read_bytes() for path in meta_files}
+            file_meta = {"packed": len(items), "loose_bytes": sum(len(v) for v in items.values())}
+            if items:
+                file_meta.update(self._meta_pack.rewrite(items, codec=codec))
+                for path in meta_files:
+                    path.unlink()
+        return {"history": history, "file_meta": file_meta}
+    
+    def pack_stats(self) -> dict:
+        """包文件统计"""
+        return {"history": self._versions.pack.stats(), "file_meta": self._meta_pack.stats()}
+    
+    # ========================================================
+    # 记录存储 (head + 历史版本)
+    # ========================================================
+    
+    def _head_files(self, record_uuid: str) -> list[tuple[int, Path]]:
+        """records/ 中该记录的 head 文件，按版本升序 (旧数据可能有多个)"""
+        heads = []
+        for path in self.records_dir.glob(f"airalogy.id.record.{record_uuid}.v.*.json"):
+            _, version = _parse_record_id(path.stem)
+            if version is not None:
+                heads.append((version, path))
+        return sorted(heads)
+    
+    def _head_version(self, record_uuid: str) -> Optional[int]:
+        """该记录最新版本号，不存在返回 None"""
+        heads = self._head_files(record_uuid)
+        return heads[-1][0] if heads else None
+    
+    def _load_head(self, path: Path) -> dict:
+        """读取 head 文件 (经过 LRU 缓存，返回的对象不得原地修改)"""
+        return self._cache.load(path.stem, path)
+    
+    def _read_record(self, record_id: str) -> dict:
+        """
+        读取记录：head 直接读文件，历史版本从快照 + 补丁重建
+        
+        返回的记录可能与缓存共享，修改前需要复制。
+        """
+        record_path = self.records_dir / f"{record_id}.json"
+        try:
+            return self._load_head(record_path)
+        except FileNotFoundError:
+            pass
+        
+        record_uuid, version = _parse_record_id(record_id)
+        if version is not None and self._versions.has_version(record_uuid, version):
+            heads = self._head_files(record_uuid)
+            head = self._load_head(heads[-1][1]) if heads else None
+            return self._versions.get(record_uuid, version, head)
+        
+        raise FileNotFoundError(f"Record not found: {record_id}")
+    
+    def _read_record_lazy(self, record_id: str) -> dict:
+        """
+        读取记录用于恢复会话：已缓存时直接使用，否则大变量保留为 LazyValue
+        
+        懒解析的结果不放入读取缓存。历史版本按 _read_record 完整重建。
+        """
+        record_path = self.records_dir / f"{record_id}.json"
+        cached = self._cache.peek(record_id, record_path)
+        if cached is not None:
+            return cached
+        try:
+            text = record_path.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return self._read_record(record_id)
+        return parse_record(text)
+    
+    def _commit_record(self, record: dict, cache: bool = True) -> None:
+        """
+        写入记录的 head 版本，更早的 head 归档为历史版本
+        
+        cache 为 True 时 record 直接放入读取缓存，调用方之后不能再修改它。
+        """
+        with self._write_locked():
+            record_id = record["airalogy_record_id"]
+            record_uuid, version = _parse_record_id(record_id)
+            record_path = self.records_dir / f"{record_id}.json"
+            # 同一版本号原地改写：上一个版本的反向补丁需要改为相对新 head
+            previous_head = None
+            if version is not None and self._versions.has_delta(record_uuid, version):
+                try:
+                    previous_head = self._load_head(record_path)
+                except FileNotFoundError:
+                    pass
+            atomic_write_text(record_path, dumps_record(record))
+            # 会话保存时原样写回的懒加载变量 (LazyValue) 不能进入读取缓存；
+            # 只有计算版本补丁时才需要解析
+            lazy = has_lazy(record)
+            if lazy:
+                cache = False
+            if previous_head is not None:
+                self._versions.rebase(
+                    record_uuid, previous_head, resolve_lazy(record) if lazy else record,
+                )
+            if cache:
+                self._cache.put(record_id, record_path, record)
+            else:
+                self._cache.discard(record_id)
+            if version is None:
+                self._index_record(record)
+                return
+            
+            # 从新到旧依次归档：每个旧版本存为相对下一个版本的反向补丁
+            newer = record
+            for old_version, old_path in reversed(self._head_files(record_uuid)):
+                if old_version >= version:
+                    continue
+                old_record = self._load_head(old_path)
+                if not self._versions.has_version(record_uuid, old_version):
+                    if has_lazy(newer):
+                        newer = resolve_lazy(newer)
+                    self._versions.archive(record_uuid, old_record, newer)
+                old_path.unlink()
+                self._cache.discard(old_path.stem)
+                newer = old_record
+            
+            self._index_record(record)
+    
+    def _iter_latest_records(self):
+        """遍历每条记录的最新版本，产出 (record_uuid, record)"""
+        # 同一记录的多个 head 文件 (旧数据) 只取最新版本
+        latest: dict[str, tuple[int, Path]] = {}
+        for record_file in self.records_dir.glob("*.json"):
+            record_uuid, version = _parse_record_id(record_file.stem)
+            version = version or 0
+            if record_uuid not in latest or version > latest[record_uuid][0]:
+                latest[record_uuid] = (version, record_file)
+        
+        for record_uuid, (_, record_file) in latest.items():
+            try:
+                record = json.loads(record_file.read_text(encoding="utf-8"))
+            except Exception:
+                continue
+            record.setdefault("airalogy_record_id", record_file.stem)
+            yield record_uuid, record
+    
+    def _get_record_index(self) -> RecordIndex:
+        """获取记录索引，首次调用时从快照加载 (没有快照时扫描 records/ 构建)"""
+        if self._record_index is not None:
+            return self._record_index
+        # 加载/构建时持有存储锁，保证快照与日志一致
+        with self._store_lock, self._lock:
+            if self._record_index is None:
+                index = RecordIndex()
+                if not self._record_store.load(index):
+                    index = RecordIndex()
+                    for _, record in self._iter_latest_records():
+                        self._index_record(record, index)
+                    self._record_store.save(index)
+                self._record_index = index
+            return self._record_index
+    
+    def _index_record(self, record: dict, index: Optional[RecordIndex] = None) -> None:
+        """
+        写入后更新记录索引和全文检索索引
+        
+        摘要同时记入 index/ 的变更日志 (还没有索引快照，且本进程也没有加载索引时跳过)。
+        """
+        record_id = record.get("airalogy_record_id")
+        if not record_id:
+            return
+        record_uuid, version = _parse_record_id(record_id)
+        building = index is not None
+        if not building:
+            # 正常写入路径；构建记录索引时 (传入 index) 不重复写全文检索日志
+            self._search_index.put(record_uuid, record)
+            index = self._record_index
+            if index is None and not self._record_store.active:
+                return
+        with self._lock:
+            existing = index.docs.get(record_uuid) if index is not None else None
+            if existing and (existing.get("version") or 0) > (version or 0):
+                return  # 旧数据中同一记录有多个 head，只索引最新版本
+            try:
+                size = (self.records_dir / f"{record_id}.json").stat().st_size
+            except OSError:
+                size = None
+            summary = summarize_record(
+                record,
+                version_count=len(self.list_record_versions(record_id)) or 1,
+                size=size,
+            )
+            if index is not None:
+                index.upsert(record_uuid, summary)
+            if not building:
+                self._record_store.append({"op": "put", "key": record_uuid, "doc": summary}, index)
+    
+    def _unindex_record(self, record_id: str) -> None:
+        """删除后从记录索引和全文检索索引移除"""
+        record_uuid, _ = _parse_record_id(record_id)
+        self._search_index.delete(record_uuid)
+        with self._lock:
+            if self._record_index is not None:
+                self._record_index.remove(record_uuid)
+            self._record_store.append({"op": "delete", "key": record_uuid}, self._record_index)
+    
+    def cache_stats(self) -> dict:
+        """记录缓存统计：{"hits", "misses", "hit_ratio", "entries", "bytes", "max_bytes"}"""
+        return self._cache.stats()
+    
+    def list_record_versions(self, record_id: str) -> list[str]:
+        """列出记录的所有版本 ID (升序)"""
+        record_uuid, _ = _parse_record_id(record_id)
+        versions = set(self._versions.versions(record_uuid))
+        versions.update(v for v, _ in self._head_files(record_uuid))
+        return [f"airalogy.id.record.{record_uuid}.v.{v}" for v in sorted(versions)]
     
     # ========================================================
     # 记录操作 (兼容旧 API)
@@ -521,8 +1767,7 @@ class Airalogy:
             if "record_version" not in data:
                 data["record_version"] = 1
             
-            record_path = self.records_dir / f"{record_id}.json"
-            record_path.write_text(json.dumps(data, ensure_ascii=False, indent=2))
+            self._commit_record(data, cache=False)
             return data
         
         # 旧格式，包装成简单记录
@@ -547,62 +1792,86 @@ class Airalogy:
             },
         }
         
-        record_path = self.records_dir / f"{record_id}.json"
-        record_path.write_text(json.dumps(record, ensure_ascii=False, indent=2))
+        self._commit_record(record, cache=False)
         
         return record
     
     def update_record(self, record_id: str, data: dict) -> dict:
-        """更新记录"""
-        record_path = self.records_dir / f"{record_id}.json"
-        if not record_path.exists():
-            raise FileNotFoundError(f"Record not found: {record_id}")
-        
-        record = json.loads(record_path.read_text())
-        
-        # 支持更新 var/step/check
-        if "var" in data:
-            record["data"]["var"].update(data["var"])
-        if "step" in data:
-            record["data"]["step"].update(data["step"])
-        if "check" in data:
-            record["data"]["check"].update(data["check"])
-        
-        # 如果直接传入字段，更新到 var
-        for key, value in data.items():
-            if key not in ("var", "step", "check"):
-                record["data"]["var"][key] = value
-        
-        # 更新元数据
-        if "metadata" in record:
-            record["metadata"]["updated_at"] = datetime.now().isoformat()
-            record["metadata"]["record_current_version_submission_time"] = datetime.now().isoformat()
-        
-        # 增加版本号
-        record["record_version"] = record.get("record_version", 1) + 1
-        old_id = record["airalogy_record_id"]
-        new_id = old_id.rsplit(".v.", 1)[0] + f".v.{record['record_version']}"
-        record["airalogy_record_id"] = new_id
-        
-        # 重新计算 SHA1
-        if "metadata" in record:
-            record["metadata"]["sha1"] = _calculate_sha1(record["data"])
-        
-        # 保存到新文件名
-        new_record_path = self.records_dir / f"{new_id}.json"
-        new_record_path.write_text(json.dumps(record, ensure_ascii=False, indent=2))
-        
-        # 可选：保留旧版本或删除
-        # record_path.unlink()  # 删除旧版本
+        """
+        更新记录，生成新版本
         
-        return record
+        新版本成为 head，旧版本以增量补丁形式进入历史版本存储。
+        返回新版本记录的副本 (写入读取缓存的对象不对外暴露)。
+        """
+        with self._write_locked():
+            record = _copy_for_update(self._read_record(record_id))
+            hasher = MerkleHasher.from_tree(record.get("metadata", {}).get("merkle"))
+            
+            # 支持更新 var/step/check
+            for section in ("var", "step", "check"):
+                if section in data:
+                    record["data"][section].update(data[section])
+                    hasher.invalidate(section, data[section].keys())
+            
+            # 如果直接传入字段，更新到 var
+            for key, value in data.items():
+                if key not in ("var", "step", "check"):
+                    record["data"]["var"][key] = value
+                    hasher.invalidate("var", [key])
+            
+            # 新写入的大表格外部存储；未修改的变量保持原引用
+            changed = set(data.get("var", {})) | {k for k in data if k not in ("var", "step", "check")}
+            for key in changed:
+                ref = self._blobs.offload(record["data"]["var"][key], self.blob_threshold)
+                if ref is not None:
+                    record["data"]["var"][key] = ref
+            
+            # 更新元数据
+            if "metadata" in record:
+                record["metadata"]["updated_at"] = datetime.now().isoformat()
+                record["metadata"]["record_current_version_submission_time"] = datetime.now().isoformat()
+            
+            # 增加版本号 (基于历史版本更新时，接在最新版本之后)
+            record_uuid, _ = _parse_record_id(record["airalogy_record_id"])
+            head_version = self._head_version(record_uuid) or 0
+            record["record_version"] = max(head_version, record.get("record_version", 1)) + 1
+            old_id = record["airalogy_record_id"]
+            new_id = old_id.rsplit(".v.", 1)[0] + f".v.{record['record_version']}"
+            record["airalogy_record_id"] = new_id
+            
+            # 重新计算哈希 (只重算修改过的条目)
+            if "metadata" in record:
+                merkle = hasher.compute(record["data"])
+                record["metadata"]["sha1"] = merkle["root"]
+                record["metadata"]["merkle"] = {
+                    "sections": merkle["sections"],
+                    "leaves": merkle["leaves"],
+                }
+            
+            # 保存为新 head，旧版本归档
+            self._commit_record(record)
+            
+            return copy_json(record)
     
-    def get_record(self, record_id: str) -> dict:
-        """获取单条记录"""
-        record_path = self.records_dir / f"{record_id}.json"
-        if not record_path.exists():
-            raise FileNotFoundError(f"Record not found: {record_id}")
-        return json.loads(record_path.read_text())
+    def get_record(self, record_id: str, inline: bool = True) -> dict:
+        """
+        获取单条记录 (支持历史版本 ID)
+        
+        热点记录从内存缓存读取；返回的是副本，调用方修改它不会影响缓存。
+        
+        Args:
+            inline: 把外部存储的表格替换为完整数据；False 时返回存储中的 blob 引用
+        """
+        record = self._read_record(record_id)
+        return copy_json(self._inline_blobs(record) if inline else record)
+    
+    def _inline_blobs(self, record: dict) -> dict:
+        """替换记录中的 blob 引用 (没有引用时返回原对象)"""
+        variables = record.get("data", {}).get("var") or {}
+        inlined = self._blobs.inline(variables)
+        if inlined is variables:
+            return record
+        return dict(record, data=dict(record["data"], var=inlined))
     
     def download_records_json(self, record_ids: list[str]) -> str:
         """下载多条记录 (JSON 字符串)"""
@@ -615,43 +1884,240 @@ class Airalogy:
                 pass
         return json.dumps(records, ensure_ascii=False)
     
+    def iter_records_ndjson(
+        self,
+        record_ids: Optional[Iterable[str]] = None,
+        gzip: bool = False,
+    ) -> Iterator[bytes]:
+        """
+        流式导出记录为 NDJSON (每行一条 Record)
+        
+        逐条读取记录并立即产出，内存占用与记录数量无关。外部存储的表格会内联，
+        导出文件不依赖 blobs/ 目录。
+        
+        Args:
+            record_ids: 要导出的记录 ID (支持历史版本)，None 表示全部记录的最新版本
+            gzip: 是否输出 gzip 压缩流
+        """
+        def lines():
+            if record_ids is None:
+                for _, record in self._iter_latest_records():
+                    yield dumps_line(self._inline_blobs(record))
+                return
+            for rid in record_ids:
+                try:
+                    yield dumps_line(self.get_record(rid))
+                except FileNotFoundError:
+                    pass
+        
+        return gzip_chunks(lines()) if gzip else lines()
+    
+    def export_records_ndjson(
+        self,
+        path: str,
+        record_ids: Optional[Iterable[str]] = None,
+        gzip: bool = False,
+    ) -> int:
+        """导出记录到 NDJSON 文件，返回写入字节数"""
+        written = 0
+        with open(path, "wb") as f:
+            for chunk in self.iter_records_ndjson(record_ids, gzip=gzip):
+                f.write(chunk)
+                written += len(chunk)
+        return written
+    
+    def import_records_ndjson(self, stream: BinaryIO, overwrite: bool = False) -> dict:
+        """
+        从 NDJSON 流导入记录 (gzip 自动识别)
+        
+        逐行解析并写入；已存在相同或更新版本的记录默认跳过。
+        
+        Args:
+            stream: 二进制文件对象
+            overwrite: 已存在相同版本时是否覆盖
+        
+        Returns:
+            {"imported": n, "skipped": n, "errors": [{"line": n, "error": "..."}]}
+        """
+        result = {"imported": 0, "skipped": 0, "errors": []}
+        for line_no, line in enumerate(iter_lines(stream), start=1):
+            try:
+                record = json.loads(line)
+                record_id = record["airalogy_record_id"]
+                record_uuid, version = _parse_record_id(record_id)
+                # 检查和写入在同一个写入临界区内 (锁顺序：存储锁在外)
+                with self._write_locked():
+                    head = self._head_version(record_uuid)
+                    if head is not None and version is not None:
+                        if head > version or (head == version and not overwrite):
+                            result["skipped"] += 1
+                            continue
+                    self._commit_record(record)
+                result["imported"] += 1
+            except Exception as e:
+                result["errors"].append({"line": line_no, "error": str(e)})
+        return result
+    
     def list_records(self) -> list[dict]:
-        """列出所有记录"""
+        """列出所有记录 (每条记录一行，version_count 为版本总数)"""
         records = []
-        for record_file in self.records_dir.glob("*.json"):
+        for _, record in self._iter_latest_records():
             try:
-                record = json.loads(record_file.read_text())
+                record_id = record["airalogy_record_id"]
                 records.append({
-                    "id": record.get("airalogy_record_id", record_file.stem),
+                    "id": record_id,
                     "alias": record.get("alias", ""),
                     "protocol_id": record.get("metadata", {}).get("airalogy_protocol_id"),
                     "created_at": record.get("metadata", {}).get("record_initial_version_submission_time"),
                     "updated_at": record.get("metadata", {}).get("record_current_version_submission_time"),
                     "version": record.get("record_version", 1),
+                    "version_count": len(self.list_record_versions(record_id)) or 1,
                 })
             except Exception:
                 pass
         return records
     
+    def list_records_page(
+        self,
+        sort: str = "-updated_at",
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        fields: Optional[list[str]] = None,
+        filter: Optional[dict] = None,
+    ) -> dict:
+        """
+        分页列出记录 (基于记录索引，按游标定位，不读取记录文件)
+        
+        Args:
+            sort: 排序字段 (updated_at/created_at/alias/protocol/version/size 或 var.<name>)，
+                前缀 "-" 表示降序
+            limit: 每页条数
+            cursor: 上一页返回的 next_cursor
+            fields: 字段投影，例如 ["alias", "updated_at"] (始终包含 id)
+            filter: 过滤条件 (同 query_records)
+        
+        Returns:
+            {"total", "items": [记录摘要, ...], "next_cursor": 下一页游标或 None}
+        """
+        self._sync_generation()
+        index = self._get_record_index()
+        with self._lock:
+            return index.page(filter, sort=sort, limit=limit, cursor=cursor, fields=fields)
+    
     def delete_record(self, record_id: str) -> bool:
-        """删除记录"""
-        record_path = self.records_dir / f"{record_id}.json"
-        if record_path.exists():
+        """
+        删除记录的一个版本
+        
+        删除 head 时上一个版本重新成为 head；删除历史版本时重算相邻版本的补丁。
+        删除整条记录 (全部版本) 使用 purge_record()。
+        """
+        with self._write_locked():
+            record_uuid, version = _parse_record_id(record_id)
+            record_path = self.records_dir / f"{record_id}.json"
+            (self.journal_dir / f"{record_id}.jsonl").unlink(missing_ok=True)
+            if version is not None and not record_path.exists():
+                if not self._versions.has_version(record_uuid, version):
+                    return False
+                self._versions.remove(record_uuid, version, self._latest_head(record_uuid))
+                head = self._latest_head(record_uuid)
+                if head is not None:
+                    self._index_record(head)  # version_count 变化
+                return True
+            try:
+                deleted = self._load_head(record_path)
+            except FileNotFoundError:
+                return False
+            
             record_path.unlink()
+            self._cache.discard(record_id)
+            self._unindex_record(record_id)
+            previous = max((v for v in self._versions.versions(record_uuid) if v < (version or 0)), default=None)
+            if previous is not None:
+                # 上一个版本重新成为 head (更旧的补丁相对它的内容，仍然有效)
+                self._commit_record(self._versions.pop(record_uuid, previous, deleted))
+            return True
+    
+    def purge_record(self, record_id: str) -> bool:
+        """删除整条记录：全部版本 (包括已打包的历史)、未保存的 journal 和索引项"""
+        with self._write_locked():
+            record_uuid, _ = _parse_record_id(record_id)
+            heads = self._head_files(record_uuid)
+            if not heads and not self._versions.versions(record_uuid):
+                return False
+            self._unindex_record(record_id)
+            for _, head_path in heads:
+                head_path.unlink()
+                self._cache.discard(head_path.stem)
+            for journal_path in self.journal_dir.glob(f"airalogy.id.record.{record_uuid}.v.*.jsonl"):
+                journal_path.unlink()
+            self._versions.delete(record_uuid)
             return True
-        return False
     
     def rename_record(self, record_id: str, alias: str) -> bool:
-        """设置记录别名"""
-        record_path = self.records_dir / f"{record_id}.json"
-        if record_path.exists():
-            with open(record_path, 'r', encoding='utf-8') as f:
-                record = json.load(f)
+        """设置记录别名 (支持历史版本 ID，只修改该版本)"""
+        with self._write_locked():
+            record_path = self.records_dir / f"{record_id}.json"
+            try:
+                record = dict(self._load_head(record_path))
+            except FileNotFoundError:
+                record_uuid, version = _parse_record_id(record_id)
+                if version is None or not self._versions.has_version(record_uuid, version):
+                    return False
+                head = self._latest_head(record_uuid)
+                record = dict(self._versions.get(record_uuid, version, head), alias=alias)
+                self._versions.replace(record_uuid, version, record, head)
+                return True
             record["alias"] = alias
-            with open(record_path, 'w', encoding='utf-8') as f:
-                json.dump(record, f, ensure_ascii=False, indent=2)
+            self._commit_record(record)
             return True
-        return False
+    
+    def _latest_head(self, record_uuid: str) -> Optional[dict]:
+        """records/ 中该记录最新的 head，没有时返回 None"""
+        heads = self._head_files(record_uuid)
+        return self._load_head(heads[-1][1]) if heads else None
+    
+    def query_records(
+        self,
+        filter: Optional[dict] = None,
+        sort: Optional[str] = None,
+        limit: Optional[int] = None,
+        offset: int = 0,
+    ) -> dict:
+        """
+        按元数据和 data.var 标量字段查询记录 (基于二级索引，不读取记录文件)
+        
+        Args:
+            filter: 过滤条件，例如
+                {"protocol_id": "quantum_cck8",
+                 "var.culture_temp": {"$gt": 37},
+                 "updated_at": {"$gte": "2025-12-20"}}
+                支持 $eq/$ne/$gt/$gte/$lt/$lte/$in 以及 $and/$or
+            sort: 排序字段，前缀 "-" 表示降序，例如 "-updated_at"
+            limit: 最多返回条数
+            offset: 跳过条数
+        
+        Returns:
+            {"total": 匹配总数, "items": [记录摘要, ...]}
+        """
+        self._sync_generation()
+        index = self._get_record_index()
+        with self._lock:
+            return index.query(filter, sort=sort, limit=limit, offset=offset)
+    
+    def search_records(self, query: str, limit: int = 20) -> list[dict]:
+        """
+        全文检索记录内容 (别名、字符串变量、步骤/检查点批注)
+        
+        Returns:
+            按相关度排序：[{"id", "score", "alias", "snippets": [{"field", "text"}]}, ...]
+        """
+        # 重建/压缩索引会写文件，在存储锁内进行
+        with self._store_lock:
+            self._sync_generation()
+            with self._lock:
+                if self._search_index.needs_rebuild:
+                    self._search_index.rebuild(dict(self._iter_latest_records()))
+                return self._search_index.search(query, limit=limit)
     
     # ========================================================
     # 上下文信息
@@ -0,0 +1,208 @@
+"""
+Diagnostics - 环境探测与运行状态
+
+/api/version 以前每次请求都读取 importlib.metadata 并启动 5 个 git 子进程。
+Diagnostics 在服务启动时于后台线程探测一次 SDK 安装信息并缓存；之后每次读取只
+stat 几个文件 (安装目录、__init__.py，可编辑安装时还有 .git 的 HEAD、logs/HEAD
+和 index)，修改时间变化 (重新安装、切换分支、提交) 时才重新探测。
+
+运行状态 (运行时长、内存、线程数) 每次读取时计算，开销很小。
+"""
+
+import os
+import sys
+import json
+import time
+import platform
+import threading
+import subprocess
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Optional
+
+GIT_TIMEOUT = 5
+
+
+def _git(args: list[str], cwd: Path) -> Optional[str]:
+    """执行 git 命令，失败时返回 None"""
+    try:
+        result = subprocess.run(
+            ["git", *args],
+            capture_output=True,
+            text=True,
+            cwd=cwd,
+            timeout=GIT_TIMEOUT,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout.strip() if result.returncode == 0 else None
+
+
+def _find_git_root(install_path: Path) -> Optional[Path]:
+    # .git 可能在 parent 或 parent.parent (src 布局)
+    for git_parent in [install_path.parent, install_path.parent.parent, install_path]:
+        if (git_parent / ".git").exists():
+            return git_parent
+    return None
+
+
+def probe_sdk(module: ModuleType) -> dict:
+    """
+    探测 SDK 的版本和安装来源 (pypi / github / local / github_editable)
+
+    可编辑安装时执行 4 个 git 命令 (提交和分支合并为一次 rev-parse)。
+    """
+    info: dict[str, Any] = {
+        "version": getattr(module, "__version__", "unknown"),
+        "install_source": "unknown",
+        "commit_id": None,
+        "install_path": None,
+    }
+
+    install_path: Optional[Path] = None
+    try:
+        install_path = Path(module.__file__).parent
+        info["install_path"] = str(install_path)
+    except (AttributeError, TypeError):
+        pass
+
+    # pip install git+https://... 或本地路径安装会生成 direct_url.json
+    try:
+        import importlib.metadata
+        dist = importlib.metadata.distribution(module.__name__)
+        direct_url_text = dist.read_text("direct_url.json")
+        if direct_url_text:
+            direct_url = json.loads(direct_url_text)
+            info["direct_url"] = direct_url
+            if "vcs_info" in direct_url:
+                info["install_source"] = "github"
+                info["commit_id"] = direct_url["vcs_info"].get("commit_id")
+                info["vcs_url"] = direct_url.get("url")
+            elif direct_url.get("url", "").startswith("file://"):
+                info["install_source"] = "local"
+    except Exception:
+        pass
+
+    git_root = _find_git_root(install_path) if install_path is not None else None
+    if git_root is not None:
+        info["install_source"] = "github_editable"
+        info["git_root"] = str(git_root)
+
+        head = _git(["rev-parse", "HEAD", "--abbrev-ref", "HEAD"], git_root)
+        if head:
+            lines = head.splitlines()
+            info["commit_id"] = lines[0]
+            if len(lines) > 1:
+                info["branch"] = lines[1]
+        short = _git(["rev-parse", "--short", "HEAD"], git_root)
+        if short:
+            info["commit_short"] = short
+        status = _git(["status", "--porcelain"], git_root)
+        if status is not None:
+            info["dirty"] = len(status) > 0
+        remote = _git(["remote", "get-url", "origin"], git_root)
+        if remote:
+            info["remote_url"] = remote
+
+    if info["install_source"] == "unknown":
+        info["install_source"] = "pypi"
+    return info
+
+
+def _mtime_ns(path: Path) -> Optional[int]:
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+def memory_usage() -> dict:
+    """当前进程内存 (字节)：rss 为当前常驻内存，peak_rss 为峰值；平台不支持时为 None"""
+    usage: dict[str, Optional[int]] = {"rss": None, "peak_rss": None}
+    try:
+        with open("/proc/self/statm") as f:
+            usage["rss"] = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux 以 KB 为单位，macOS 以字节为单位
+        usage["peak_rss"] = peak if sys.platform == "darwin" else peak * 1024
+    except (ImportError, OSError):
+        pass
+    return usage
+
+
+class Diagnostics:
+    """
+    缓存的环境信息
+
+    Args:
+        module: 要探测的 SDK 模块 (airalogy)
+    """
+
+    def __init__(self, module: ModuleType):
+        self.module = module
+        self.started_at = time.time()
+        self._started = time.monotonic()
+        self._info: Optional[dict] = None
+        self._signature: Optional[tuple] = None
+        self._probed_at: Optional[float] = None
+        self._probe_lock = threading.Lock()
+        self.probes = 0
+
+    def start(self) -> threading.Thread:
+        """在后台线程中执行首次探测"""
+        thread = threading.Thread(target=self.sdk_info, name="airalogy-diagnostics", daemon=True)
+        thread.start()
+        return thread
+
+    def _watched_paths(self) -> list[Path]:
+        paths: list[Path] = []
+        module_file = getattr(self.module, "__file__", None)
+        if module_file:
+            paths += [Path(module_file).parent, Path(module_file)]
+        git_root = (self._info or {}).get("git_root")
+        if git_root:
+            # HEAD: 切换分支；logs/HEAD: 每次提交/检出/重置都会追加；index: 暂存区变化
+            git_dir = Path(git_root) / ".git"
+            paths += [git_dir / "HEAD", git_dir / "logs" / "HEAD", git_dir / "index"]
+        return paths
+
+    def _current_signature(self) -> tuple:
+        return tuple(_mtime_ns(path) for path in self._watched_paths())
+
+    def sdk_info(self) -> dict:
+        """SDK 版本信息；安装目录或 git 状态变化时重新探测，否则返回缓存"""
+        if self._info is not None and self._current_signature() == self._signature:
+            return self._info
+        with self._probe_lock:
+            # 等待期间其他线程可能已完成探测
+            if self._info is not None and self._current_signature() == self._signature:
+                return self._info
+            info = probe_sdk(self.module)
+            self._info = info
+            # 探测后才知道 git_root，签名需要在写入 _info 之后计算
+            self._signature = self._current_signature()
+            self._probed_at = time.time()
+            self.probes += 1
+            return info
+
+    def runtime(self) -> dict:
+        """进程运行状态"""
+        return {
+            "pid": os.getpid(),
+            "started_at": self.started_at,
+            "uptime_seconds": round(time.monotonic() - self._started, 3),
+            "memory": memory_usage(),
+            "threads": threading.active_count(),
+            "cpu_count": os.cpu_count(),
+            "python": sys.version,
+            "executable": sys.executable,
+            "platform": platform.platform(),
+        }
+
+    def probe_stats(self) -> dict:
+        """探测次数和最近一次探测时间"""
+        return {"probes": self.probes, "probed_at": self._probed_at}
@@ -0,0 +1,86 @@
+"""
+Session Events - 会话变更事件流
+
+每个 RecordSession 持有一个 SessionEvents：每次修改 (var/vars/step/check)、
+保存和结束都会生成一个带递增序号 (seq) 的事件，推送给订阅者 (WebSocket 通道)，
+并在内存中保留最近的事件：
+
+    {"seq": 42, "op": "var", "id": "temp", "value": 37.0, "ts": "..."}
+    {"seq": 43, "op": "saved", "record_id": "airalogy.id.record.xxx.v.2"}
+    {"seq": 44, "op": "ended", "record_id": "airalogy.id.record.xxx.v.2"}
+
+断线重连时客户端带上最后收到的 seq 和 epoch，since() 返回之后的事件；
+事件已被挤出缓冲区或 epoch 不一致 (服务重启、会话被移出内存后重新加载) 时
+返回 None，客户端需要重新获取完整快照。
+"""
+
+import uuid
+import threading
+from collections import deque
+from typing import Any, Callable, Optional
+
+# 每个会话保留的最近事件数
+DEFAULT_BUFFER_SIZE = 1024
+
+Listener = Callable[[dict], None]
+
+
+class SessionEvents:
+    """
+    线程安全的事件序列
+
+    publish() 在修改会话的线程 (通常是线程池) 中同步调用监听器，
+    监听器必须足够快且不能阻塞 (例如 loop.call_soon_threadsafe)。
+    """
+
+    def __init__(self, buffer_size: int = DEFAULT_BUFFER_SIZE):
+        self.epoch = uuid.uuid4().hex[:12]
+        self.seq = 0
+        self._buffer: deque[dict] = deque(maxlen=buffer_size)
+        self._listeners: list[Listener] = []
+        self._lock = threading.Lock()
+
+    def publish(self, op: str, **fields: Any) -> dict:
+        """追加事件并通知订阅者，返回事件"""
+        with self._lock:
+            self.seq += 1
+            event = {"seq": self.seq, "op": op, **fields}
+            self._buffer.append(event)
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener(event)
+        return event
+
+    def since(self, seq: int, epoch: Optional[str] = None) -> Optional[list[dict]]:
+        """
+        返回 seq 之后的事件
+
+        Returns:
+            事件列表 (可能为空)；无法续传时返回 None
+        """
+        with self._lock:
+            if epoch is not None and epoch != self.epoch:
+                return None
+            if seq < 0 or seq > self.seq:
+                return None
+            oldest = self._buffer[0]["seq"] if self._buffer else self.seq + 1
+            if seq + 1 < oldest:
+                return None
+            return [event for event in self._buffer if event["seq"] > seq]
+
+    def subscribe(self, listener: Listener) -> Callable[[], None]:
+        """注册监听器，返回取消订阅的函数"""
+        with self._lock:
+            self._listeners.append(listener)
+
+        def unsubscribe() -> None:
+            with self._lock:
+                if listener in self._listeners:
+                    self._listeners.remove(listener)
+
+        return unsubscribe
+
+    @property
+    def subscribers(self) -> int:
+        with self._lock:
+            return len(self._listeners)
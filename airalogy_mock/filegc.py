@@ -0,0 +1,159 @@
+"""
+File GC - 清理未被任何记录引用的上传文件
+
+标记-清除：
+
+1. 标记 (不加锁)：扫描 records/、history/ (快照和补丁)、journal/
+   (未保存的会话修改) 的原始文本，用正则收集所有 airalogy.id.file.* ID，
+   包括嵌套在表格等结构中的引用。外部存储的表格 (blobs/) 只扫描被引用的那些。
+   不解析 JSON，也不阻塞正常写入。
+2. 清除 (持有存储锁，只做删除/移动)：如果标记期间存储代数变化，
+   补扫标记开始后写入的文件；然后删除或隔离未被引用、且超过宽限期的文件。
+
+宽限期保护刚上传、还没来得及写入变量的文件。
+"""
+
+import re
+import json
+import time
+import shutil
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+FILE_ID_RE = re.compile(r"airalogy\.id\.file\.[0-9a-fA-F-]{36}\.[A-Za-z0-9]+")
+
+DEFAULT_GRACE_PERIOD = 3600.0
+
+
+def find_file_ids(text: str) -> set[str]:
+    """从任意文本 (记录 JSON、补丁、journal) 中提取文件 ID"""
+    return set(FILE_ID_RE.findall(text))
+
+
+def _reference_sources(roots: Iterable[Path]) -> Iterable[Path]:
+    for root in roots:
+        if not root.exists():
+            continue
+        for path in root.rglob("*"):
+            if path.is_file() and path.suffix in (".json", ".jsonl"):
+                yield path
+
+
+def mark(
+    roots: Iterable[Path],
+    since_ns: int = 0,
+    extract: Callable[[str], set[str]] = find_file_ids,
+) -> set[str]:
+    """
+    收集 roots 下所有 .json/.jsonl 文件中引用的文件 ID
+
+    Args:
+        roots: 扫描的目录
+        since_ns: 只扫描 mtime 不早于该时间的文件 (补扫用)
+        extract: 从文本中提取引用 (默认只提取文件 ID)
+    """
+    referenced: set[str] = set()
+    for path in _reference_sources(roots):
+        try:
+            if since_ns and path.stat().st_mtime_ns < since_ns:
+                continue
+            referenced |= extract(path.read_text(encoding="utf-8", errors="replace"))
+        except FileNotFoundError:
+            continue  # 扫描期间被归档或删除
+    return referenced
+
+
+def list_stored_files(files_dir: Path) -> dict[str, Path]:
+    """files/ 中的上传文件 (不含 .meta.json 和临时文件)"""
+    stored = {}
+    for path in files_dir.iterdir():
+        name = path.name
+        if not path.is_file() or name.endswith(".meta.json") or name.startswith("."):
+            continue
+        if FILE_ID_RE.fullmatch(name):
+            stored[name] = path
+    return stored
+
+
+def _read_loose_meta(path: Path) -> Optional[dict]:
+    try:
+        return json.loads(path.with_name(f"{path.name}.meta.json").read_text())
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def _file_info(path: Path, meta: Optional[dict]) -> dict:
+    info = {"id": path.name, "size": path.stat().st_size}
+    if meta:
+        info["file_name"] = meta.get("file_name")
+        info["uploaded_at"] = meta.get("uploaded_at")
+    return info
+
+
+def sweep(
+    files_dir: Path,
+    referenced: set[str],
+    grace_period: float = DEFAULT_GRACE_PERIOD,
+    dry_run: bool = True,
+    quarantine_dir: Optional[Path] = None,
+    read_meta: Optional[Callable[[str], Optional[dict]]] = None,
+) -> dict:
+    """
+    删除或隔离未被引用的文件
+
+    Args:
+        files_dir: 上传文件目录
+        referenced: 标记阶段收集到的文件 ID
+        grace_period: 修改时间在该秒数内的文件不清理
+        dry_run: 只报告，不修改
+        quarantine_dir: 指定时移动到该目录而不是删除
+        read_meta: 按文件 ID 读取元数据 (元数据已打包时由调用方提供)
+
+    Returns:
+        {"orphans": [...], "reclaimable_bytes", "removed", "skipped_recent"}
+    """
+    cutoff = time.time() - grace_period
+    orphans, skipped_recent, reclaimable, removed = [], 0, 0, 0
+
+    for file_id, path in sorted(list_stored_files(files_dir).items()):
+        if file_id in referenced:
+            continue
+        try:
+            if path.stat().st_mtime > cutoff:
+                skipped_recent += 1
+                continue
+            meta = read_meta(file_id) if read_meta else _read_loose_meta(path)
+            info = _file_info(path, meta)
+        except FileNotFoundError:
+            continue
+        orphans.append(info)
+        reclaimable += info["size"]
+        if dry_run:
+            continue
+
+        meta_path = path.with_name(f"{file_id}.meta.json")
+        if quarantine_dir is not None:
+            quarantine_dir.mkdir(parents=True, exist_ok=True)
+            shutil.move(str(path), str(quarantine_dir / file_id))
+            if meta_path.exists():
+                shutil.move(str(meta_path), str(quarantine_dir / meta_path.name))
+            elif meta:
+                (quarantine_dir / meta_path.name).write_text(json.dumps(meta, ensure_ascii=False, indent=2))
+        else:
+            path.unlink()
+            if meta_path.exists():
+                meta_path.unlink()
+        removed += 1
+
+    return {
+        "orphans": orphans,
+        "reclaimable_bytes": reclaimable,
+        "removed": removed,
+        "skipped_recent": skipped_recent,
+    }
+
+
+def quarantine_path(storage_dir: Path) -> Path:
+    """本次 GC 的隔离目录：<storage>/quarantine/<时间戳>/"""
+    return Path(storage_dir) / "quarantine" / datetime.now().strftime("%Y%m%d-%H%M%S")
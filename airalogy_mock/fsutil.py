@@ -0,0 +1,33 @@
+"""
+文件系统辅助函数
+
+原子写入：先写同目录下的临时文件，再 os.replace 覆盖目标文件，
+保证读者只会看到完整的旧内容或完整的新内容。
+"""
+
+import os
+import tempfile
+from pathlib import Path
+
+
+def atomic_write_bytes(path: Path, data: bytes) -> None:
+    """原子写入 bytes"""
+    path = Path(path)
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def atomic_write_text(path: Path, text: str, encoding: str = "utf-8") -> None:
+    """原子写入文本"""
+    atomic_write_bytes(path, text.encode(encoding))
@@ -0,0 +1,69 @@
+"""
+HTTP Caching - ETag 与条件请求
+
+读取接口返回强 ETag，客户端带 If-None-Match 再次请求时内容未变化就返回 304，
+不必重新传输 (和序列化) 完整数据。ETag 来源：
+
+- 单条记录：metadata.sha1 (Merkle 根) + 数据之外字段 (别名、元数据) 的哈希
+- 列表/分页：存储代数计数器 + 查询参数 (任何写入都会改变代数)
+- 文件下载：上传时记录的 sha256
+- 其他 (Assigner 字段、版本信息、Session 变量)：响应 JSON 的哈希
+"""
+
+import json
+import hashlib
+from typing import Any, Optional
+
+# 可缓存但每次使用前必须重新验证
+NO_CACHE = "no-cache"
+
+# 上传的文件不可变 (每次上传生成新的文件 ID)
+IMMUTABLE = "private, max-age=31536000, immutable"
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def json_etag(content: Any) -> str:
+    """按 JSON 内容计算 ETag (键排序，与字典顺序无关)"""
+    return f'"{_digest(json.dumps(content, sort_keys=True, ensure_ascii=False, default=str))}"'
+
+
+def record_etag(record: dict, inline: bool = True) -> Optional[str]:
+    """
+    单条记录的 ETag：数据部分用 Merkle 根，别名和元数据另算一个短哈希
+
+    重命名等操作在同一版本下只改写数据之外的字段，Merkle 根不变。
+    旧格式记录没有 sha1 时返回 None (由调用方按内容计算)。
+    """
+    metadata = record.get("metadata") or {}
+    sha1 = metadata.get("sha1")
+    if not sha1:
+        return None
+    envelope = {key: value for key, value in record.items() if key != "data"}
+    # Merkle 树本身由根代表，不必重复哈希
+    envelope["metadata"] = {key: value for key, value in metadata.items() if key != "merkle"}
+    envelope_digest = _digest(json.dumps(envelope, sort_keys=True, ensure_ascii=False, default=str))[:12]
+    return f'"{sha1}-{envelope_digest}{"" if inline else "-ref"}"'
+
+
+def generation_etag(generation: int, variant: str = "") -> str:
+    """基于存储代数的 ETag，variant 区分同一接口的不同查询参数"""
+    return f'"g{generation}-{_digest(variant)[:12]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match 是否命中 (弱比较：忽略 W/ 前缀，支持 * 和逗号分隔的列表)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    target = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == target:
+            return True
+    return False
@@ -0,0 +1,126 @@
+"""
+HTTP File Serving - 流式文件下载与 Range 请求
+
+上传的文件不可变 (每次上传都生成新的文件 ID)，因此可以使用强 ETag
+(元数据中的 sha256，旧文件退回到大小 + 修改时间) 并支持断点/拖动：
+
+- 单个 Range (bytes=start-end / bytes=start- / bytes=-suffix) 返回 206
+- 超出文件大小的 Range 返回 416
+- 多段 Range 不支持，按规范忽略并返回完整文件
+- If-Range 与当前 ETag 不一致时忽略 Range
+
+不依赖 Starlette 版本自带的 Range 支持 (旧版 FileResponse 没有)。
+"""
+
+import mimetypes
+from email.utils import formatdate
+from pathlib import Path
+from typing import Iterator, Optional
+
+CHUNK_SIZE = 64 * 1024
+
+# 常见实验数据类型；其余交给 mimetypes，最后退回 application/octet-stream
+MEDIA_TYPES = {
+    "png": "image/png",
+    "jpg": "image/jpeg",
+    "jpeg": "image/jpeg",
+    "gif": "image/gif",
+    "bmp": "image/bmp",
+    "webp": "image/webp",
+    "svg": "image/svg+xml",
+    "tif": "image/tiff",
+    "tiff": "image/tiff",
+    "pdf": "application/pdf",
+    "csv": "text/csv",
+    "tsv": "text/tab-separated-values",
+    "txt": "text/plain",
+    "md": "text/markdown",
+    "json": "application/json",
+    "xml": "application/xml",
+    "html": "text/html",
+    "mp4": "video/mp4",
+    "webm": "video/webm",
+    "mov": "video/quicktime",
+    "avi": "video/x-msvideo",
+    "mp3": "audio/mpeg",
+    "wav": "audio/wav",
+    "zip": "application/zip",
+    "gz": "application/gzip",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+}
+
+
+def media_type_for(file_id: str) -> str:
+    """按扩展名推断 Content-Type"""
+    ext = file_id.rsplit(".", 1)[-1].lower()
+    if ext in MEDIA_TYPES:
+        return MEDIA_TYPES[ext]
+    guessed, _ = mimetypes.guess_type(f"file.{ext}")
+    return guessed or "application/octet-stream"
+
+
+class RangeNotSatisfiable(ValueError):
+    """Range 超出文件大小"""
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[tuple[int, int]]:
+    """
+    解析 Range 请求头
+
+    Returns:
+        (start, end) 闭区间；没有可用的单段 Range 时返回 None (返回完整文件)
+
+    Raises:
+        RangeNotSatisfiable: Range 与文件大小不相交
+    """
+    if not header or not header.startswith("bytes="):
+        return None
+    spec = header[len("bytes="):].strip()
+    if "," in spec:
+        return None
+    start_text, sep, end_text = spec.partition("-")
+    if not sep:
+        return None
+    try:
+        start = int(start_text) if start_text else None
+        end = int(end_text) if end_text else None
+    except ValueError:
+        return None
+
+    if start is None:
+        # bytes=-N：最后 N 个字节
+        if end is None:
+            return None
+        if end <= 0 or size == 0:
+            raise RangeNotSatisfiable(spec)
+        return max(size - end, 0), size - 1
+    if end is not None and start > end:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable(spec)
+    return start, size - 1 if end is None else min(end, size - 1)
+
+
+def iter_file(path: Path, start: int, length: int, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """从 start 开始分块读取 length 字节"""
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def file_etag(size: int, mtime: float, sha256: Optional[str] = None) -> str:
+    """强 ETag：优先使用内容哈希"""
+    if sha256:
+        return f'"{sha256}"'
+    return f'"{size:x}-{int(mtime * 1_000_000):x}"'
+
+
+def http_date(timestamp: float) -> str:
+    return formatdate(timestamp, usegmt=True)
@@ -0,0 +1,545 @@
+"""
+Record Index - 记录摘要与二级索引
+
+为每条记录 (最新版本) 保存一份小摘要：元数据 + data.var 中的标量字段，
+并在写入时维护两类二级索引：
+
+- 哈希索引：字段值 -> 记录集合，用于等值 / $in / $ne 查询
+- 有序索引：按值排序的 (值, 记录) 列表，用于 $gt / $gte / $lt / $lte 范围查询
+  (数字和字符串分开排序，ISO 时间字符串可直接做范围比较)
+
+查询语法 (类 MongoDB 的 dict)：
+    {
+        "protocol_id": "quantum_cck8",
+        "var.culture_temp": {"$gt": 37},
+        "updated_at": {"$gte": "2025-12-20"},
+        "$or": [{"alias": "A"}, {"alias": "B"}],
+    }
+
+分页 (page)：按排序字段的有序索引定位游标位置，第 N 页不需要先遍历前 N-1 页。
+游标是上一页最后一项的 (排序值, 键)，编码为不透明字符串。
+
+摘要持久化在 index/ 中 (SummaryStore：快照 + 变更日志)，进程启动后第一次查询
+不需要读取每条记录；其他进程写入后只应用日志中新增的变更。
+"""
+
+import json
+import base64
+import bisect
+from pathlib import Path
+from typing import Any, Iterable, Optional
+
+from .fsutil import atomic_write_text
+from .journal import RecordJournal
+
+# 可查询的元数据字段 (变量字段使用 "var.<name>")
+METADATA_FIELDS = (
+    "id", "alias", "protocol_id", "airalogy_protocol_id", "lab_id", "project_id",
+    "protocol_version", "created_at", "updated_at", "version", "version_count", "size",
+)
+
+# 可查询的文件元数据字段
+FILE_FIELDS = ("id", "file_name", "ext", "size", "uploaded_at", "uploaded_by")
+
+# 排序字段别名
+SORT_ALIASES = {"protocol": "airalogy_protocol_id", "protocol_id": "airalogy_protocol_id", "name": "file_name"}
+
+RANGE_OPERATORS = ("$gt", "$gte", "$lt", "$lte")
+
+
+def _is_scalar(value: Any) -> bool:
+    return value is None or isinstance(value, (str, int, float, bool))
+
+
+def _hash_key(value: Any) -> tuple:
+    """等值索引的键：区分类型 (True != 1)，数字统一为 float (37 == 37.0)"""
+    if isinstance(value, bool):
+        return ("b", value)
+    if isinstance(value, (int, float)):
+        return ("n", float(value))
+    if value is None:
+        return ("z", None)
+    return ("s", str(value))
+
+
+def _sort_kind(value: Any) -> Optional[str]:
+    """有序索引的分类：数字 "n"，字符串 "s"，其他不进入有序索引"""
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return "n"
+    if isinstance(value, str):
+        return "s"
+    return None
+
+
+def summarize_record(record: dict, version_count: int = 1, size: Optional[int] = None) -> dict:
+    """
+    生成记录摘要 (list_records 行 + 标量变量)
+
+    摘要中的 protocol_id 为完整的 airalogy_protocol_id，与 list_records 保持一致；
+    size 为 head 文件的字节数。
+    """
+    metadata = record.get("metadata", {})
+    variables = record.get("data", {}).get("var", {}) or {}
+    return {
+        "id": record.get("airalogy_record_id"),
+        "record_id": record.get("record_id"),
+        "alias": record.get("alias", ""),
+        "protocol_id": metadata.get("airalogy_protocol_id"),
+        "short_protocol_id": metadata.get("protocol_id"),
+        "lab_id": metadata.get("lab_id"),
+        "project_id": metadata.get("project_id"),
+        "protocol_version": metadata.get("protocol_version"),
+        "created_at": metadata.get("record_initial_version_submission_time"),
+        "updated_at": metadata.get("record_current_version_submission_time"),
+        "version": record.get("record_version", 1),
+        "version_count": version_count,
+        "size": size,
+        "var": {k: v for k, v in variables.items() if _is_scalar(v)},
+    }
+
+
+def summarize_file(meta: dict) -> dict:
+    """生成文件摘要 (即 .meta.json 内容，补充扩展名)"""
+    summary = dict(meta)
+    summary.setdefault("ext", str(meta.get("id", "")).rsplit(".", 1)[-1])
+    return summary
+
+
+def encode_cursor(sort: str, value: Any, key: str) -> str:
+    """分页游标：排序字段 + 上一页最后一项的 (值, 键)"""
+    raw = json.dumps([sort, value, key], ensure_ascii=False, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str) -> tuple[Any, str]:
+    """解析分页游标；游标无效或排序字段不一致时抛出 ValueError"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort, value, key = json.loads(raw)
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    if cursor_sort != sort:
+        raise ValueError(f"Cursor was created for sort {cursor_sort!r}, not {sort!r}")
+    return value, key
+
+
+def project(doc: dict, fields: Optional[Iterable[str]]) -> dict:
+    """字段投影：只保留指定字段 (始终包含 id)，"var.<name>" 取单个变量"""
+    if not fields:
+        return doc
+    result = {"id": doc.get("id")}
+    for field in fields:
+        if field.startswith("var."):
+            variables = doc.get("var", {})
+            if field[4:] in variables:
+                result.setdefault("var", {})[field[4:]] = variables[field[4:]]
+        elif field in doc:
+            result[field] = doc[field]
+    return result
+
+
+def _field_values(doc: dict) -> Iterable[tuple[str, Any]]:
+    """摘要中需要索引的 (字段, 值)"""
+    for field in METADATA_FIELDS:
+        if field == "protocol_id":
+            # protocol_id 同时匹配短 ID 和完整 ID
+            yield field, doc.get("short_protocol_id")
+            yield field, doc.get("protocol_id")
+        elif field == "airalogy_protocol_id":
+            yield field, doc.get("protocol_id")
+        else:
+            yield field, doc.get(field)
+    for name, value in doc.get("var", {}).items():
+        yield f"var.{name}", value
+
+
+class SummaryIndex:
+    """
+    摘要表 + 二级索引 (子类指定可查询字段)
+    """
+
+    FIELDS: tuple[str, ...] = ()
+
+    def __init__(self):
+        self.docs: dict[str, dict] = {}
+        self._hash: dict[str, dict[tuple, set[str]]] = {}
+        self._sorted: dict[str, dict[str, list[tuple[Any, str]]]] = {}
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    # ========================================================
+    # 维护
+    # ========================================================
+
+    def upsert(self, key: str, doc: dict) -> None:
+        """新增或替换一条记录摘要"""
+        self.remove(key)
+        self.docs[key] = doc
+        for field, value in self._field_values(doc):
+            self._hash.setdefault(field, {}).setdefault(_hash_key(value), set()).add(key)
+            kind = _sort_kind(value)
+            if kind:
+                entries = self._sorted.setdefault(field, {}).setdefault(kind, [])
+                bisect.insort(entries, (value, key))
+
+    def remove(self, key: str) -> None:
+        """移除一条记录摘要"""
+        doc = self.docs.pop(key, None)
+        if doc is None:
+            return
+        for field, value in self._field_values(doc):
+            bucket = self._hash.get(field, {}).get(_hash_key(value))
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._hash[field][_hash_key(value)]
+            kind = _sort_kind(value)
+            if kind:
+                entries = self._sorted[field][kind]
+                pos = bisect.bisect_left(entries, (value, key))
+                if pos < len(entries) and entries[pos] == (value, key):
+                    del entries[pos]
+
+    def _field_values(self, doc: dict) -> Iterable[tuple[str, Any]]:
+        for field in self.FIELDS:
+            yield field, doc.get(field)
+
+    def _doc_value(self, doc: dict, field: str) -> Any:
+        return doc.get(field)
+
+    # ========================================================
+    # 查询
+    # ========================================================
+
+    def _equal(self, field: str, value: Any) -> set[str]:
+        return set(self._hash.get(field, {}).get(_hash_key(value), ()))
+
+    def _range(self, field: str, op: str, value: Any) -> set[str]:
+        kind = _sort_kind(value)
+        if kind is None:
+            raise ValueError(f"Range operator {op} requires a number or string, got {value!r}")
+        entries = self._sorted.get(field, {}).get(kind, [])
+        # (value, "") 排在同值的所有键之前，(value, "\uffff") 排在之后
+        if op == "$gt":
+            return {k for _, k in entries[bisect.bisect_right(entries, (value, "\uffff")):]}
+        if op == "$gte":
+            return {k for _, k in entries[bisect.bisect_left(entries, (value, "")):]}
+        if op == "$lt":
+            return {k for _, k in entries[:bisect.bisect_left(entries, (value, ""))]}
+        return {k for _, k in entries[:bisect.bisect_right(entries, (value, "\uffff"))]}
+
+    def _match_field(self, field: str, condition: Any) -> set[str]:
+        if field not in self.FIELDS and not field.startswith("var."):
+            raise ValueError(f"Unknown query field: {field}")
+        if not isinstance(condition, dict):
+            return self._equal(field, condition)
+
+        result: Optional[set[str]] = None
+        for op, value in condition.items():
+            if op == "$eq":
+                matched = self._equal(field, value)
+            elif op == "$ne":
+                matched = set(self.docs) - self._equal(field, value)
+            elif op == "$in":
+                matched = set().union(*(self._equal(field, v) for v in value)) if value else set()
+            elif op in RANGE_OPERATORS:
+                matched = self._range(field, op, value)
+            else:
+                raise ValueError(f"Unknown query operator: {op}")
+            result = matched if result is None else result & matched
+        return result if result is not None else set(self.docs)
+
+    def match(self, filter: Optional[dict]) -> set[str]:
+        """返回满足过滤条件的记录键集合"""
+        if not filter:
+            return set(self.docs)
+
+        result: Optional[set[str]] = None
+        for field, condition in filter.items():
+            if field == "$or":
+                matched = set().union(*(self.match(sub) for sub in condition)) if condition else set()
+            elif field == "$and":
+                matched = set(self.docs)
+                for sub in condition:
+                    matched &= self.match(sub)
+            else:
+                matched = self._match_field(field, condition)
+            result = matched if result is None else result & matched
+            if not result:
+                break
+        return result if result is not None else set(self.docs)
+
+    def query(
+        self,
+        filter: Optional[dict] = None,
+        sort: Optional[str] = None,
+        limit: Optional[int] = None,
+        offset: int = 0,
+    ) -> dict:
+        """
+        执行查询
+
+        Args:
+            filter: 过滤条件 (见模块说明)
+            sort: 排序字段，前缀 "-" 表示降序，例如 "-updated_at"、"var.culture_temp"
+            limit: 最多返回条数
+            offset: 跳过条数
+
+        Returns:
+            {"total": 匹配总数, "items": [记录摘要, ...]}
+        """
+        if sort:
+            field, descending = self._sort_field(sort)
+        keys = self.match(filter)
+        docs = [self.docs[k] for k in keys]
+
+        if sort:
+            docs.sort(key=lambda d: d["id"] or "")
+            present = [d for d in docs if _sort_kind(self._doc_value(d, field))]
+            absent = [d for d in docs if not _sort_kind(self._doc_value(d, field))]
+            # 数字排在字符串前面；缺失值始终排在最后
+            present.sort(
+                key=lambda d: (_sort_kind(self._doc_value(d, field)) != "n", self._doc_value(d, field)),
+                reverse=descending,
+            )
+            docs = present + absent
+
+        total = len(docs)
+        end = None if limit is None else offset + limit
+        return {"total": total, "items": docs[offset:end]}
+
+    def _sort_field(self, sort: str) -> tuple[str, bool]:
+        """解析排序参数 (应用别名)，返回 (字段, 是否降序)；未索引的字段抛出 ValueError"""
+        field = sort.lstrip("-+")
+        field = SORT_ALIASES.get(field, field)
+        if field not in self.FIELDS and not field.startswith("var."):
+            raise ValueError(f"Unknown sort field: {field}")
+        return field, sort.startswith("-")
+
+    # ========================================================
+    # 游标分页
+    # ========================================================
+
+    def _ordered(self, field: str, descending: bool, after: Optional[tuple[Any, str]]) -> Iterable[tuple[Any, str]]:
+        """
+        按 (值, 键) 顺序产出 (值, 键)，从游标之后开始
+
+        值的顺序与 query() 一致：升序时数字在字符串前，降序时整体反转
+        (同值的键也按降序)；缺失值按键升序排在最后 (值为 None)。
+        """
+        sorted_lists = self._sorted.get(field, {})
+        groups = ["s", "n"] if descending else ["n", "s"]
+        start_group = 0
+        if after is not None:
+            value, key = after
+            kind = _sort_kind(value)
+            start_group = groups.index(kind) if kind else len(groups)
+
+        for i, kind in enumerate(groups[start_group:], start=start_group):
+            entries = sorted_lists.get(kind, [])
+            if descending:
+                end = len(entries)
+                if after is not None and i == start_group:
+                    end = bisect.bisect_left(entries, after)
+                for pos in range(end - 1, -1, -1):
+                    yield entries[pos]
+            else:
+                begin = 0
+                if after is not None and i == start_group:
+                    begin = bisect.bisect_right(entries, after)
+                for pos in range(begin, len(entries)):
+                    yield entries[pos]
+
+        # 缺失排序值的条目 (数量通常很少)
+        present = {k for entries in sorted_lists.values() for _, k in entries}
+        absent = sorted(k for k in self.docs if k not in present)
+        if after is not None and _sort_kind(after[0]) is None:
+            absent = absent[bisect.bisect_right(absent, after[1]):]
+        for key in absent:
+            yield None, key
+
+    def page(
+        self,
+        filter: Optional[dict] = None,
+        sort: str = "id",
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        fields: Optional[Iterable[str]] = None,
+    ) -> dict:
+        """
+        游标分页查询
+
+        Args:
+            filter: 过滤条件 (见模块说明)
+            sort: 排序字段，前缀 "-" 表示降序；同值按键排序保证顺序稳定
+            limit: 每页条数
+            cursor: 上一页返回的 next_cursor，None 表示第一页
+            fields: 字段投影，例如 ["alias", "updated_at"]
+
+        Returns:
+            {"total": 匹配总数, "items": [...], "next_cursor": 下一页游标或 None}
+        """
+        field, descending = self._sort_field(sort)
+        if limit <= 0:
+            raise ValueError("limit must be positive")
+
+        after = decode_cursor(cursor, sort) if cursor else None
+        matched = self.match(filter) if filter else None
+
+        items, last, next_cursor = [], None, None
+        for value, key in self._ordered(field, descending, after):
+            if matched is not None and key not in matched:
+                continue
+            if len(items) == limit:
+                next_cursor = encode_cursor(sort, *last)
+                break
+            items.append(project(self.docs[key], fields))
+            last = (value, key)
+
+        return {
+            "total": len(self.docs) if matched is None else len(matched),
+            "items": items,
+            "next_cursor": next_cursor,
+        }
+
+
+class RecordIndex(SummaryIndex):
+    """
+    记录摘要表 + 二级索引 (以记录 UUID 为键，每条逻辑记录一项)
+    """
+
+    FIELDS = METADATA_FIELDS
+
+    def _field_values(self, doc: dict) -> Iterable[tuple[str, Any]]:
+        return _field_values(doc)
+
+    def _doc_value(self, doc: dict, field: str) -> Any:
+        if field.startswith("var."):
+            return doc.get("var", {}).get(field[4:])
+        if field == "airalogy_protocol_id":
+            return doc.get("protocol_id")
+        return doc.get(field)
+
+
+class FileIndex(SummaryIndex):
+    """
+    文件元数据表 + 二级索引 (以文件 ID 为键)
+    """
+
+    FIELDS = FILE_FIELDS
+
+
+class SummaryStore:
+    """
+    摘要索引的持久化：快照 (<name>.json) + 追加式变更日志 (<name>.log)
+
+    写入时追加 {"op": "put", "key", "doc"} 或 {"op": "delete", "key"} (调用方持有
+    存储锁)，日志达到 compact_threshold 条时压缩进快照。加载时读取快照并重放日志；
+    其他进程写入后 refresh() 只读取日志新增的行。快照被替换 (其他进程压缩过) 时
+    refresh() 返回 False，调用方重新加载。
+
+    还没有快照时 (首次使用或旧存储) 不记录变更，由第一次查询全量构建后 save()。
+    """
+
+    FORMAT = 1
+
+    def __init__(self, index_dir: Path, name: str, compact_threshold: int = 500):
+        self.index_dir = Path(index_dir)
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        self.snapshot_path = self.index_dir / f"{name}.json"
+        self._log = RecordJournal(self.index_dir / f"{name}.log")
+        self.compact_threshold = compact_threshold
+        # 本进程加载或写入的快照 (mtime, size, inode)
+        self._stamp: Optional[tuple] = None
+
+    @property
+    def active(self) -> bool:
+        """已有快照，写入需要记录变更"""
+        return self.snapshot_path.exists()
+
+    def _stat_snapshot(self) -> Optional[tuple]:
+        try:
+            st = self.snapshot_path.stat()
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def _read_snapshot(self) -> Optional[dict]:
+        try:
+            snapshot = json.loads(self.snapshot_path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            return None
+        if not isinstance(snapshot, dict) or snapshot.get("format") != self.FORMAT:
+            return None
+        return snapshot.get("docs") or {}
+
+    def load(self, index: "SummaryIndex") -> bool:
+        """把快照和日志加载到空的 index；没有可用快照时返回 False (需要全量构建)"""
+        self._stamp = self._stat_snapshot()
+        docs = self._read_snapshot()
+        if docs is None:
+            return False
+        for key, doc in docs.items():
+            index.upsert(key, doc)
+        for entry in self._log.read_all():
+            _apply_change(index, entry)
+        return True
+
+    def refresh(self, index: "SummaryIndex") -> bool:
+        """应用其他进程追加的变更；快照被替换或日志被截断时返回 False"""
+        if self._stat_snapshot() != self._stamp:
+            return False
+        entries = self._log.read_new()
+        # 读取期间被压缩：快照先于日志截断写入，再检查一次即可发现
+        if entries is None or self._stat_snapshot() != self._stamp:
+            return False
+        for entry in entries:
+            _apply_change(index, entry)
+        return True
+
+    def append(self, entry: dict, index: Optional["SummaryIndex"] = None) -> None:
+        """
+        记录一条变更 (调用方持有存储锁)
+
+        Args:
+            index: 本进程已加载且与日志同步的索引，压缩时直接写出其摘要；
+                None 时从快照和日志合并
+        """
+        if not self.active:
+            return
+        if self._log.append(entry) < self.compact_threshold:
+            return
+        if index is not None:
+            docs = index.docs
+        else:
+            docs = self._read_snapshot()
+            if docs is None:
+                return
+            for change in self._log.entries():
+                if change.get("op") == "put":
+                    docs[change["key"]] = change["doc"]
+                else:
+                    docs.pop(change.get("key"), None)
+        self._write(docs)
+
+    def save(self, index: "SummaryIndex") -> None:
+        """把 index 写入快照并清空日志 (调用方持有存储锁)"""
+        self._write(index.docs)
+
+    def _write(self, docs: dict[str, dict]) -> None:
+        atomic_write_text(
+            self.snapshot_path,
+            json.dumps({"format": self.FORMAT, "docs": docs}, ensure_ascii=False, separators=(",", ":")),
+        )
+        self._log.truncate()
+        self._stamp = self._stat_snapshot()
+
+
+def _apply_change(index: "SummaryIndex", entry: dict) -> None:
+    if entry.get("op") == "put":
+        index.upsert(entry["key"], entry["doc"])
+    elif entry.get("op") == "delete":
+        index.remove(entry["key"])
@@ -0,0 +1,134 @@
+"""
+Record Journal - 追加式变更日志
+
+RecordSession 的每次 set_var/set_step/set_check 都以一行紧凑 JSON 追加到
+journal 文件中，save() 时压缩进快照 JSON 并清空日志。
+进程崩溃后重新加载记录时，重放日志即可恢复未保存的修改。
+
+offset 记录本进程已应用到的位置：多个进程共享同一个 Session 时，read_new()
+只读取其他进程在此之后追加的行。
+"""
+
+import os
+import json
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+
+class RecordJournal:
+    """
+    追加式 JSON Lines 日志
+
+    每行一条 delta，例如：
+        {"op":"var","id":"culture_temp","value":37.0,"ts":"2025-12-26T10:00:00"}
+        {"op":"step","id":"open_portal","value":{"checked":true,"annotation":""},"ts":"..."}
+    """
+
+    def __init__(self, path: Path, fsync: bool = False):
+        """
+        Args:
+            path: 日志文件路径
+            fsync: 每次追加后是否 fsync (掉电安全，但更慢)
+        """
+        self.path = Path(path)
+        self.fsync = fsync
+        self._count: Optional[int] = None
+        self.offset = 0
+
+    def append(self, entry: dict[str, Any]) -> int:
+        """
+        追加一条 delta，返回当前日志条数
+
+        只有这一行紧接在 offset 之后时才前移 offset；其他进程在 offset 之后追加过的行
+        (以及这一行) 留给下一次 read_new() 读取，不会被跳过。
+        """
+        line = json.dumps(entry, ensure_ascii=False, separators=(",", ":"), default=str)
+        data = (line + "\n").encode("utf-8")
+        with open(self.path, "ab") as f:
+            f.write(data)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+            end = f.tell()
+        if end - len(data) != self.offset:
+            # 未读的行由 read_new() 计入 _count，这里只统计不缓存
+            return sum(1 for _ in self.entries())
+        self.offset = end
+        if self._count is not None:
+            self._count += 1
+        return self.count()
+
+    def entries(self) -> Iterator[dict[str, Any]]:
+        """按顺序读取所有 delta (跳过崩溃时写了一半的行)"""
+        if not self.path.exists():
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+    def read_new(self) -> Optional[list[dict[str, Any]]]:
+        """
+        读取 offset 之后新追加的完整行并前移 offset
+
+        日志比 offset 短 (被其他进程清空或压缩) 时返回 None，调用方需要重新加载。
+        """
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(0, os.SEEK_END)
+                size = f.tell()
+                if size < self.offset:
+                    return None
+                if size == self.offset:
+                    return []
+                f.seek(self.offset)
+                data = f.read(size - self.offset)
+        except FileNotFoundError:
+            return None if self.offset else []
+        # 正在写入的最后一行留到下次读取
+        end = data.rfind(b"\n") + 1
+        self.offset += end
+        entries = []
+        for line in data[:end].splitlines():
+            if not line.strip():
+                continue
+            try:
+                entries.append(json.loads(line))
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                continue
+        if self._count is not None:
+            self._count += len(entries)
+        return entries
+
+    def read_all(self) -> list[dict[str, Any]]:
+        """从头读取全部完整行，offset 移到已读位置 (同时重新计数)"""
+        self.offset = 0
+        self._count = 0
+        return self.read_new() or []
+
+    def count(self) -> int:
+        """当前日志条数"""
+        if self._count is None:
+            self._count = sum(1 for _ in self.entries())
+        return self._count
+
+    def truncate(self) -> None:
+        """清空日志 (快照已包含全部修改)"""
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+        self._count = 0
+        self.offset = 0
+
+    def move_to(self, new_path: Path) -> None:
+        """重命名日志文件 (记录版本号变化时使用)"""
+        new_path = Path(new_path)
+        if self.path.exists():
+            os.replace(self.path, new_path)
+        self.path = new_path
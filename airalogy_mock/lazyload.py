@@ -0,0 +1,126 @@
+"""
+Lazy Loading - 恢复会话时按需解析大变量
+
+记录以 indent=2 写入 (见 Airalogy._commit_record)，字符串中的换行都会被转义，
+因此 data.var 的每个条目都从缩进 6 个空格的一行开始。懒加载时只按行切分
+data.var：元数据、step/check 和标量变量立即解析，较大的 list/dict 变量
+(例如上千行的表格) 只保留原始 JSON 文本，第一次访问时再解析。保存时仍未访问的
+变量原样写回 (dumps_record)，不需要解析。
+
+文件格式不符合预期 (例如手工编辑或压缩格式的 JSON) 时退回完整解析。
+"""
+
+import re
+import json
+import uuid
+from typing import Any
+
+# 原始 JSON 文本不小于该字节数的 list/dict 变量延迟解析
+LAZY_MIN_BYTES = 4096
+
+_VAR_OPEN = re.compile(r'^    "var": \{$', re.M)
+_VAR_CLOSE = re.compile(r"^    \},?$", re.M)
+_VAR_ENTRY = re.compile(r'^      "', re.M)
+
+_decoder = json.JSONDecoder()
+
+
+class LazyValue:
+    """尚未解析的变量值 (原始 JSON 文本)"""
+
+    __slots__ = ("raw",)
+
+    def __init__(self, raw: str):
+        self.raw = raw
+
+    @property
+    def size(self) -> int:
+        """原始 JSON 文本长度"""
+        return len(self.raw)
+
+    def resolve(self) -> Any:
+        return json.loads(self.raw)
+
+
+def _split_vars(body: str, min_bytes: int) -> dict[str, Any]:
+    starts = [m.start() for m in _VAR_ENTRY.finditer(body)]
+    if body[:starts[0] if starts else len(body)].strip():
+        raise ValueError("Unexpected content in var section")
+
+    variables: dict[str, Any] = {}
+    for i, start in enumerate(starts):
+        end = starts[i + 1] if i + 1 < len(starts) else len(body)
+        entry = body[start:end].strip()
+        if entry.endswith(","):
+            entry = entry[:-1]
+        key, pos = _decoder.raw_decode(entry)
+        if entry[pos:pos + 2] != ": ":
+            raise ValueError(f"Unexpected var entry: {key}")
+        raw = entry[pos + 2:]
+        if len(raw) >= min_bytes and raw[0] in "[{":
+            variables[key] = LazyValue(raw)
+        else:
+            variables[key] = json.loads(raw)
+    return variables
+
+
+def parse_record(text: str, min_bytes: int = LAZY_MIN_BYTES) -> dict:
+    """
+    解析记录 JSON，data.var 中的大变量保留为 LazyValue
+
+    返回的记录只能交给 RecordSession 使用，不能放入读取缓存。
+    """
+    opening = _VAR_OPEN.search(text)
+    if opening is None:
+        return json.loads(text)
+    closing = _VAR_CLOSE.search(text, opening.end())
+    if closing is None:
+        return json.loads(text)
+
+    try:
+        # 去掉 var 的内容后解析其余部分："var": {\n    }
+        record = json.loads(text[:opening.end()] + text[closing.start():])
+        variables = _split_vars(text[opening.end():closing.start()], min_bytes)
+        record["data"]["var"] = variables
+    except (ValueError, KeyError, TypeError):
+        return json.loads(text)
+    return record
+
+
+def has_lazy(record: dict) -> bool:
+    """记录的 data.var 中是否有尚未解析的 LazyValue"""
+    variables = record.get("data", {}).get("var") or {}
+    return any(isinstance(value, LazyValue) for value in variables.values())
+
+
+def resolve_lazy(record: dict) -> dict:
+    """解析记录中全部 LazyValue，返回新的记录 (原记录不变)"""
+    variables = {
+        key: value.resolve() if isinstance(value, LazyValue) else value
+        for key, value in record["data"]["var"].items()
+    }
+    return dict(record, data=dict(record["data"], var=variables))
+
+
+def dumps_record(record: dict) -> str:
+    """
+    以 indent=2 序列化记录，未解析的 LazyValue 原样写回读取时的 JSON 文本
+
+    原始文本来自同样缩进的 data.var 条目，拼接后与完整序列化的结果一致。
+    """
+    if not has_lazy(record):
+        return json.dumps(record, ensure_ascii=False, indent=2)
+    # 占位字符串含 NUL 和随机后缀，不会与变量中的普通字符串冲突
+    prefix = f"\x00lazy-{uuid.uuid4().hex}-"
+    raws: dict[str, str] = {}
+    variables = {}
+    for key, value in record["data"]["var"].items():
+        if isinstance(value, LazyValue):
+            placeholder = f"{prefix}{len(raws)}"
+            raws[json.dumps(placeholder)] = value.raw
+            value = placeholder
+        variables[key] = value
+    text = json.dumps(dict(record, data=dict(record["data"], var=variables)), ensure_ascii=False, indent=2)
+    for placeholder, raw in raws.items():
+        text = text.replace(placeholder, raw, 1)
+    return text
@@ -0,0 +1,130 @@
+"""
+Store Locking - 多进程共享存储目录时的写入协调
+
+VS Code 后端、用户 assigner.py (通过 patch 后的 SDK) 和 FastAPI 服务
+可能同时使用同一个 AIRALOGY_STORAGE_DIR：
+
+- StoreLock：存储目录级的咨询锁 (POSIX fcntl.flock，Windows msvcrt.locking)，
+  所有写入 (记录、文件元数据、活跃会话标记) 都在锁内完成。同一进程内
+  同一路径共享一个锁对象，并且可重入。
+- GenerationCounter：每次写入后递增的代数计数器。进程内的缓存/索引
+  读取前比较代数，发现其他进程修改了存储就丢弃重建。
+
+读取不加锁：所有文件都通过原子重命名写入，读者只会看到完整文件。
+"""
+
+import os
+import threading
+from pathlib import Path
+from typing import Optional
+
+from .fsutil import atomic_write_text
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+def _lock_fd(fd: int) -> None:
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        return
+    while True:
+        try:
+            # LK_LOCK 重试约 10 秒后抛出 OSError，继续等待
+            msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+            return
+        except OSError:
+            continue
+
+
+def _unlock_fd(fd: int) -> None:
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+class StoreLock:
+    """
+    可重入的进程间排他锁
+
+    用 StoreLock.for_path() 获取，同一进程内同一路径返回同一个对象
+    (flock 按打开的文件描述符加锁，多个对象会互相阻塞)。
+    """
+
+    _registry: dict[str, "StoreLock"] = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._fd: Optional[int] = None
+
+    @classmethod
+    def for_path(cls, path: Path) -> "StoreLock":
+        """获取 (或创建) 该路径的锁对象"""
+        key = os.path.abspath(path)
+        with cls._registry_lock:
+            lock = cls._registry.get(key)
+            if lock is None:
+                lock = cls._registry[key] = cls(Path(key))
+            return lock
+
+    def acquire(self) -> None:
+        self._thread_lock.acquire()
+        if self._depth == 0:
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                _lock_fd(fd)
+            except BaseException:
+                self._thread_lock.release()
+                raise
+            self._fd = fd
+        self._depth += 1
+
+    def release(self) -> None:
+        self._depth -= 1
+        if self._depth == 0:
+            fd, self._fd = self._fd, None
+            try:
+                _unlock_fd(fd)
+            finally:
+                os.close(fd)
+        self._thread_lock.release()
+
+    def __enter__(self) -> "StoreLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+
+class GenerationCounter:
+    """
+    存储代数计数器 (一个只包含整数的小文件)
+
+    bump() 需要在 StoreLock 内调用。
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+
+    def read(self) -> int:
+        """读取当前代数，文件不存在时为 0"""
+        try:
+            return int(self.path.read_text().strip() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def bump(self) -> int:
+        """代数加一，返回新值"""
+        value = self.read() + 1
+        atomic_write_text(self.path, str(value))
+        return value
@@ -0,0 +1,183 @@
+"""
+Merkle 哈希 - Record 数据的分段哈希
+
+每个 var/step/check 条目单独计算叶子哈希，按 section 汇总为 section 哈希，
+再合并为 Merkle 根。修改某个条目只需重新计算它自己的叶子和所在 section，
+不必重新序列化整个 data 块。
+
+Record 中的结构：
+    metadata.sha1   = Merkle 根 (可由 metadata.merkle 重新推导)
+    metadata.merkle = {"sections": {"var": ..., "step": ..., "check": ...},
+                       "leaves": {"var": {"<id>": "<sha1>"}, ...}}
+
+借助叶子哈希可以对比两个版本的差异，或只校验部分条目。
+metadata.sha1 不再是整块 data 的哈希 (旧公式见 content_sha1)；校验请用 verify_record()，
+它同时支持两种格式。
+"""
+
+import json
+import hashlib
+from typing import Any, Iterable, Optional
+
+SECTIONS = ("var", "step", "check")
+
+
+def _sha1(text: str) -> str:
+    return hashlib.sha1(text.encode()).hexdigest()
+
+
+def content_sha1(data: dict) -> str:
+    """旧版 sha1：对整个 data 块排序序列化后哈希 (用于校验旧记录)"""
+    return _sha1(json.dumps(data, sort_keys=True, ensure_ascii=False))
+
+
+def hash_leaf(key: str, value: Any) -> str:
+    """单个条目的叶子哈希"""
+    return _sha1(json.dumps([key, value], sort_keys=True, ensure_ascii=False, default=str))
+
+
+def hash_section(leaves: dict[str, str]) -> str:
+    """由叶子哈希计算 section 哈希"""
+    return _sha1("\n".join(f"{key}:{leaves[key]}" for key in sorted(leaves)))
+
+
+def hash_root(sections: dict[str, str]) -> str:
+    """由 section 哈希计算 Merkle 根"""
+    return _sha1("\n".join(f"{name}:{sections.get(name, '')}" for name in SECTIONS))
+
+
+class MerkleHasher:
+    """
+    增量 Merkle 哈希缓存
+
+    调用 invalidate() 标记被修改的条目，compute() 只重新计算这些条目
+    (以及新增/删除的键)，其余叶子哈希直接复用。
+
+    注意：直接原地修改 get_var() 返回的 list/dict 不会自动失效，
+    需要再调用一次 set_var()。
+    """
+
+    def __init__(self):
+        self._leaves: dict[str, dict[str, str]] = {name: {} for name in SECTIONS}
+        self._sections: dict[str, Optional[str]] = {name: None for name in SECTIONS}
+        self._dirty: dict[str, set[str]] = {name: set() for name in SECTIONS}
+        self._root: Optional[str] = None
+
+    @classmethod
+    def from_tree(cls, tree: Optional[dict]) -> "MerkleHasher":
+        """从已保存的 metadata.merkle 恢复叶子哈希"""
+        hasher = cls()
+        if tree:
+            for name in SECTIONS:
+                hasher._leaves[name] = dict(tree.get("leaves", {}).get(name, {}))
+        return hasher
+
+    def invalidate(self, section: str, keys: Optional[Iterable[str]] = None) -> None:
+        """标记条目已修改；keys 为 None 时整个 section 重新计算"""
+        if keys is None:
+            self._leaves[section] = {}
+        else:
+            self._dirty[section].update(keys)
+        self._sections[section] = None
+        self._root = None
+
+    def has_leaf(self, section: str, key: str) -> bool:
+        """条目的叶子哈希是否可以直接复用 (compute() 不需要读取它的值)"""
+        return key in self._leaves[section] and key not in self._dirty[section]
+
+    def compute(self, data: dict) -> dict:
+        """计算 Merkle 树，返回 {"root", "sections", "leaves"}"""
+        for name in SECTIONS:
+            entries = data.get(name) or {}
+            leaves = self._leaves[name]
+            dirty = self._dirty[name]
+
+            # 新增的键 (例如批量加载) 和已删除的键
+            missing = entries.keys() - leaves.keys()
+            removed = leaves.keys() - entries.keys()
+            if dirty or missing or removed or self._sections[name] is None:
+                for key in removed:
+                    del leaves[key]
+                for key in (dirty | missing) & entries.keys():
+                    leaves[key] = hash_leaf(key, entries[key])
+                dirty.clear()
+                self._sections[name] = hash_section(leaves)
+                self._root = None
+
+        if self._root is None:
+            self._root = hash_root(self._sections)
+
+        return {
+            "root": self._root,
+            "sections": dict(self._sections),
+            "leaves": {name: dict(self._leaves[name]) for name in SECTIONS},
+        }
+
+
+def compute_merkle(data: dict) -> dict:
+    """一次性计算完整 Merkle 树"""
+    return MerkleHasher().compute(data)
+
+
+def verify_record(record: dict, sections: Optional[Iterable[str]] = None, keys: Optional[Iterable[str]] = None) -> bool:
+    """
+    校验 Record 数据与其哈希是否一致
+
+    Args:
+        record: 完整 Record
+        sections: 只校验这些 section 的叶子 (默认全部)
+        keys: 只校验这些条目 ID (与 sections 组合使用)
+
+    没有 metadata.merkle 的旧记录退回到整块 sha1 校验。
+    """
+    metadata = record.get("metadata", {})
+    data = record.get("data", {})
+    tree = metadata.get("merkle")
+    if not tree:
+        return metadata.get("sha1") == content_sha1(data)
+
+    leaves = tree.get("leaves", {})
+    # 先确认存储的结构自洽：叶子 -> section -> 根
+    stored_sections = {name: hash_section(leaves.get(name, {})) for name in SECTIONS}
+    if stored_sections != tree.get("sections") or hash_root(stored_sections) != metadata.get("sha1"):
+        return False
+
+    wanted_keys = set(keys) if keys is not None else None
+    for name in sections or SECTIONS:
+        entries = data.get(name) or {}
+        section_leaves = leaves.get(name, {})
+        if wanted_keys is None and entries.keys() != section_leaves.keys():
+            return False
+        for key, value in entries.items():
+            if wanted_keys is not None and key not in wanted_keys:
+                continue
+            if section_leaves.get(key) != hash_leaf(key, value):
+                return False
+    return True
+
+
+def diff_merkle(old_tree: dict, new_tree: dict) -> dict[str, dict[str, list[str]]]:
+    """
+    对比两个版本的 Merkle 树，返回每个 section 新增/删除/修改的条目 ID
+
+    section 哈希相同时直接跳过，不比较叶子。
+    """
+    result = {}
+    old_sections = old_tree.get("sections", {})
+    new_sections = new_tree.get("sections", {})
+    for name in SECTIONS:
+        if old_sections.get(name) and old_sections.get(name) == new_sections.get(name):
+            continue
+        old_leaves = old_tree.get("leaves", {}).get(name, {})
+        new_leaves = new_tree.get("leaves", {}).get(name, {})
+        changes = {
+            "added": sorted(new_leaves.keys() - old_leaves.keys()),
+            "removed": sorted(old_leaves.keys() - new_leaves.keys()),
+            "changed": sorted(
+                key for key in old_leaves.keys() & new_leaves.keys()
+                if old_leaves[key] != new_leaves[key]
+            ),
+        }
+        if any(changes.values()):
+            result[name] = changes
+    return result
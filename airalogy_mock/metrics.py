@@ -0,0 +1,272 @@
+"""
+Metrics - Prometheus 文本格式的运行指标
+
+不依赖 prometheus_client：一个线程安全的小型注册表 (Counter / Histogram /
+回调指标) 加一个纯 ASGI 中间件，GET /metrics 返回 Prometheus 文本格式 (0.0.4)，
+可以直接被 Prometheus 抓取，也可以用 curl 查看。
+
+中间件按路由模板 (例如 /api/records/{record_id}) 统计，避免标签基数随 ID 增长：
+
+    airalogy_http_requests_total{method, route, status}
+    airalogy_http_request_duration_seconds{method, route}          (histogram)
+    airalogy_http_request_body_bytes_total{route}                  上传
+    airalogy_http_response_body_bytes_total{route}                 下载 (含流式响应)
+"""
+
+import math
+import time
+import threading
+from typing import Any, Callable, Iterable, Optional
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# 秒；覆盖从缓存命中到较慢的 Assigner 计算
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[Any]) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    metric_type = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.metric_type}"]
+
+    def render(self) -> list[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """单调递增计数器"""
+
+    metric_type = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple[str, ...] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: Any) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in items
+        ]
+
+
+class Histogram(_Metric):
+    """累积分桶直方图 (_bucket / _sum / _count)"""
+
+    metric_type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # {labels: [各桶计数 (非累积)..., sum, count]}
+        self._values: dict[tuple, list[float]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    def count(self, **labels: Any) -> int:
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return state[-1] if state else 0
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = sorted((key, list(state)) for key, state in self._values.items())
+        lines = self.header()
+        names = self.labelnames + ("le",)
+        for key, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                labels = _format_labels(names, key + (_format_value(bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(state[-2])}")
+            lines.append(f"{self.name}_count{labels} {state[-1]}")
+        return lines
+
+
+class CallbackMetric(_Metric):
+    """抓取时调用函数取值 (活跃会话数、缓存命中等已由其他组件统计的值)"""
+
+    def __init__(self, name: str, help_text: str, func: Callable[[], float], metric_type: str = "gauge"):
+        super().__init__(name, help_text)
+        self.metric_type = metric_type
+        self._func = func
+
+    def render(self) -> list[str]:
+        try:
+            value = float(self._func())
+        except Exception:
+            return []  # 数据源暂不可用时跳过，不影响其他指标
+        return self.header() + [f"{self.name} {_format_value(value)}"]
+
+
+class MetricsRegistry:
+    """指标注册表"""
+
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> Any:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Duplicate metric: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def callback(
+        self,
+        name: str,
+        help_text: str,
+        func: Callable[[], float],
+        metric_type: str = "gauge",
+    ) -> CallbackMetric:
+        return self._register(CallbackMetric(name, help_text, func, metric_type))
+
+    def render(self) -> str:
+        """Prometheus 文本格式"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: list[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """
+    统计 HTTP 请求数、延迟和收发字节数的 ASGI 中间件
+
+    路由模板从 scope["route"] 读取 (路由匹配后由 FastAPI 写入)，未匹配的请求记为 unmatched。
+    WebSocket 和 lifespan 不统计。
+    """
+
+    def __init__(self, app: Any, registry: MetricsRegistry, prefix: str = "airalogy"):
+        self.app = app
+        self.requests = registry.counter(
+            f"{prefix}_http_requests_total", "HTTP requests by route and status",
+            ("method", "route", "status"),
+        )
+        self.latency = registry.histogram(
+            f"{prefix}_http_request_duration_seconds", "HTTP request latency",
+            ("method", "route"),
+        )
+        self.received = registry.counter(
+            f"{prefix}_http_request_body_bytes_total", "Request body bytes received (uploads)",
+            ("route",),
+        )
+        self.sent = registry.counter(
+            f"{prefix}_http_response_body_bytes_total", "Response body bytes sent (downloads)",
+            ("route",),
+        )
+
+    async def __call__(self, scope: dict, receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+        received = 0
+        sent = 0
+
+        async def counting_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+            return message
+
+        async def counting_send(message: dict):
+            nonlocal status, sent
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                sent += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, counting_receive, counting_send)
+        finally:
+            route = self._route(scope)
+            method = scope.get("method", "")
+            self.requests.inc(method=method, route=route, status=status)
+            self.latency.observe(time.perf_counter() - started, method=method, route=route)
+            if received:
+                self.received.inc(received, route=route)
+            if sent:
+                self.sent.inc(sent, route=route)
+
+    @staticmethod
+    def _route(scope: dict) -> str:
+        route: Optional[Any] = scope.get("route")
+        return getattr(route, "path", None) or "unmatched"
@@ -0,0 +1,84 @@
+"""
+NDJSON - 记录批量导出/导入的流式编码
+
+每行一条完整 Record JSON。导出时逐条读取、逐行产出，可选 gzip 压缩；
+导入时逐行解析，自动识别 gzip。内存占用与记录总数无关。
+"""
+
+import json
+import zlib
+from typing import Any, BinaryIO, Iterable, Iterator
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+# gzip 流每隔多少行 flush 一次，保证客户端尽快收到数据
+GZIP_FLUSH_LINES = 100
+
+READ_CHUNK_SIZE = 64 * 1024
+
+
+def dumps_line(obj: Any) -> bytes:
+    """编码为一行 NDJSON"""
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+def gzip_chunks(lines: Iterable[bytes], flush_lines: int = GZIP_FLUSH_LINES) -> Iterator[bytes]:
+    """
+    把逐行数据压缩为 gzip 流
+
+    第一行之后立即 flush (客户端马上收到 gzip 头和首条记录)，
+    之后每 flush_lines 行 flush 一次。
+    """
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    for count, line in enumerate(lines, start=1):
+        chunk = compressor.compress(line)
+        if count == 1 or count % flush_lines == 0:
+            chunk += compressor.flush(zlib.Z_SYNC_FLUSH)
+        if chunk:
+            yield chunk
+    yield compressor.flush()
+
+
+def _decompressed(stream: BinaryIO, head: bytes) -> Iterator[bytes]:
+    decompressor = zlib.decompressobj(wbits=zlib.MAX_WBITS | 16)
+    chunk = head
+    while chunk:
+        data = decompressor.decompress(chunk)
+        if data:
+            yield data
+        if decompressor.eof and decompressor.unused_data:
+            # 多成员 gzip (例如 cat a.gz b.gz)
+            rest = decompressor.unused_data
+            decompressor = zlib.decompressobj(wbits=zlib.MAX_WBITS | 16)
+            chunk = rest
+            continue
+        chunk = stream.read(READ_CHUNK_SIZE)
+    data = decompressor.flush()
+    if data:
+        yield data
+
+
+def iter_lines(stream: BinaryIO) -> Iterator[bytes]:
+    """逐行读取二进制流 (gzip 自动解压)，跳过空行"""
+    head = stream.read(READ_CHUNK_SIZE)
+    if head.startswith(GZIP_MAGIC):
+        chunks = _decompressed(stream, head)
+    else:
+        chunks = iter(lambda: stream.read(READ_CHUNK_SIZE), b"")
+        chunks = _prepend(head, chunks)
+
+    pending = b""
+    for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield line
+    if pending.strip():
+        yield pending
+
+
+def _prepend(head: bytes, chunks: Iterator[bytes]) -> Iterator[bytes]:
+    if head:
+        yield head
+    yield from chunks
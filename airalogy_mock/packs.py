@@ -0,0 +1,241 @@
+"""
+Pack Store - 冷数据打包存储
+
+把大量小文件 (历史版本、文件元数据) 打包成一个压缩包文件，减少
+目录扫描、备份和小文件开销：
+
+    packs/<name>.<n>.pack       各对象独立压缩后依次拼接
+    packs/<name>.idx.json       偏移索引 {"pack", "codec", "entries": {key: [offset, length]}}
+
+按 key 随机读取只需查索引、seek 并解压单个对象。压缩默认使用 zstd
+(需要安装 zstandard)，否则使用 zlib。早期写入的索引把 zlib 记作 "gzip"，读取时按别名处理。
+
+索引按 mtime 校验缓存，其他进程重写索引后自动重新加载。
+写入 (rewrite/remove) 需要调用方持有存储锁。
+"""
+
+import os
+import json
+import zlib
+import bisect
+import threading
+from pathlib import Path
+from typing import Iterable, Optional
+
+from .fsutil import atomic_write_text
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+# 旧名称 -> 实际编码 (对象一直是 zlib 流，不是 gzip 格式)
+CODEC_ALIASES = {"gzip": "zlib"}
+
+
+def normalize_codec(codec: str) -> str:
+    return CODEC_ALIASES.get(codec, codec)
+
+
+def default_codec() -> str:
+    """可用时使用 zstd，否则 zlib"""
+    return "zstd" if zstandard is not None else "zlib"
+
+
+def compress(data: bytes, codec: str) -> bytes:
+    codec = normalize_codec(codec)
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstd codec requires the 'zstandard' package")
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    if codec == "zlib":
+        return zlib.compress(data, 6)
+    raise ValueError(f"Unknown pack codec: {codec}")
+
+
+def decompress(data: bytes, codec: str) -> bytes:
+    codec = normalize_codec(codec)
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Reading zstd packs requires the 'zstandard' package")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == "zlib":
+        return zlib.decompress(data)
+    raise ValueError(f"Unknown pack codec: {codec}")
+
+
+class PackStore:
+    """
+    单个对象类别的打包存储 (例如 "history"、"file_meta")
+    """
+
+    def __init__(self, pack_dir: Path, name: str):
+        self.pack_dir = Path(pack_dir)
+        self.name = name
+        self.index_path = self.pack_dir / f"{name}.idx.json"
+        self._lock = threading.Lock()
+        self._validator = None
+        self._index: dict = {"pack": None, "codec": "zlib", "entries": {}}
+        self._sorted_keys: list[str] = []
+
+    # ========================================================
+    # 索引
+    # ========================================================
+
+    def _load(self) -> dict:
+        """读取索引 (按 mtime/inode 缓存)"""
+        try:
+            st = self.index_path.stat()
+            validator = (st.st_mtime_ns, st.st_size, st.st_ino)
+        except FileNotFoundError:
+            validator = None
+        with self._lock:
+            if validator != self._validator:
+                if validator is None:
+                    index = {"pack": None, "codec": "zlib", "entries": {}}
+                else:
+                    index = json.loads(self.index_path.read_text(encoding="utf-8"))
+                self._index = index
+                self._sorted_keys = sorted(index["entries"])
+                self._validator = validator
+            return self._index
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._load()["entries"]
+
+    def __len__(self) -> int:
+        return len(self._load()["entries"])
+
+    def keys(self) -> list[str]:
+        """所有 key (升序)"""
+        self._load()
+        return list(self._sorted_keys)
+
+    def keys_with_prefix(self, prefix: str) -> list[str]:
+        """以 prefix 开头的 key (二分查找)"""
+        self._load()
+        keys = self._sorted_keys
+        start = bisect.bisect_left(keys, prefix)
+        end = bisect.bisect_left(keys, prefix + "\uffff")
+        return keys[start:end]
+
+    # ========================================================
+    # 读取
+    # ========================================================
+
+    def _read_raw(self, index: dict, key: str) -> Optional[bytes]:
+        entry = index["entries"].get(key)
+        if entry is None:
+            return None
+        offset, length = entry
+        with open(self.pack_dir / index["pack"], "rb") as f:
+            f.seek(offset)
+            return f.read(length)
+
+    def get(self, key: str) -> Optional[bytes]:
+        """按 key 读取对象，不存在返回 None"""
+        index = self._load()
+        try:
+            raw = self._read_raw(index, key)
+        except FileNotFoundError:
+            # 包文件刚被其他进程重写：强制重新加载索引再试一次
+            with self._lock:
+                self._validator = None
+            index = self._load()
+            raw = self._read_raw(index, key)
+        return None if raw is None else decompress(raw, index["codec"])
+
+    def items(self) -> Iterable[tuple[str, bytes]]:
+        """顺序读取全部对象"""
+        index = self._load()
+        if not index["pack"]:
+            return
+        codec = index["codec"]
+        with open(self.pack_dir / index["pack"], "rb") as f:
+            for key, (offset, length) in sorted(index["entries"].items(), key=lambda kv: kv[1][0]):
+                f.seek(offset)
+                yield key, decompress(f.read(length), codec)
+
+    # ========================================================
+    # 写入 (需持有存储锁)
+    # ========================================================
+
+    def rewrite(self, new_items: dict[str, bytes], remove: Iterable[str] = (), codec: Optional[str] = None) -> dict:
+        """
+        写入新包：保留现有对象 (去掉 remove)，加入 new_items，替换索引后删除旧包
+
+        Returns:
+            {"objects", "pack_bytes"}
+        """
+        codec = normalize_codec(codec or default_codec())
+        index = self._load()
+        removed = set(remove) | set(new_items)
+        old_pack = index["pack"]
+        old_codec = normalize_codec(index["codec"])
+
+        self.pack_dir.mkdir(parents=True, exist_ok=True)
+        serial = int(old_pack.split(".")[-2]) + 1 if old_pack else 1
+        pack_name = f"{self.name}.{serial}.pack"
+        tmp_path = self.pack_dir / f".{pack_name}.tmp"
+
+        entries = {}
+        with open(tmp_path, "wb") as out:
+            if old_pack:
+                with open(self.pack_dir / old_pack, "rb") as src:
+                    for key, (offset, length) in index["entries"].items():
+                        if key in removed:
+                            continue
+                        src.seek(offset)
+                        raw = src.read(length)
+                        if old_codec != codec:
+                            raw = compress(decompress(raw, old_codec), codec)
+                        entries[key] = [out.tell(), len(raw)]
+                        out.write(raw)
+            for key, data in new_items.items():
+                raw = compress(data, codec)
+                entries[key] = [out.tell(), len(raw)]
+                out.write(raw)
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp_path, self.pack_dir / pack_name)
+
+        atomic_write_text(self.index_path, json.dumps(
+            {"pack": pack_name, "codec": codec, "entries": entries},
+            separators=(",", ":"),
+        ))
+        if old_pack and old_pack != pack_name:
+            try:
+                (self.pack_dir / old_pack).unlink()
+            except FileNotFoundError:
+                pass
+        return {"objects": len(entries), "pack_bytes": (self.pack_dir / pack_name).stat().st_size}
+
+    def remove(self, keys: Iterable[str]) -> int:
+        """从索引中删除对象 (包内数据在下次 rewrite 时回收)，返回删除数量"""
+        keys = [k for k in keys if k in self]
+        if not keys:
+            return 0
+        index = dict(self._load())
+        entries = dict(index["entries"])
+        for key in keys:
+            entries.pop(key, None)
+        index["entries"] = entries
+        atomic_write_text(self.index_path, json.dumps(index, separators=(",", ":")))
+        return len(keys)
+
+    def stats(self) -> dict:
+        """{"objects", "pack_bytes", "live_bytes", "codec"}"""
+        index = self._load()
+        pack_bytes = 0
+        if index["pack"]:
+            try:
+                pack_bytes = (self.pack_dir / index["pack"]).stat().st_size
+            except FileNotFoundError:
+                pass
+        return {
+            "objects": len(index["entries"]),
+            "pack_bytes": pack_bytes,
+            "live_bytes": sum(length for _, length in index["entries"].values()),
+            "codec": normalize_codec(index["codec"]),
+        }
@@ -0,0 +1,292 @@
+"""
+Search Index - 记录内容全文检索
+
+对每条记录 (最新版本) 的别名、字符串变量、步骤/检查点批注建立倒排索引，
+按 BM25 排序返回结果和摘要片段，检索时不需要打开记录文件。
+
+持久化在 .airalogy_mock/index/ 目录：
+    search.json   索引快照 (各记录的可检索文本)
+    search.log    快照之后的增量修改 (追加式，写入记录时只追加一行)
+
+中文按相邻两字 (bigram) 切分，英文/数字按单词切分。
+"""
+
+import re
+import json
+import math
+from pathlib import Path
+from typing import Any, Optional
+
+from .fsutil import atomic_write_text
+from .journal import RecordJournal
+
+_TOKEN_RE = re.compile(r"[a-z0-9_]+|[\u3400-\u9fff\uf900-\ufaff]+")
+_CJK_RE = re.compile(r"[\u3400-\u9fff\uf900-\ufaff]")
+
+SNIPPET_RADIUS = 30
+
+
+def tokenize(text: str) -> list[str]:
+    """切分为检索词：英文单词 + 中文 bigram"""
+    tokens = []
+    for run in _TOKEN_RE.findall(text.lower()):
+        if _CJK_RE.match(run):
+            if len(run) == 1:
+                tokens.append(run)
+            else:
+                tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.append(run)
+    return tokens
+
+
+def extract_search_fields(record: dict) -> dict[str, str]:
+    """提取记录中可检索的文本字段"""
+    fields = {}
+    if record.get("alias"):
+        fields["alias"] = str(record["alias"])
+    data = record.get("data", {})
+    for name, value in (data.get("var") or {}).items():
+        if isinstance(value, str) and value and not value.startswith("airalogy.id."):
+            fields[f"var.{name}"] = value
+    for section in ("step", "check"):
+        for item_id, item in (data.get(section) or {}).items():
+            if isinstance(item, dict) and item.get("annotation"):
+                fields[f"{section}.{item_id}"] = str(item["annotation"])
+    return fields
+
+
+def _snippet(text: str, terms: set[str]) -> Optional[str]:
+    lowered = text.lower()
+    positions = [lowered.find(term) for term in terms]
+    positions = [pos for pos in positions if pos >= 0]
+    if not positions:
+        return None
+    pos = min(positions)
+    start = max(0, pos - SNIPPET_RADIUS)
+    end = min(len(text), pos + SNIPPET_RADIUS)
+    return ("…" if start > 0 else "") + text[start:end] + ("…" if end < len(text) else "")
+
+
+class SearchIndex:
+    """
+    增量倒排索引
+
+    写入记录时调用 put()/delete() 只追加一行日志；检索时加载快照并重放日志。
+    日志达到 compact_threshold 条时压缩进快照 (写入和加载时都会检查)。
+    其他进程写入后 refresh() 只重放日志中新增的行。
+    """
+
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self, index_dir: Path, compact_threshold: int = 200):
+        """
+        Args:
+            index_dir: 索引目录
+            compact_threshold: 日志达到多少条后压缩进快照
+        """
+        self.index_dir = Path(index_dir)
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        self.snapshot_path = self.index_dir / "search.json"
+        self._log = RecordJournal(self.index_dir / "search.log")
+        self.compact_threshold = compact_threshold
+
+        self._loaded = False
+        # 本进程加载或写入的快照 (mtime, size, inode)
+        self._stamp: Optional[tuple] = None
+        self._docs: dict[str, dict[str, Any]] = {}
+        self._postings: dict[str, dict[str, int]] = {}
+        self._total_length = 0
+
+    @property
+    def needs_rebuild(self) -> bool:
+        """没有快照 (首次使用或已损坏)，需要扫描全部记录重建"""
+        return not self.snapshot_path.exists()
+
+    # ========================================================
+    # 维护
+    # ========================================================
+
+    def put(self, key: str, record: dict) -> None:
+        """新增或更新一条记录"""
+        entry = {
+            "op": "put",
+            "key": key,
+            "id": record.get("airalogy_record_id"),
+            "fields": extract_search_fields(record),
+        }
+        self._append(entry)
+
+    def delete(self, key: str) -> None:
+        """删除一条记录"""
+        self._append({"op": "delete", "key": key})
+
+    def _append(self, entry: dict) -> None:
+        """
+        追加日志；日志过长时压缩 (调用方持有存储锁)
+
+        还没有快照时日志只包含部分记录，不能压缩成快照：继续追加，
+        由第一次检索时的 rebuild() 扫描全部记录生成快照。
+        """
+        count = self._log.append(entry)
+        if self._loaded:
+            self._apply(entry)
+        if count >= self.compact_threshold and not self.needs_rebuild:
+            if self._loaded:
+                self.compact()
+            else:
+                self.load()
+
+    def rebuild(self, records: dict[str, dict]) -> None:
+        """从全部记录重建索引并写入快照"""
+        self._reset()
+        for key, record in records.items():
+            self._apply({
+                "op": "put",
+                "key": key,
+                "id": record.get("airalogy_record_id"),
+                "fields": extract_search_fields(record),
+            })
+        self._loaded = True
+        self.compact()
+
+    def compact(self) -> None:
+        """把当前内存索引写入快照，并清空日志"""
+        snapshot = {
+            key: {"id": doc["id"], "fields": doc["fields"]}
+            for key, doc in self._docs.items()
+        }
+        atomic_write_text(self.snapshot_path, json.dumps(snapshot, ensure_ascii=False))
+        self._log.truncate()
+        self._stamp = self._stat_snapshot()
+
+    def load(self) -> None:
+        """加载快照并重放日志"""
+        self._reset()
+        self._stamp = self._stat_snapshot()
+        if self.snapshot_path.exists():
+            try:
+                snapshot = json.loads(self.snapshot_path.read_text(encoding="utf-8"))
+            except json.JSONDecodeError:
+                snapshot = {}
+            for key, doc in snapshot.items():
+                self._apply({"op": "put", "key": key, "id": doc["id"], "fields": doc["fields"]})
+        for entry in self._log.read_all():
+            self._apply(entry)
+        self._loaded = True
+        if self._log.count() >= self.compact_threshold and not self.needs_rebuild:
+            self.compact()
+
+    def refresh(self) -> None:
+        """
+        应用其他进程追加的日志
+
+        快照被替换 (其他进程压缩过) 或日志被截断时丢弃内存索引，下次检索时重新加载。
+        """
+        if not self._loaded:
+            return
+        if self._stat_snapshot() != self._stamp:
+            self._reset()
+            return
+        entries = self._log.read_new()
+        # 读取期间被压缩：快照先于日志截断写入，再检查一次即可发现
+        if entries is None or self._stat_snapshot() != self._stamp:
+            self._reset()
+            return
+        for entry in entries:
+            self._apply(entry)
+
+    def invalidate(self) -> None:
+        """丢弃内存索引，下次检索时重新从磁盘加载"""
+        self._reset()
+
+    def _stat_snapshot(self) -> Optional[tuple]:
+        try:
+            st = self.snapshot_path.stat()
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def _reset(self) -> None:
+        self._docs = {}
+        self._postings = {}
+        self._total_length = 0
+        self._loaded = False
+
+    def _apply(self, entry: dict) -> None:
+        key = entry["key"]
+        old = self._docs.pop(key, None)
+        if old is not None:
+            for term in old["terms"]:
+                postings = self._postings.get(term)
+                if postings is not None:
+                    postings.pop(key, None)
+                    if not postings:
+                        del self._postings[term]
+            self._total_length -= old["length"]
+        if entry["op"] != "put":
+            return
+
+        terms: dict[str, int] = {}
+        for text in entry["fields"].values():
+            for token in tokenize(text):
+                terms[token] = terms.get(token, 0) + 1
+        length = sum(terms.values())
+        self._docs[key] = {
+            "id": entry["id"],
+            "fields": entry["fields"],
+            "terms": terms,
+            "length": length,
+        }
+        for term, tf in terms.items():
+            self._postings.setdefault(term, {})[key] = tf
+        self._total_length += length
+
+    # ========================================================
+    # 检索
+    # ========================================================
+
+    def search(self, query: str, limit: int = 20) -> list[dict]:
+        """
+        BM25 排序检索
+
+        Returns:
+            [{"id", "score", "alias", "snippets": [{"field", "text"}]}, ...]
+        """
+        if not self._loaded:
+            self.load()
+
+        terms = set(tokenize(query))
+        if not terms or not self._docs:
+            return []
+
+        n_docs = len(self._docs)
+        avg_length = self._total_length / n_docs if n_docs else 0
+        scores: dict[str, float] = {}
+        for term in terms:
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for key, tf in postings.items():
+                length = self._docs[key]["length"]
+                norm = tf + self.K1 * (1 - self.B + self.B * length / (avg_length or 1))
+                scores[key] = scores.get(key, 0.0) + idf * tf * (self.K1 + 1) / norm
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+        results = []
+        for key, score in ranked:
+            doc = self._docs[key]
+            snippets = []
+            for field, text in doc["fields"].items():
+                snippet = _snippet(text, terms)
+                if snippet:
+                    snippets.append({"field": field, "text": snippet})
+            results.append({
+                "id": doc["id"],
+                "score": round(score, 4),
+                "alias": doc["fields"].get("alias", ""),
+                "snippets": snippets,
+            })
+        return results
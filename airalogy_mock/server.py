@@ -9,18 +9,24 @@ Airalogy Mock Server - HTTP API 服务
     
 或:
     uvicorn airalogy_mock.server:app --reload --port 4000
+
+多 worker (共享实验室服务器)：
+    AIRALOGY_WORKERS=4 AIRALOGY_ASSIGNER_MODULES=protocols/a/assigner.py python -m airalogy_mock.server
 """
 
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form
+from fastapi import FastAPI, HTTPException, Request, UploadFile, File, Form, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import Response, JSONResponse
+from fastapi.routing import APIRoute
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response, JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, Any
+import os
 import json
 import base64
-import importlib.util
-import subprocess
+import asyncio
 import sys
+import time
 from pathlib import Path
 
 # 使用真实的 airalogy SDK
@@ -29,6 +35,24 @@ from airalogy.assigner import DefaultAssigner
 
 # 本地文件/记录存储
 from .client import Airalogy
+from .aio import AsyncAiralogy
+from .assignplan import iter_assign
+from .assigners import AssignerModules, configured_modules
+from .metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsMiddleware, MetricsRegistry
+from .tracing import Tracer, TracingMiddleware, traced_endpoint, traced_handler
+from .diagnostics import Diagnostics
+from .httpfiles import RangeNotSatisfiable, file_etag, http_date, iter_file, media_type_for, parse_range
+from .httpcache import NO_CACHE, IMMUTABLE, etag_matches, generation_etag, json_etag, record_etag
+
+
+class TracedRoute(APIRoute):
+    """记录 trace span 的路由：route (validate / 端点函数 / serialize)"""
+    
+    def __init__(self, path: str, endpoint: Any, **kwargs: Any):
+        super().__init__(path, traced_endpoint(endpoint), **kwargs)
+    
+    def get_route_handler(self):
+        return traced_handler(super().get_route_handler(), self.path)
 
 
 app = FastAPI(
@@ -36,6 +60,7 @@ app = FastAPI(
     description="本地模拟 Airalogy Platform API，用于 AIMD Studio 开发测试",
     version="0.1.0-mock",
 )
+app.router.route_class = TracedRoute
 
 # CORS 配置 - 允许 VS Code Webview 访问
 app.add_middleware(
@@ -46,8 +71,46 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# worker 进程数 (AIRALOGY_WORKERS)。多 worker 时每个进程各有一个客户端，Session 通过
+# 存储目录共享 (快照 + journal)，请求可以落在任意 worker 上，不需要会话粘滞
+WORKERS = max(1, int(os.environ.get("AIRALOGY_WORKERS") or 1))
+
 # 全局客户端实例
-client = Airalogy()
+# Session 修改在后台按间隔合并保存 (可用 AIRALOGY_AUTOSAVE_INTERVAL 调整，0 关闭)
+AUTOSAVE_INTERVAL = float(os.environ.get("AIRALOGY_AUTOSAVE_INTERVAL") or 2.0)
+client = Airalogy(shared_sessions=WORKERS > 1, autosave_interval=AUTOSAVE_INTERVAL)
+
+# 运行指标 (GET /metrics，Prometheus 文本格式)：HTTP 请求由中间件统计，
+# 存储操作和 Assigner 耗时在执行处记录，其余在抓取时读取
+metrics = MetricsRegistry()
+app.add_middleware(MetricsMiddleware, registry=metrics)
+storage_latency = metrics.histogram(
+    "airalogy_storage_operation_duration_seconds",
+    "Storage client call duration, excluding thread pool wait",
+    ("operation",),
+)
+assigner_latency = metrics.histogram(
+    "airalogy_assigner_duration_seconds", "Assigner execution time", ("field", "status"),
+)
+
+# 路由通过异步外观调用客户端：磁盘读写、记录扫描和 Assigner 计算在有界线程池中执行，
+# 不阻塞事件循环 (线程数由 AIRALOGY_IO_THREADS 控制)
+aclient = AsyncAiralogy(
+    client,
+    observe=lambda operation, seconds: storage_latency.observe(seconds, operation=operation),
+)
+
+metrics.callback("airalogy_active_sessions", "Record sessions held in memory", lambda: len(client.list_sessions()))
+metrics.callback("airalogy_record_cache_hits_total", "Record cache hits", lambda: client.cache_stats()["hits"], "counter")
+metrics.callback("airalogy_record_cache_misses_total", "Record cache misses", lambda: client.cache_stats()["misses"], "counter")
+metrics.callback("airalogy_record_cache_hit_ratio", "Record cache hit ratio", lambda: client.cache_stats()["hit_ratio"])
+metrics.callback("airalogy_record_cache_bytes", "Record cache size in bytes", lambda: client.cache_stats()["bytes"])
+metrics.callback("airalogy_io_threads_busy", "Blocking calls running in the I/O pool", lambda: aclient.stats()["busy"])
+metrics.callback("airalogy_io_threads_waiting", "Blocking calls waiting for an I/O thread", lambda: aclient.stats()["waiting"])
+
+# 请求追踪 (AIRALOGY_TRACE_FILE 设置时启用，AIRALOGY_TRACE_SAMPLE 为采样率)
+tracer = Tracer.from_env()
+app.add_middleware(TracingMiddleware, tracer=tracer)
 
 
 # ============================================================
@@ -77,12 +140,40 @@ class RecordUpdateRequest(BaseModel):
     data: dict[str, Any]
 
 
+class RecordQueryRequest(BaseModel):
+    """记录查询请求"""
+    filter: dict[str, Any] = {}
+    sort: Optional[str] = None  # 例如 "-updated_at"
+    limit: Optional[int] = None
+    offset: int = 0
+
+
+class RecordExportRequest(BaseModel):
+    """NDJSON 批量导出请求"""
+    record_ids: Optional[list[str]] = None  # None 表示全部记录
+    gzip: bool = False
+
+
+class FileGCRequest(BaseModel):
+    """孤立文件清理请求"""
+    dry_run: bool = True
+    quarantine: bool = False
+    grace_period: float = 3600.0
+
+
+class CompactRequest(BaseModel):
+    """冷数据打包请求"""
+    cold_after: float = 7 * 24 * 3600
+    codec: Optional[str] = None  # zstd, zlib
+
+
 class StartRecordSessionRequest(BaseModel):
     """启动 Record Session 请求"""
     protocol_id: str
     lab_id: str = "mock-lab"
     project_id: str = "mock-project"
     protocol_version: str = "1.0.0"
+    activate: bool = True
 
 
 class SetVarRequest(BaseModel):
@@ -110,144 +201,77 @@ class SetCheckRequest(BaseModel):
     annotation: str = ""
 
 
+class BatchRequest(BaseModel):
+    """批量操作请求"""
+    operations: list[dict[str, Any]]
+    session_id: Optional[str] = None
+    atomic: bool = False  # 全部成功或全部不应用
+    save: bool = False  # 结束后保存一次
+
+
 class LoadAssignerRequest(BaseModel):
     """加载 Assigner 模块请求"""
     module_path: str  # 相对于工作目录的路径
 
 
 # ============================================================
-# 版本信息辅助函数
+# 环境诊断
 # ============================================================
 
-def _get_airalogy_version_info() -> dict:
-    """获取 airalogy SDK 的详细版本信息"""
-    info = {
-        "version": getattr(airalogy, "__version__", "unknown"),
-        "install_source": "unknown",
-        "commit_id": None,
-        "install_path": None,
-    }
-    
-    # 获取安装路径
-    try:
-        info["install_path"] = str(Path(airalogy.__file__).parent)
-    except Exception:
-        pass
-    
-    # 尝试从 importlib.metadata 获取详细信息
-    try:
-        import importlib.metadata
-        dist = importlib.metadata.distribution("airalogy")
-        
-        # 检查 direct_url.json (pip install git+https://... 会生成)
-        try:
-            direct_url_text = dist.read_text("direct_url.json")
-            if direct_url_text:
-                direct_url = json.loads(direct_url_text)
-                info["direct_url"] = direct_url
-                
-                if "vcs_info" in direct_url:
-                    info["install_source"] = "github"
-                    info["commit_id"] = direct_url["vcs_info"].get("commit_id")
-                    info["vcs_url"] = direct_url.get("url")
-                elif direct_url.get("url", "").startswith("file://"):
-                    info["install_source"] = "local"
-        except (FileNotFoundError, TypeError):
-            pass
-            
-    except Exception:
-        pass
-    
-    # 检查是否是 editable install (开发模式)
-    try:
-        install_path = Path(airalogy.__file__).parent
-        
-        # 查找 .git 目录 (可能在 parent 或 parent.parent)
-        for git_parent in [install_path.parent, install_path.parent.parent, install_path]:
-            git_dir = git_parent / ".git"
-            if git_dir.exists():
-                info["install_source"] = "github_editable"
-                info["git_root"] = str(git_parent)
-                
-                # 获取 commit ID
-                try:
-                    result = subprocess.run(
-                        ["git", "rev-parse", "HEAD"],
-                        capture_output=True,
-                        text=True,
-                        cwd=git_parent,
-                        timeout=5
-                    )
-                    if result.returncode == 0:
-                        info["commit_id"] = result.stdout.strip()
-                except Exception:
-                    pass
-                
-                # 获取 commit 短 ID
-                try:
-                    result = subprocess.run(
-                        ["git", "rev-parse", "--short", "HEAD"],
-                        capture_output=True,
-                        text=True,
-                        cwd=git_parent,
-                        timeout=5
-                    )
-                    if result.returncode == 0:
-                        info["commit_short"] = result.stdout.strip()
-                except Exception:
-                    pass
-                
-                # 获取分支名
-                try:
-                    result = subprocess.run(
-                        ["git", "rev-parse", "--abbrev-ref", "HEAD"],
-                        capture_output=True,
-                        text=True,
-                        cwd=git_parent,
-                        timeout=5
-                    )
-                    if result.returncode == 0:
-                        info["branch"] = result.stdout.strip()
-                except Exception:
-                    pass
-                
-                # 检查是否有未提交的更改
-                try:
-                    result = subprocess.run(
-                        ["git", "status", "--porcelain"],
-                        capture_output=True,
-                        text=True,
-                        cwd=git_parent,
-                        timeout=5
-                    )
-                    if result.returncode == 0:
-                        info["dirty"] = len(result.stdout.strip()) > 0
-                except Exception:
-                    pass
-                
-                # 获取远程 URL
-                try:
-                    result = subprocess.run(
-                        ["git", "remote", "get-url", "origin"],
-                        capture_output=True,
-                        text=True,
-                        cwd=git_parent,
-                        timeout=5
-                    )
-                    if result.returncode == 0:
-                        info["remote_url"] = result.stdout.strip()
-                except Exception:
-                    pass
-                
-                break
-    except Exception:
-        pass
-    
-    # 如果还是 unknown，默认为 pypi
-    if info["install_source"] == "unknown":
-        info["install_source"] = "pypi"
-    
-    return info
+# SDK 安装信息在后台探测一次并缓存，安装目录或 git 状态变化时才重新探测
+diagnostics = Diagnostics(airalogy)
+diagnostics.start()
+
+
+# ============================================================
+# Assigner 模块
+# ============================================================
+
+# 每个 worker 启动时加载 AIRALOGY_ASSIGNER_MODULES；多 worker 时 /api/assigner/load
+# 加载的模块记录在存储目录中，其他 worker 在下一次 Assigner 请求前跟进
+assigner_modules = AssignerModules(client.storage_dir if WORKERS > 1 else None)
+for _error in assigner_modules.load_configured(configured_modules()) + assigner_modules.sync():
+    print(f"⚠️  Failed to load assigner module {_error}", file=sys.stderr)
+
+
+async def _sync_assigners() -> None:
+    """加载其他 worker 新加载的 Assigner 模块 (单 worker 时不做任何事)"""
+    if assigner_modules.shared:
+        for error in await aclient.run(assigner_modules.sync):
+            print(f"⚠️  Failed to load assigner module {error}", file=sys.stderr)
+
+
+# ============================================================
+# 条件请求 (ETag / If-None-Match)
+# ============================================================
+
+def _not_modified(request: Request, etag: str, cache_control: str = NO_CACHE) -> Optional[Response]:
+    """If-None-Match 命中时返回 304 响应，否则返回 None"""
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
+    return None
+
+
+def _cached_json(
+    request: Request,
+    content: Any,
+    etag: Optional[str] = None,
+    cache_control: str = NO_CACHE,
+) -> Response:
+    """返回带 ETag 的 JSON；未传 etag 时按内容计算"""
+    content = jsonable_encoder(content)
+    if etag is None:
+        etag = json_etag(content)
+    not_modified = _not_modified(request, etag, cache_control)
+    if not_modified is not None:
+        return not_modified
+    return JSONResponse(content, headers={"ETag": etag, "Cache-Control": cache_control})
+
+
+async def _generation_etag(request: Request) -> str:
+    """列表类接口的 ETag：存储代数 + 路径和查询参数 (在读取数据之前获取)"""
+    generation = await aclient.store_generation()
+    return generation_etag(generation, f"{request.url.path}?{request.url.query}")
 
 
 # ============================================================
@@ -268,19 +292,65 @@ async def health():
     return {"status": "ok"}
 
 
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus 文本格式的运行指标"""
+    return Response(metrics.render(), media_type=METRICS_CONTENT_TYPE)
+
+
+@app.get("/api/diagnostics")
+async def get_diagnostics():
+    """运行状态：版本信息、运行时长、内存、已加载的项目 (不缓存)"""
+    active = await aclient.get_active_session()
+    return {
+        "airalogy_sdk": await aclient.run(diagnostics.sdk_info),
+        "probe": diagnostics.probe_stats(),
+        "runtime": diagnostics.runtime(),
+        "project": {
+            "cwd": os.getcwd(),
+            "storage_dir": str(client.storage_dir),
+            "workers": WORKERS,
+            "assigner_modules": assigner_modules.loaded,
+            "assigned_fields": len(DefaultAssigner.all_assigned_fields()),
+            "sessions": len(client.list_sessions()),
+            "active_session": _session_info(active) if active is not None else None,
+        },
+        "io_threads": aclient.stats(),
+    }
+
+
+@app.get("/api/storage/stats")
+async def storage_stats():
+    """本地存储统计 (记录缓存命中率、包文件等)"""
+    return {
+        "record_cache": client.cache_stats(),
+        "packs": await aclient.pack_stats(),
+        "io_threads": aclient.stats(),
+    }
+
+
+@app.post("/api/storage/compact")
+async def compact_storage(req: CompactRequest):
+    """把冷的历史版本和文件元数据打包为压缩包文件"""
+    try:
+        return await aclient.compact(cold_after=req.cold_after, codec=req.codec)
+    except (ValueError, RuntimeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @app.get("/api/version")
-async def get_version():
+async def get_version(request: Request):
     """获取 airalogy SDK 和 Mock Server 的版本信息"""
-    return {
+    return _cached_json(request, {
         "mock_server": {
             "version": "0.1.0",
         },
-        "airalogy_sdk": _get_airalogy_version_info(),
+        "airalogy_sdk": await aclient.run(diagnostics.sdk_info),
         "python": {
             "version": sys.version,
             "executable": sys.executable,
         }
-    }
+    })
 
 
 # ============================================================
@@ -290,7 +360,14 @@ async def get_version():
 @app.post("/api/assigner/assign")
 async def assign_field(req: AssignRequest):
     """执行单个字段的 Assigner 计算"""
-    result = DefaultAssigner.assign(req.field_name, req.data)
+    await _sync_assigners()
+    started = time.perf_counter()
+    result = await aclient.run_span(
+        f"assign {req.field_name}", "assigner", DefaultAssigner.assign, req.field_name, req.data,
+    )
+    assigner_latency.observe(
+        time.perf_counter() - started, field=req.field_name, status="ok" if result.success else "error",
+    )
     
     if not result.success:
         raise HTTPException(status_code=400, detail=result.error_message)
@@ -301,41 +378,95 @@ async def assign_field(req: AssignRequest):
     }
 
 
+def _assign_all(data: dict[str, Any], mode: Optional[str]) -> dict[str, Any]:
+    """按依赖顺序执行所有已注册的 Assigner (在工作线程中运行)"""
+    assigner_modules.sync()
+    result_data = dict(data)
+    for item in iter_assign(DefaultAssigner, result_data, mode, serialize=_serialize_assigned_fields):
+        _observe_assign(item)  # 跳过失败的计算
+    return result_data
+
+
+def _observe_assign(item: dict) -> None:
+    assigner_latency.observe(item["elapsed_ms"] / 1000, field=item["field"], status=item["status"])
+
+
 @app.post("/api/assigner/assign-all")
 async def assign_all_fields(req: AssignAllRequest):
     """执行所有已注册的 Assigner 计算"""
-    all_fields = DefaultAssigner.all_assigned_fields()
-    result_data = dict(req.data)
-    
-    for field_name, info in all_fields.items():
-        # 如果指定了 mode，则过滤
-        if req.mode and info.get("mode") != req.mode:
-            continue
-        
-        try:
-            result = DefaultAssigner.assign(field_name, result_data)
-            if result.success:
-                result_data.update(_serialize_assigned_fields(result.assigned_fields))
-        except Exception:
-            pass  # 跳过失败的计算
-    
+    result_data = await aclient.run(_assign_all, req.data, req.mode)
     return {
         "success": True,
         "data": result_data,
     }
 
 
+def _sse(event: str, data: Any, event_id: Optional[int] = None) -> str:
+    """格式化一条 Server-Sent Event"""
+    lines = [] if event_id is None else [f"id: {event_id}"]
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(jsonable_encoder(data), ensure_ascii=False)}")
+    return "\n".join(lines) + "\n\n"
+
+
+@app.post("/api/assigner/assign-all/stream")
+async def assign_all_fields_stream(req: AssignAllRequest):
+    """
+    执行所有 Assigner，以 Server-Sent Events 逐个推送结果 (按依赖顺序)
+    
+    事件：
+        assigned  {"field", "status": "ok", "assigned_fields", "elapsed_ms"}
+        failed    {"field", "status": "error" | "skipped", "error", "elapsed_ms"}
+        done      {"success": true, "data", "succeeded", "failed", "elapsed_ms"}
+    """
+    await _sync_assigners()
+    result_data = dict(req.data)
+    results = iter_assign(DefaultAssigner, result_data, req.mode, serialize=_serialize_assigned_fields)
+    
+    async def events():
+        started = time.perf_counter()
+        succeeded, failed, event_id = 0, 0, 0
+        while True:
+            # 每个 Assigner 在线程池中执行，完成一个推送一个
+            item = await aclient.run(next, results, None)
+            if item is None:
+                break
+            _observe_assign(item)
+            event_id += 1
+            if item["status"] == "ok":
+                succeeded += 1
+                yield _sse("assigned", item, event_id)
+            else:
+                failed += 1
+                yield _sse("failed", item, event_id)
+        yield _sse("done", {
+            "success": True,
+            "data": result_data,
+            "succeeded": succeeded,
+            "failed": failed,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 3),
+        }, event_id + 1)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.get("/api/assigner/fields")
-async def list_assigned_fields():
+async def list_assigned_fields(request: Request):
     """列出所有已注册的 Assigner 字段"""
-    return DefaultAssigner.all_assigned_fields()
+    await _sync_assigners()
+    return _cached_json(request, DefaultAssigner.all_assigned_fields())
 
 
 @app.get("/api/assigner/dependencies/{field_name}")
-async def get_field_dependencies(field_name: str):
+async def get_field_dependencies(field_name: str, request: Request):
     """获取指定字段的依赖关系"""
+    await _sync_assigners()
     deps = DefaultAssigner.get_dependent_fields_of_assigned_key(field_name)
-    return {"field": field_name, "dependencies": deps}
+    return _cached_json(request, {"field": field_name, "dependencies": deps})
 
 
 @app.post("/api/assigner/load")
@@ -351,9 +482,7 @@ async def load_assigner_module(req: LoadAssignerRequest):
         raise HTTPException(status_code=404, detail=f"Module not found: {req.module_path}")
     
     try:
-        spec = importlib.util.spec_from_file_location("assigner_module", module_path)
-        module = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(module)
+        await aclient.run(assigner_modules.load, module_path)
         
         # 返回新注册的字段
         return {
@@ -375,7 +504,7 @@ async def upload_file_bytes(
 ):
     """上传文件 (multipart/form-data)"""
     content = await file.read()
-    result = client.upload_file_bytes(file.filename, content)
+    result = await aclient.upload_file_bytes(file.filename, content)
     return result
 
 
@@ -385,47 +514,78 @@ async def upload_file_base64(
     file_base64: str = Form(...),
 ):
     """上传文件 (base64)"""
-    result = client.upload_file_base64(file_name, file_base64)
+    result = await aclient.upload_file_base64(file_name, file_base64)
     return result
 
 
 @app.get("/api/files/{file_id}/download/bytes")
-async def download_file_bytes(file_id: str):
-    """下载文件 (bytes)"""
+async def download_file_bytes(file_id: str, request: Request):
+    """
+    下载文件 (流式，支持 Range 请求)
+    
+    视频拖动、大图预览只读取需要的字节段，不把整个文件读入内存。
+    """
     try:
-        content = client.download_file_bytes(file_id)
-        # 根据扩展名设置 Content-Type
-        ext = file_id.split(".")[-1]
-        media_types = {
-            "png": "image/png",
-            "jpg": "image/jpeg",
-            "jpeg": "image/jpeg",
-            "pdf": "application/pdf",
-            "csv": "text/csv",
-            "json": "application/json",
-            "mp4": "video/mp4",
-        }
-        media_type = media_types.get(ext, "application/octet-stream")
-        return Response(content=content, media_type=media_type)
+        info = await aclient.stat_file(file_id)
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="File not found")
+    
+    size = info["size"]
+    etag = file_etag(size, info["mtime"], info["sha256"])
+    not_modified = _not_modified(request, etag, IMMUTABLE)
+    if not_modified is not None:
+        return not_modified
+    last_modified = http_date(info["mtime"])
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
+        "Last-Modified": last_modified,
+        "Cache-Control": IMMUTABLE,
+    }
+    
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if if_range and if_range not in (etag, last_modified):
+        # 客户端缓存的片段已过期：返回完整文件
+        range_header = None
+    try:
+        byte_range = parse_range(range_header, size)
+    except RangeNotSatisfiable:
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+    
+    start, end = byte_range or (0, size - 1)
+    length = end - start + 1
+    headers["Content-Length"] = str(length)
+    if byte_range:
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return StreamingResponse(
+        iter_file(info["path"], start, length),
+        status_code=206 if byte_range else 200,
+        media_type=media_type_for(file_id),
+        headers=headers,
+    )
 
 
 @app.get("/api/files/{file_id}/download/base64")
-async def download_file_base64(file_id: str):
+async def download_file_base64(file_id: str, request: Request):
     """下载文件 (base64)"""
     try:
-        content = client.download_file_base64(file_id)
-        return {"file_base64": content}
+        info = await aclient.stat_file(file_id)
+        etag = file_etag(info["size"], info["mtime"], info["sha256"])
+        not_modified = _not_modified(request, etag, IMMUTABLE)
+        if not_modified is not None:
+            return not_modified
+        content = await aclient.download_file_base64(file_id)
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="File not found")
+    return JSONResponse({"file_base64": content}, headers={"ETag": etag, "Cache-Control": IMMUTABLE})
 
 
 @app.get("/api/files/{file_id}/url")
 async def get_file_url(file_id: str):
     """获取文件临时 URL"""
     try:
-        url = client.get_file_url(file_id)
+        url = await aclient.get_file_url(file_id)
         return {"url": url}
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="File not found")
@@ -434,14 +594,48 @@ async def get_file_url(file_id: str):
 @app.delete("/api/files/{file_id}")
 async def delete_file(file_id: str):
     """删除文件"""
-    deleted = client.delete_file(file_id)
+    deleted = await aclient.delete_file(file_id)
     return {"deleted": deleted}
 
 
+def _split_fields(fields: Optional[str]) -> Optional[list[str]]:
+    """解析逗号分隔的字段投影参数"""
+    return [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+
+
+@app.post("/api/files/gc")
+async def collect_file_garbage(req: FileGCRequest):
+    """清理未被任何记录引用的上传文件 (默认只报告)"""
+    # 标记阶段要扫描全部记录，在线程池中执行，不阻塞其他请求
+    return await aclient.collect_garbage(
+        dry_run=req.dry_run,
+        quarantine=req.quarantine,
+        grace_period=req.grace_period,
+    )
+
+
 @app.get("/api/files")
-async def list_files():
-    """列出所有文件"""
-    return client.list_files()
+async def list_files(
+    request: Request,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    sort: str = "-uploaded_at",
+    fields: Optional[str] = None,
+):
+    """列出文件；传入 limit 或 cursor 时分页返回 {total, items, next_cursor}"""
+    etag = await _generation_etag(request)
+    not_modified = _not_modified(request, etag)
+    if not_modified is not None:
+        return not_modified
+    if limit is None and cursor is None:
+        return _cached_json(request, await aclient.list_files(), etag)
+    try:
+        page = await aclient.list_files_page(
+            sort=sort, limit=limit or 50, cursor=cursor, fields=_split_fields(fields),
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _cached_json(request, page, etag)
 
 
 # ============================================================
@@ -451,53 +645,135 @@ async def list_files():
 @app.post("/api/records")
 async def create_record(req: RecordCreateRequest):
     """创建记录"""
-    result = client.create_record(req.data, req.record_id)
+    result = await aclient.create_record(req.data, req.record_id)
     return result
 
 
+@app.get("/api/records/search")
+async def search_records(q: str, request: Request, limit: int = 20):
+    """全文检索记录 (别名、字符串变量、步骤/检查点批注)"""
+    etag = await _generation_etag(request)
+    not_modified = _not_modified(request, etag)
+    if not_modified is not None:
+        return not_modified
+    return _cached_json(request, await aclient.search_records(q, limit=limit), etag)
+
+
 @app.put("/api/records/{record_id}")
 async def update_record(record_id: str, req: RecordUpdateRequest):
     """更新记录"""
     try:
-        result = client.update_record(record_id, req.data)
+        result = await aclient.update_record(record_id, req.data)
         return result
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Record not found")
 
 
 @app.get("/api/records/{record_id}")
-async def get_record(record_id: str):
-    """获取单条记录"""
+async def get_record(record_id: str, request: Request, inline: bool = True):
+    """获取单条记录 (inline=false 时外部存储的表格只返回 blob 引用)"""
     try:
-        return client.get_record(record_id)
+        record = await aclient.get_record(record_id, inline=inline)
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Record not found")
+    # Merkle 根 + 别名/元数据哈希；旧格式记录没有 sha1 时按内容计算
+    return _cached_json(request, record, record_etag(record, inline))
 
 
 @app.delete("/api/records/{record_id}")
-async def delete_record(record_id: str):
-    """删除记录"""
-    deleted = client.delete_record(record_id)
+async def delete_record(record_id: str, all_versions: bool = False):
+    """删除记录的一个版本；all_versions=true 时删除整条记录"""
+    if all_versions:
+        deleted = await aclient.purge_record(record_id)
+    else:
+        deleted = await aclient.delete_record(record_id)
     return {"deleted": deleted}
 
 
 @app.get("/api/records")
-async def list_records():
-    """列出所有记录"""
-    return client.list_records()
+async def list_records(
+    request: Request,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    sort: str = "-updated_at",
+    fields: Optional[str] = None,
+):
+    """列出记录；传入 limit 或 cursor 时分页返回 {total, items, next_cursor}"""
+    etag = await _generation_etag(request)
+    not_modified = _not_modified(request, etag)
+    if not_modified is not None:
+        return not_modified
+    if limit is None and cursor is None:
+        return _cached_json(request, await aclient.list_records(), etag)
+    try:
+        page = await aclient.list_records_page(
+            sort=sort, limit=limit or 50, cursor=cursor, fields=_split_fields(fields),
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _cached_json(request, page, etag)
+
+
+@app.post("/api/records/query")
+async def query_records(req: RecordQueryRequest):
+    """按元数据和 data.var 标量字段查询记录"""
+    try:
+        return await aclient.query_records(req.filter, sort=req.sort, limit=req.limit, offset=req.offset)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @app.post("/api/records/download")
 async def download_records(record_ids: list[str]):
     """批量下载记录"""
-    json_str = client.download_records_json(record_ids)
-    return JSONResponse(content=json.loads(json_str))
+    json_str = await aclient.download_records_json(record_ids)
+    return Response(content=json_str, media_type="application/json")
+
+
+@app.post("/api/records/export")
+async def export_records(req: RecordExportRequest):
+    """流式导出记录为 NDJSON (每行一条 Record，可选 gzip)"""
+    filename = "records.ndjson.gz" if req.gzip else "records.ndjson"
+    return StreamingResponse(
+        # 逐条读取记录在 I/O 线程池中进行，与其他存储调用共用并发上限
+        aclient.iterate(client.iter_records_ndjson, req.record_ids, gzip=req.gzip),
+        media_type="application/gzip" if req.gzip else "application/x-ndjson",
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
+
+
+@app.post("/api/records/import")
+async def import_records(
+    file: UploadFile = File(...),
+    overwrite: bool = Form(False),
+):
+    """从 NDJSON 文件导入记录 (gzip 自动识别)"""
+    return await aclient.import_records_ndjson(file.file, overwrite=overwrite)
 
 
 # ============================================================
 # Record Session API (Record 模式)
 # ============================================================
 
+async def _require_session(session_id: Optional[str] = None):
+    """按 ID 获取 Session；不传 ID 时使用当前活跃 Session"""
+    try:
+        session = await aclient.get_session(session_id)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Session not found")
+    if session is None:
+        raise HTTPException(status_code=400, detail="No active session")
+    return session
+
+
+def _session_info(session) -> dict:
+    return {
+        "session_id": session.session_id,
+        "record_id": session.airalogy_record_id,
+        "protocol_id": session.airalogy_protocol_id,
+    }
+
+
 @app.post("/api/session/start")
 async def start_record_session(req: StartRecordSessionRequest):
     """
@@ -505,53 +781,51 @@ async def start_record_session(req: StartRecordSessionRequest):
     
     创建一个新的 Record Session，用于记录实验数据
     """
-    session = client.start_record_session(
+    session = await aclient.start_record_session(
         protocol_id=req.protocol_id,
         lab_id=req.lab_id,
         project_id=req.project_id,
         protocol_version=req.protocol_version,
+        activate=req.activate,
     )
-    return {
-        "success": True,
-        "record_id": session.airalogy_record_id,
-        "protocol_id": session.airalogy_protocol_id,
-    }
+    return {"success": True, **_session_info(session)}
 
 
 @app.post("/api/session/load/{record_id:path}")
-async def load_record_session(record_id: str):
-    """加载已有的 Record Session"""
+async def load_record_session(record_id: str, activate: bool = True, lazy: bool = False):
+    """
+    加载已有的 Record Session
+    
+    lazy=true 时只返回元数据和已解析的变量，大表格等变量列在 lazy_vars 中，
+    之后通过 /api/session/var/{var_id} 按需获取。
+    """
     try:
-        session = client.load_record_session(record_id)
-        return {
-            "success": True,
-            "record_id": session.airalogy_record_id,
-            "protocol_id": session.airalogy_protocol_id,
-            "data": session.to_record(),
-        }
+        session = await aclient.load_record_session(record_id, activate=activate, lazy=lazy)
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Record not found")
+    if lazy:
+        return {"success": True, **_session_info(session), **await aclient.run(session.preview)}
+    return {"success": True, **_session_info(session), "data": await aclient.run(session.to_record, inline=True)}
 
 
 @app.get("/api/session/current")
-async def get_current_session():
+async def get_current_session(request: Request):
     """获取当前活跃的 Record Session"""
-    session = client.get_active_session()
+    session = await aclient.get_active_session()
     if session is None:
-        return {"active": False}
+        return _cached_json(request, {"active": False})
     
-    return {
-        "active": True,
-        "record_id": session.airalogy_record_id,
-        "protocol_id": session.airalogy_protocol_id,
-        "data": session.to_record(),
-    }
+    data = await aclient.run(session.to_record, inline=True)
+    return _cached_json(request, {"active": True, **_session_info(session), "data": data})
 
 
 @app.post("/api/session/end")
-async def end_record_session(save: bool = True):
-    """结束 Record 模式"""
-    record_id = client.end_record_session(save=save)
+@app.post("/api/sessions/{session_id}/end")
+async def end_record_session(save: bool = True, session_id: Optional[str] = None):
+    """结束 Record 模式 (指定 session_id 时结束该 Session)"""
+    if session_id is not None:
+        await _require_session(session_id)
+    record_id = await aclient.end_record_session(save=save, session_id=session_id)
     return {
         "success": True,
         "saved": save,
@@ -559,14 +833,51 @@ async def end_record_session(save: bool = True):
     }
 
 
+# ========================================================
+# 多 Session (按 session_id 访问，互不影响)
+# ========================================================
+
+@app.post("/api/sessions")
+async def create_session(req: StartRecordSessionRequest):
+    """
+    新建 Session，不切换当前活跃 Session
+    
+    之后通过 /api/sessions/{session_id}/... 读写该 Session。
+    """
+    session = await aclient.start_record_session(
+        protocol_id=req.protocol_id,
+        lab_id=req.lab_id,
+        project_id=req.project_id,
+        protocol_version=req.protocol_version,
+        activate=False,
+    )
+    return {"success": True, **_session_info(session)}
+
+
+@app.get("/api/sessions")
+async def list_sessions():
+    """列出内存中的 Session"""
+    return client.list_sessions()
+
+
+@app.get("/api/sessions/{session_id}")
+async def get_session(session_id: str):
+    """获取指定 Session 的数据 (已移出内存的从磁盘恢复)"""
+    session = await _require_session(session_id)
+    return {
+        "active": session is await aclient.get_active_session(),
+        **_session_info(session),
+        "data": await aclient.run(session.to_record, inline=True),
+    }
+
+
 @app.post("/api/session/save")
-async def save_current_session():
+@app.post("/api/sessions/{session_id}/save")
+async def save_current_session(session_id: Optional[str] = None):
     """保存当前 Session（不结束）"""
-    session = client.get_active_session()
-    if session is None:
-        raise HTTPException(status_code=400, detail="No active session")
+    session = await _require_session(session_id)
     
-    record_id = session.save()
+    record_id = await aclient.run(session.save)
     return {
         "success": True,
         "record_id": record_id,
@@ -578,46 +889,42 @@ async def save_current_session():
 # ========================================================
 
 @app.post("/api/session/var")
-async def set_session_var(req: SetVarRequest):
+@app.post("/api/sessions/{session_id}/var")
+async def set_session_var(req: SetVarRequest, session_id: Optional[str] = None):
     """设置单个变量"""
-    session = client.get_active_session()
-    if session is None:
-        raise HTTPException(status_code=400, detail="No active session")
+    session = await _require_session(session_id)
     
-    session.set_var(req.var_id, req.value)
+    await aclient.run(session.set_var, req.var_id, req.value)
     return {"success": True, "var_id": req.var_id}
 
 
 @app.post("/api/session/vars")
-async def set_session_vars(req: SetVarsRequest):
+@app.post("/api/sessions/{session_id}/vars")
+async def set_session_vars(req: SetVarsRequest, session_id: Optional[str] = None):
     """批量设置变量"""
-    session = client.get_active_session()
-    if session is None:
-        raise HTTPException(status_code=400, detail="No active session")
+    session = await _require_session(session_id)
     
-    session.set_vars(req.data)
+    await aclient.run(session.set_vars, req.data)
     return {"success": True, "count": len(req.data)}
 
 
 @app.get("/api/session/var/{var_id}")
-async def get_session_var(var_id: str):
+@app.get("/api/sessions/{session_id}/var/{var_id}")
+async def get_session_var(var_id: str, request: Request, session_id: Optional[str] = None):
     """获取变量值"""
-    session = client.get_active_session()
-    if session is None:
-        raise HTTPException(status_code=400, detail="No active session")
+    session = await _require_session(session_id)
     
-    value = session.get_var(var_id)
-    return {"var_id": var_id, "value": value}
+    value = await aclient.run(session.get_var, var_id)
+    return _cached_json(request, {"var_id": var_id, "value": value})
 
 
 @app.get("/api/session/vars")
-async def get_all_session_vars():
+@app.get("/api/sessions/{session_id}/vars")
+async def get_all_session_vars(request: Request, session_id: Optional[str] = None):
     """获取所有变量"""
-    session = client.get_active_session()
-    if session is None:
-        raise HTTPException(status_code=400, detail="No active session")
+    session = await _require_session(session_id)
     
-    return session.get_all_vars()
+    return _cached_json(request, await aclient.run(session.get_all_vars))
 
 
 # ========================================================
@@ -625,44 +932,40 @@ async def get_all_session_vars():
 # ========================================================
 
 @app.post("/api/session/step")
-async def set_session_step(req: SetStepRequest):
+@app.post("/api/sessions/{session_id}/step")
+async def set_session_step(req: SetStepRequest, session_id: Optional[str] = None):
     """设置步骤状态"""
-    session = client.get_active_session()
-    if session is None:
-        raise HTTPException(status_code=400, detail="No active session")
+    session = await _require_session(session_id)
     
-    session.set_step(req.step_id, checked=req.checked, annotation=req.annotation)
+    await aclient.run(session.set_step, req.step_id, checked=req.checked, annotation=req.annotation)
     return {"success": True, "step_id": req.step_id}
 
 
 @app.post("/api/session/step/{step_id}/complete")
-async def complete_session_step(step_id: str, annotation: str = ""):
+@app.post("/api/sessions/{session_id}/step/{step_id}/complete")
+async def complete_session_step(step_id: str, annotation: str = "", session_id: Optional[str] = None):
     """标记步骤完成"""
-    session = client.get_active_session()
-    if session is None:
-        raise HTTPException(status_code=400, detail="No active session")
+    session = await _require_session(session_id)
     
-    session.complete_step(step_id, annotation=annotation)
+    await aclient.run(session.complete_step, step_id, annotation=annotation)
     return {"success": True, "step_id": step_id}
 
 
 @app.get("/api/session/step/{step_id}")
-async def get_session_step(step_id: str):
+@app.get("/api/sessions/{session_id}/step/{step_id}")
+async def get_session_step(step_id: str, session_id: Optional[str] = None):
     """获取步骤状态"""
-    session = client.get_active_session()
-    if session is None:
-        raise HTTPException(status_code=400, detail="No active session")
+    session = await _require_session(session_id)
     
     step = session.get_step(step_id)
     return {"step_id": step_id, "data": step}
 
 
 @app.get("/api/session/steps")
-async def get_all_session_steps():
+@app.get("/api/sessions/{session_id}/steps")
+async def get_all_session_steps(session_id: Optional[str] = None):
     """获取所有步骤"""
-    session = client.get_active_session()
-    if session is None:
-        raise HTTPException(status_code=400, detail="No active session")
+    session = await _require_session(session_id)
     
     return session.get_all_steps()
 
@@ -672,55 +975,50 @@ async def get_all_session_steps():
 # ========================================================
 
 @app.post("/api/session/check")
-async def set_session_check(req: SetCheckRequest):
+@app.post("/api/sessions/{session_id}/check")
+async def set_session_check(req: SetCheckRequest, session_id: Optional[str] = None):
     """设置检查点状态"""
-    session = client.get_active_session()
-    if session is None:
-        raise HTTPException(status_code=400, detail="No active session")
+    session = await _require_session(session_id)
     
-    session.set_check(req.check_id, checked=req.checked, annotation=req.annotation)
+    await aclient.run(session.set_check, req.check_id, checked=req.checked, annotation=req.annotation)
     return {"success": True, "check_id": req.check_id}
 
 
 @app.post("/api/session/check/{check_id}/pass")
-async def pass_session_check(check_id: str, annotation: str = ""):
+@app.post("/api/sessions/{session_id}/check/{check_id}/pass")
+async def pass_session_check(check_id: str, annotation: str = "", session_id: Optional[str] = None):
     """通过检查点"""
-    session = client.get_active_session()
-    if session is None:
-        raise HTTPException(status_code=400, detail="No active session")
+    session = await _require_session(session_id)
     
-    session.pass_check(check_id, annotation=annotation)
+    await aclient.run(session.pass_check, check_id, annotation=annotation)
     return {"success": True, "check_id": check_id, "checked": True}
 
 
 @app.post("/api/session/check/{check_id}/fail")
-async def fail_session_check(check_id: str, annotation: str = ""):
+@app.post("/api/sessions/{session_id}/check/{check_id}/fail")
+async def fail_session_check(check_id: str, annotation: str = "", session_id: Optional[str] = None):
     """未通过检查点"""
-    session = client.get_active_session()
-    if session is None:
-        raise HTTPException(status_code=400, detail="No active session")
+    session = await _require_session(session_id)
     
-    session.fail_check(check_id, annotation=annotation)
+    await aclient.run(session.fail_check, check_id, annotation=annotation)
     return {"success": True, "check_id": check_id, "checked": False}
 
 
 @app.get("/api/session/check/{check_id}")
-async def get_session_check(check_id: str):
+@app.get("/api/sessions/{session_id}/check/{check_id}")
+async def get_session_check(check_id: str, session_id: Optional[str] = None):
     """获取检查点状态"""
-    session = client.get_active_session()
-    if session is None:
-        raise HTTPException(status_code=400, detail="No active session")
+    session = await _require_session(session_id)
     
     check = session.get_check(check_id)
     return {"check_id": check_id, "data": check}
 
 
 @app.get("/api/session/checks")
-async def get_all_session_checks():
+@app.get("/api/sessions/{session_id}/checks")
+async def get_all_session_checks(session_id: Optional[str] = None):
     """获取所有检查点"""
-    session = client.get_active_session()
-    if session is None:
-        raise HTTPException(status_code=400, detail="No active session")
+    session = await _require_session(session_id)
     
     return session.get_all_checks()
 
@@ -730,24 +1028,24 @@ async def get_all_session_checks():
 # ========================================================
 
 @app.post("/api/session/upload")
+@app.post("/api/sessions/{session_id}/upload")
 async def upload_file_to_session(
     var_id: str = Form(...),
     file: UploadFile = File(...),
+    session_id: Optional[str] = None,
 ):
     """
     上传文件并自动关联到当前 Session 的变量
     
     文件会被上传，file_id 会自动设置到指定的 var_id
     """
-    session = client.get_active_session()
-    if session is None:
-        raise HTTPException(status_code=400, detail="No active session")
+    session = await _require_session(session_id)
     
     content = await file.read()
-    result = client.upload_file_bytes(file.filename, content)
+    result = await aclient.upload_file_bytes(file.filename, content)
     
     # 自动设置到 session 变量
-    session.set_var(var_id, result["id"])
+    await aclient.run(session.set_var, var_id, result["id"])
     
     return {
         "success": True,
@@ -757,6 +1055,170 @@ async def upload_file_to_session(
     }
 
 
+# ========================================================
+# 批量操作
+# ========================================================
+
+@app.post("/api/batch")
+async def run_batch(req: BatchRequest):
+    """
+    一次请求按顺序执行多个 Session 操作 (var/vars/step/check/upload)
+    
+    atomic=true 时先校验全部操作并完成上传，任何一步失败都不修改 Session；
+    save=true 时结束后保存一次。
+    """
+    session = await _require_session(req.session_id)
+    return await aclient.apply_batch(
+        req.operations, session_id=session.session_id, atomic=req.atomic, save=req.save,
+    )
+
+
+# ========================================================
+# Session 实时通道 (WebSocket)
+# ========================================================
+
+# 多 worker 时 WebSocket 通道检查其他 worker 修改的间隔 (秒)
+SESSION_POLL_INTERVAL = 0.5
+
+
+def _session_assign(session, mode: Optional[str]) -> dict[str, Any]:
+    """用 Session 当前变量执行 Assigner，把结果中变化的字段写回 Session，返回这些字段"""
+    current = session.get_all_vars()
+    result_data = _assign_all(current, mode)
+    changed = {
+        key: value for key, value in result_data.items()
+        if key not in current or current[key] != value
+    }
+    if changed:
+        session.set_vars(changed)
+    return changed
+
+
+async def _handle_channel_message(session, message: Any) -> dict:
+    """处理客户端消息，返回回复"""
+    if not isinstance(message, dict):
+        return {"type": "error", "detail": "Message must be a JSON object"}
+    kind = message.get("type")
+    reply = {"id": message.get("id")}
+    try:
+        if kind == "ping":
+            return {**reply, "type": "pong", "seq": session.events.seq}
+        if kind == "mutate":
+            seq = await aclient.run(session.apply_ops, message.get("ops") or [])
+            reply.update(type="ack", seq=seq)
+            if not message.get("assign"):
+                return reply
+        elif kind != "assign":
+            return {**reply, "type": "error", "detail": f"Unknown message type: {kind!r}"}
+        changed = await aclient.run(_session_assign, session, message.get("mode"))
+        return {**reply, "type": "assigned", "fields": sorted(changed), "seq": session.events.seq}
+    except ValueError as e:
+        return {**reply, "type": "error", "detail": str(e)}
+
+
+@app.websocket("/ws/session/{session_id}")
+async def session_channel(
+    websocket: WebSocket,
+    session_id: str,
+    since: Optional[int] = None,
+    epoch: Optional[str] = None,
+):
+    """
+    Session 实时通道 (session_id 为 current 时使用当前活跃 Session)
+    
+    服务端推送：
+        {"type": "snapshot", "seq", "epoch", "record"}   首次连接或无法续传
+        {"type": "resume", "seq", "epoch"}               续传，之后补发 since 之后的事件
+        {"type": "event", "seq", "op", ...}              var/vars/step/check/saved/ended
+        多 worker 时其他 worker 保存过该 Session，会重新发送一次 snapshot
+        {"type": "ack" | "assigned" | "pong" | "error", "id", ...}
+    
+    客户端发送：
+        {"type": "mutate", "id", "ops": [...], "assign": false}
+        {"type": "assign", "id", "mode": null}
+        {"type": "ping"}
+    """
+    try:
+        session = await aclient.get_session(None if session_id == "current" else session_id)
+    except FileNotFoundError:
+        session = None
+    if session is None:
+        await websocket.close(code=4404)
+        return
+    await websocket.accept()
+    
+    loop = asyncio.get_running_loop()
+    outbox: asyncio.Queue = asyncio.Queue()
+    
+    def on_event(event: dict) -> None:
+        # 在修改 Session 的工作线程中调用
+        loop.call_soon_threadsafe(outbox.put_nowait, {"type": "event", **event})
+    
+    # 先订阅再取快照/补发，重复的事件按 seq 跳过
+    unsubscribe = session.events.subscribe(on_event)
+    try:
+        backlog = session.events.since(since, epoch) if since is not None else None
+        if backlog is None:
+            snapshot = await aclient.run(session.snapshot)
+            last_seq = snapshot["seq"]
+            await websocket.send_json(jsonable_encoder({"type": "snapshot", **snapshot}))
+        else:
+            last_seq = since
+            await websocket.send_json({"type": "resume", "seq": session.events.seq, "epoch": session.events.epoch})
+            for event in backlog:
+                await websocket.send_json(jsonable_encoder({"type": "event", **event}))
+                last_seq = event["seq"]
+                if event["op"] == "ended":
+                    await websocket.close()
+                    return
+        
+        async def receive():
+            while True:
+                try:
+                    message = await websocket.receive_json()
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    message = None
+                await outbox.put(await _handle_channel_message(session, message))
+        
+        async def send():
+            nonlocal last_seq
+            while True:
+                message = await outbox.get()
+                if message["type"] == "event":
+                    if message["seq"] <= last_seq:
+                        continue
+                    last_seq = message["seq"]
+                    if message["op"] == "reloaded":
+                        # 其他 worker 保存后重新加载：增量无法表达，发送完整快照
+                        message = {"type": "snapshot", **await aclient.run(session.snapshot)}
+                        last_seq = message["seq"]
+                await websocket.send_json(jsonable_encoder(message))
+                if message["type"] == "event" and message["op"] == "ended":
+                    await websocket.close()
+                    return
+        
+        async def poll():
+            # 其他 worker 的修改只写入存储，定期同步后作为事件推送
+            while True:
+                await asyncio.sleep(SESSION_POLL_INTERVAL)
+                await aclient.run(session.sync)
+        
+        tasks = [asyncio.ensure_future(receive()), asyncio.ensure_future(send())]
+        if client.shared_sessions:
+            tasks.append(asyncio.ensure_future(poll()))
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+        for task in done:
+            task.result()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        unsubscribe()
+
+
 # ============================================================
 # 上下文 API
 # ============================================================
@@ -811,7 +1273,7 @@ async def export_data(req: ExportRequest):
         if req.format not in exporters:
             raise HTTPException(status_code=400, detail=f"Unsupported format: {req.format}")
         
-        result = exporters[req.format]()
+        result = await aclient.run_span(f"export.{req.format}", "export", exporters[req.format])
         
         if not result.success:
             raise HTTPException(status_code=500, detail=result.error)
@@ -1017,7 +1479,15 @@ def main():
     print("🚀 Starting Airalogy Mock Server...")
     print("   Endpoint: http://localhost:4000")
     print("   Docs: http://localhost:4000/docs")
-    uvicorn.run(app, host="0.0.0.0", port=4000)
+    if WORKERS == 1:
+        uvicorn.run(app, host="0.0.0.0", port=4000)
+        return
+    
+    print(f"   Workers: {WORKERS}")
+    # 上次运行通过 /api/assigner/load 加载的模块不再自动加载
+    assigner_modules.reset()
+    # worker 进程重新导入本模块 (继承 AIRALOGY_WORKERS，进入共享模式)
+    uvicorn.run("airalogy_mock.server:app", host="0.0.0.0", port=4000, workers=WORKERS)
 
 
 if __name__ == "__main__":
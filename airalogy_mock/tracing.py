@@ -0,0 +1,319 @@
+"""
+Tracing - 请求级 span 追踪 (Chrome Trace Event 格式)
+
+一次采样的 HTTP 请求生成一棵 span 树：
+
+    GET /api/records/{record_id}          http      (中间件，根 span)
+      route /api/records/{record_id}      route     (FastAPI 路由处理)
+        validate                          route     (参数解析和请求体校验)
+        get_record                        endpoint  (路由函数)
+          Airalogy.get_record             storage   (线程池中的存储调用)
+        serialize                         route     (返回值序列化)
+
+Assigner (assign <field>) 和导出 (export.<format>) 也各有 span。span 通过 contextvars
+传递，线程池 (anyio.to_thread) 会复制上下文，因此工作线程中的 span 自动挂到发起请求的
+span 下。没有被采样的请求只有一次 ContextVar 读取的开销。
+
+每个 span 以 Chrome Trace Event 的完整事件 (ph = "X") 写入 JSONL 文件，一行一个事件，
+args 中带 trace_id / span_id / parent_id。在 chrome://tracing 或 Perfetto 中打开前先转换：
+
+    python -m airalogy_mock.tracing traces.jsonl > trace.json
+
+环境变量：
+    AIRALOGY_TRACE_FILE    输出文件 (不设置时关闭追踪)
+    AIRALOGY_TRACE_SAMPLE  采样率 0~1 (默认 1.0)；请求头 X-Airalogy-Trace: 1 强制采样
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import asyncio
+import functools
+import threading
+from contextvars import ContextVar
+from typing import Any, Callable, Iterable, Optional
+
+TRACE_HEADER = "x-airalogy-trace"
+
+_current: ContextVar[Optional["Span"]] = ContextVar("airalogy_span", default=None)
+
+
+def _now_us() -> float:
+    return time.time() * 1_000_000
+
+
+class _NoopSpan:
+    """未采样时使用的空 span"""
+
+    trace_id = None
+    span_id = None
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> bool:
+        return False
+
+    def set(self, **args: Any) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class _Trace:
+    """一次请求的全部 span，根 span 结束时一次写出"""
+
+    def __init__(self, tracer: "Tracer"):
+        self.tracer = tracer
+        self.trace_id = uuid.uuid4().hex[:16]
+        self._events: list[dict] = []
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def add(self, event: dict) -> None:
+        with self._lock:
+            if not self._closed:
+                self._events.append(event)
+                return
+        # 根 span 结束后才完成的 span (例如仍在运行的后台线程) 单独写出
+        self.tracer.write([event])
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            events, self._events = self._events, []
+        self.tracer.write(events)
+
+
+class Span:
+    """一个计时区间，作为上下文管理器使用"""
+
+    __slots__ = ("trace", "name", "cat", "span_id", "parent_id", "args",
+                 "start_us", "_t0", "_token", "_inner", "_root")
+
+    def __init__(
+        self,
+        trace: _Trace,
+        name: str,
+        cat: str,
+        parent_id: Optional[str],
+        args: dict,
+        root: bool = False,
+    ):
+        self.trace = trace
+        self.name = name
+        self.cat = cat
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.args = args
+        self.start_us = 0.0
+        self._t0 = 0.0
+        self._token = None
+        # 路由 span 中端点函数的 (开始, 结束)，用于拆分 validate / serialize
+        self._inner: Optional[tuple[float, float]] = None
+        self._root = root
+
+    @property
+    def trace_id(self) -> str:
+        return self.trace.trace_id
+
+    def set(self, **args: Any) -> None:
+        """附加属性 (写入事件的 args)"""
+        self.args.update(args)
+
+    def __enter__(self) -> "Span":
+        self.start_us = _now_us()
+        self._t0 = time.perf_counter()
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> bool:
+        duration_us = (time.perf_counter() - self._t0) * 1_000_000
+        _current.reset(self._token)
+        if exc is not None:
+            self.args["error"] = f"{exc_type.__name__}: {exc}"
+        if self._inner is not None:
+            inner_start, inner_end = self._inner
+            self.trace.add(self._event("validate", self.start_us, inner_start - self.start_us, {}))
+            if exc is None:
+                end_us = self.start_us + duration_us
+                self.trace.add(self._event("serialize", inner_end, end_us - inner_end, {}))
+        self.trace.add(self._event(self.name, self.start_us, duration_us, self.args, own=True))
+        if self._root:
+            self.trace.close()
+        return False
+
+    def _event(self, name: str, start_us: float, duration_us: float, args: dict, own: bool = False) -> dict:
+        ids = {"trace_id": self.trace.trace_id}
+        if own:
+            ids.update(span_id=self.span_id, parent_id=self.parent_id)
+        else:
+            ids.update(parent_id=self.span_id)
+        return {
+            "name": name,
+            "cat": self.cat,
+            "ph": "X",
+            "ts": round(start_us, 3),
+            "dur": round(max(duration_us, 0.0), 3),
+            "pid": os.getpid(),
+            "tid": threading.get_native_id(),
+            "args": {**ids, **args},
+        }
+
+
+def current_span() -> Optional[Span]:
+    """当前上下文中的 span (未采样时为 None)"""
+    return _current.get()
+
+
+def span(name: str, cat: str = "app", **args: Any) -> Any:
+    """在当前 trace 中开启子 span；不在采样的请求中时返回空 span"""
+    parent = _current.get()
+    if parent is None:
+        return NOOP_SPAN
+    return Span(parent.trace, name, cat, parent.span_id, args)
+
+
+class Tracer:
+    """
+    Trace 采样与输出
+
+    Args:
+        path: JSONL 输出文件，None 时关闭
+        sample_rate: 根 span 的采样率 (0~1)
+    """
+
+    def __init__(self, path: Optional[str] = None, sample_rate: float = 1.0):
+        self.path = path
+        self.sample_rate = min(max(sample_rate, 0.0), 1.0)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "Tracer":
+        return cls(
+            path=os.environ.get("AIRALOGY_TRACE_FILE") or None,
+            sample_rate=float(os.environ.get("AIRALOGY_TRACE_SAMPLE") or 1.0),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.path is not None
+
+    def trace(self, name: str, cat: str = "http", force: bool = False, **args: Any) -> Any:
+        """开启根 span (按采样率决定是否记录)"""
+        if not self.enabled:
+            return NOOP_SPAN
+        if not force and (self.sample_rate <= 0 or random.random() >= self.sample_rate):
+            return NOOP_SPAN
+        return Span(_Trace(self), name, cat, None, args, root=True)
+
+    def write(self, events: list[dict]) -> None:
+        if not events or self.path is None:
+            return
+        text = "".join(json.dumps(event, ensure_ascii=False, default=str) + "\n" for event in events)
+        with self._lock:
+            # 追加写入：多个进程可以共用一个文件
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(text)
+
+
+def traced_endpoint(func: Callable, name: Optional[str] = None) -> Callable:
+    """包装路由函数：记录 endpoint span，并告知外层路由 span 端点的起止时间"""
+    name = name or getattr(func, "__name__", "endpoint")
+
+    def finish(route_span: Optional[Span], inner: Span) -> None:
+        if route_span is not None and route_span.cat == "route":
+            route_span._inner = (inner.start_us, _now_us())
+
+    if asyncio.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+            parent = _current.get()
+            if parent is None:
+                return await func(*args, **kwargs)
+            with span(name, cat="endpoint") as inner:
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    finish(parent, inner)
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        parent = _current.get()
+        if parent is None:
+            return func(*args, **kwargs)
+        with span(name, cat="endpoint") as inner:
+            try:
+                return func(*args, **kwargs)
+            finally:
+                finish(parent, inner)
+    return wrapper
+
+
+def traced_handler(handler: Callable, path: str) -> Callable:
+    """包装路由处理函数 (参数校验 + 端点 + 序列化)"""
+
+    @functools.wraps(handler)
+    async def handle(request: Any) -> Any:
+        with span(f"route {path}", cat="route"):
+            return await handler(request)
+
+    return handle
+
+
+class TracingMiddleware:
+    """为每个 HTTP 请求开启根 span (名称为 方法 + 路由模板)，采样的响应带 X-Trace-Id"""
+
+    def __init__(self, app: Any, tracer: Tracer):
+        self.app = app
+        self.tracer = tracer
+
+    async def __call__(self, scope: dict, receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http" or not self.tracer.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        force = headers.get(TRACE_HEADER.encode()) == b"1"
+        method = scope.get("method", "")
+        root = self.tracer.trace(f"{method} {scope.get('path', '')}", cat="http", force=force)
+        if root is NOOP_SPAN:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_trace_id(message: dict):
+            if message["type"] == "http.response.start":
+                root.set(status=message["status"])
+                message = dict(message)
+                message["headers"] = list(message.get("headers") or []) + [
+                    (b"x-trace-id", root.trace_id.encode()),
+                ]
+            await send(message)
+
+        with root:
+            root.set(path=scope.get("path", ""))
+            try:
+                await self.app(scope, receive, send_with_trace_id)
+            finally:
+                route = getattr(scope.get("route"), "path", None)
+                if route:
+                    root.name = f"{method} {route}"
+
+
+def to_chrome_trace(lines: Iterable[str]) -> dict:
+    """把 JSONL 事件转换为 Chrome Trace 文件内容"""
+    events = [json.loads(line) for line in lines if line.strip()]
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("usage: python -m airalogy_mock.tracing <traces.jsonl>", file=sys.stderr)
+        sys.exit(2)
+    with open(sys.argv[1], encoding="utf-8") as f:
+        json.dump(to_chrome_trace(f), sys.stdout)
@@ -0,0 +1,336 @@
+"""
+Version Store - 增量压缩的 Record 版本历史
+
+records/ 目录只保存每条记录的最新版本 (head)，历史版本进入
+history/<record_uuid>/：
+
+    v.<N>.json          完整快照 (每 snapshot_interval 个版本一个)
+    v.<N>.patch.json    反向 JSON Patch (RFC 6902)：把下一个版本还原为版本 N
+
+采用反向增量 (类似 RCS)：head 前移时，旧 head 和新 head 都在手上，
+直接计算补丁即可，不需要先重建旧版本。读取版本 N 时从不小于 N 的
+最近快照 (或 head) 出发，依次应用补丁。
+
+每个补丁都相对于比它新的最近一个现存版本 (已归档的版本或 head)。单独删除或改写
+某个版本后，比它旧的最近一个补丁会重新计算 (rebase)，版本号之间可以有空缺。
+
+冷数据压缩 (compact) 后，较旧的快照/补丁移入 PackStore ("<uuid>/<文件名>" 为 key)，
+读取时先找散文件，再找包文件，对调用方透明。
+"""
+
+import json
+import shutil
+from pathlib import Path
+from typing import Any, Optional
+
+from .fsutil import atomic_write_text
+from .packs import PackStore
+
+_MISSING = object()
+
+
+# ============================================================
+# JSON Patch
+# ============================================================
+
+def _escape(token: str) -> str:
+    return token.replace("~", "~0").replace("/", "~1")
+
+
+def _unescape(token: str) -> str:
+    return token.replace("~1", "/").replace("~0", "~")
+
+
+def make_patch(src: Any, dst: Any, path: str = "") -> list[dict]:
+    """
+    计算把 src 变为 dst 的 JSON Patch
+
+    对象逐键递归比较；列表和标量不同则整体 replace。
+    """
+    if isinstance(src, dict) and isinstance(dst, dict):
+        ops = []
+        for key in src.keys() - dst.keys():
+            ops.append({"op": "remove", "path": f"{path}/{_escape(key)}"})
+        for key, value in dst.items():
+            child = f"{path}/{_escape(key)}"
+            if key not in src:
+                ops.append({"op": "add", "path": child, "value": value})
+            elif src[key] != value:
+                ops.extend(make_patch(src[key], value, child))
+        return ops
+    if src == dst and type(src) is type(dst):
+        return []
+    return [{"op": "replace", "path": path, "value": dst}]
+
+
+def apply_patch(doc: Any, patch: list[dict]) -> Any:
+    """
+    应用 JSON Patch (支持 add/remove/replace)，返回新文档
+
+    只复制补丁路径上的容器，未修改的子树与原文档共享。
+    """
+    for op in patch:
+        tokens = [_unescape(t) for t in op["path"].split("/")[1:]]
+        if not tokens:
+            doc = op.get("value")
+            continue
+        doc = _apply_at(doc, tokens, op)
+    return doc
+
+
+def _apply_at(node: Any, tokens: list[str], op: dict) -> Any:
+    key = tokens[0]
+    if isinstance(node, list):
+        node = list(node)
+        index = len(node) if key == "-" else int(key)
+        if len(tokens) > 1:
+            node[index] = _apply_at(node[index], tokens[1:], op)
+        elif op["op"] == "remove":
+            del node[index]
+        elif op["op"] == "add":
+            node.insert(index, op["value"])
+        else:
+            node[index] = op["value"]
+        return node
+
+    node = dict(node)
+    if len(tokens) > 1:
+        node[key] = _apply_at(node[key], tokens[1:], op)
+    elif op["op"] == "remove":
+        node.pop(key, None)
+    else:
+        node[key] = op["value"]
+    return node
+
+
+# ============================================================
+# 版本存储
+# ============================================================
+
+class VersionStore:
+    """
+    历史版本存储
+
+    head (最新版本) 由调用方保存在 records/ 中，这里只保存更早的版本。
+    """
+
+    def __init__(self, history_dir: Path, snapshot_interval: int = 10, pack: Optional[PackStore] = None):
+        """
+        Args:
+            history_dir: 历史版本根目录
+            snapshot_interval: 每隔多少个版本保存一个完整快照
+            pack: 冷数据包 (compact 后旧版本从这里读取)
+        """
+        self.history_dir = Path(history_dir)
+        self.snapshot_interval = max(1, snapshot_interval)
+        self.pack = pack
+        self.history_dir.mkdir(parents=True, exist_ok=True)
+
+    def _record_dir(self, record_uuid: str) -> Path:
+        return self.history_dir / record_uuid
+
+    def _snapshot_path(self, record_uuid: str, version: int) -> Path:
+        return self._record_dir(record_uuid) / f"v.{version}.json"
+
+    def _patch_path(self, record_uuid: str, version: int) -> Path:
+        return self._record_dir(record_uuid) / f"v.{version}.patch.json"
+
+    def _pack_key(self, path: Path) -> str:
+        return f"{path.parent.name}/{path.name}"
+
+    def _read_json(self, path: Path) -> Any:
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            data = self.pack.get(self._pack_key(path)) if self.pack is not None else None
+            if data is None:
+                raise
+            return json.loads(data)
+
+    def _exists(self, path: Path) -> bool:
+        return path.exists() or (self.pack is not None and self._pack_key(path) in self.pack)
+
+    def archive(self, record_uuid: str, old_record: dict, new_record: dict) -> None:
+        """
+        head 从 old_record 前移到 new_record 时归档旧版本
+
+        快照版本保存完整内容，其余版本保存 new -> old 的反向补丁。
+        """
+        version = old_record.get("record_version", 1)
+        record_dir = self._record_dir(record_uuid)
+        record_dir.mkdir(parents=True, exist_ok=True)
+
+        if version % self.snapshot_interval == 0:
+            atomic_write_text(
+                self._snapshot_path(record_uuid, version),
+                json.dumps(old_record, ensure_ascii=False),
+            )
+        else:
+            patch = make_patch(new_record, old_record)
+            atomic_write_text(
+                self._patch_path(record_uuid, version),
+                json.dumps(patch, ensure_ascii=False, separators=(",", ":")),
+            )
+
+    def _previous(self, record_uuid: str, version: int) -> Optional[int]:
+        """比 version 旧的最近一个已归档版本"""
+        return max((v for v in self.versions(record_uuid) if v < version), default=None)
+
+    def has_delta(self, record_uuid: str, version: int) -> bool:
+        """比 version 旧的最近一个已归档版本是否为反向补丁 (依赖版本 version 的内容)"""
+        previous = self._previous(record_uuid, version)
+        return previous is not None and self._exists(self._patch_path(record_uuid, previous))
+
+    def _write_patch(self, record_uuid: str, version: int, patch: list[dict]) -> None:
+        # 散文件优先于包文件读取，直接覆盖即可
+        patch_path = self._patch_path(record_uuid, version)
+        patch_path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write_text(patch_path, json.dumps(patch, ensure_ascii=False, separators=(",", ":")))
+
+    def rebase(self, record_uuid: str, old_doc: dict, new_doc: dict) -> None:
+        """
+        版本在同一版本号下被改写时 (Session 保存、重命名)，重算上一个版本的反向补丁
+
+        上一个版本的补丁是相对旧内容计算的，不重算会把修改带进更旧的版本。
+        调用方先用 has_delta() 确认上一个版本是补丁 (快照不依赖较新的版本)。
+        """
+        previous_version = self._previous(record_uuid, new_doc.get("record_version", 1))
+        previous = apply_patch(old_doc, self._read_json(self._patch_path(record_uuid, previous_version)))
+        self._write_patch(record_uuid, previous_version, make_patch(new_doc, previous))
+
+    def _newer(self, record_uuid: str, version: int, head: Optional[dict]) -> Optional[dict]:
+        """比 version 新的最近一个现存版本 (已归档或 head) 的内容"""
+        newer = min((v for v in self.versions(record_uuid) if v > version), default=None)
+        return head if newer is None else self.get(record_uuid, newer, head)
+
+    def replace(self, record_uuid: str, version: int, new_doc: dict, head: Optional[dict]) -> None:
+        """改写已归档的版本 (例如重命名历史版本)，保持原来的快照/补丁形式"""
+        old_doc = self.get(record_uuid, version, head)
+        if self._exists(self._snapshot_path(record_uuid, version)):
+            atomic_write_text(
+                self._snapshot_path(record_uuid, version),
+                json.dumps(new_doc, ensure_ascii=False),
+            )
+        else:
+            self._write_patch(record_uuid, version, make_patch(self._newer(record_uuid, version, head), new_doc))
+        if self.has_delta(record_uuid, version):
+            self.rebase(record_uuid, old_doc, new_doc)
+
+    def remove(self, record_uuid: str, version: int, head: Optional[dict]) -> None:
+        """删除一个已归档的版本，上一个版本的补丁改为相对更新的现存版本"""
+        if self.has_delta(record_uuid, version):
+            doc = self.get(record_uuid, version, head)
+            previous_version = self._previous(record_uuid, version)
+            previous = apply_patch(doc, self._read_json(self._patch_path(record_uuid, previous_version)))
+            self._write_patch(
+                record_uuid, previous_version, make_patch(self._newer(record_uuid, version, head), previous),
+            )
+        self._unlink(record_uuid, version)
+
+    def pop(self, record_uuid: str, version: int, head: Optional[dict]) -> dict:
+        """
+        取出一个已归档的版本并删除其归档 (head 被删除后，上一个版本重新成为 head)
+
+        更旧的补丁相对这个版本的内容，取出后仍然有效。
+        """
+        doc = self.get(record_uuid, version, head)
+        self._unlink(record_uuid, version)
+        return doc
+
+    def _unlink(self, record_uuid: str, version: int) -> None:
+        paths = [self._snapshot_path(record_uuid, version), self._patch_path(record_uuid, version)]
+        for path in paths:
+            path.unlink(missing_ok=True)
+        if self.pack is not None:
+            self.pack.remove(self._pack_key(path) for path in paths)
+        try:
+            self._record_dir(record_uuid).rmdir()
+        except OSError:
+            pass  # 还有其他版本
+
+    def versions(self, record_uuid: str) -> dict[int, str]:
+        """已归档的版本号 -> "snapshot" / "delta" """
+        record_dir = self._record_dir(record_uuid)
+        names = [path.name for path in record_dir.glob("v.*.json")] if record_dir.exists() else []
+        if self.pack is not None:
+            names += [key.split("/", 1)[1] for key in self.pack.keys_with_prefix(f"{record_uuid}/")]
+        result = {}
+        for name in names:
+            parts = name.split(".")
+            try:
+                version = int(parts[1])
+            except (IndexError, ValueError):
+                continue
+            result[version] = "delta" if name.endswith(".patch.json") else "snapshot"
+        return result
+
+    def has_version(self, record_uuid: str, version: int) -> bool:
+        """是否已归档该版本"""
+        return (
+            self._exists(self._snapshot_path(record_uuid, version))
+            or self._exists(self._patch_path(record_uuid, version))
+        )
+
+    def get(self, record_uuid: str, version: int, head: Optional[dict]) -> dict:
+        """
+        重建指定版本
+
+        Args:
+            record_uuid: 记录 UUID
+            version: 目标版本号
+            head: 当前 head 记录 (反向补丁链的起点)
+        """
+        archived = self.versions(record_uuid)
+        if version not in archived:
+            raise FileNotFoundError(f"Record version not found: {record_uuid} v.{version}")
+
+        # 从不小于目标版本的最近快照出发，否则从 head 出发
+        start = min(
+            (v for v, kind in archived.items() if kind == "snapshot" and v >= version),
+            default=None,
+        )
+        if start is not None:
+            doc = self._read_json(self._snapshot_path(record_uuid, start))
+        elif head is not None:
+            doc = head
+            start = head.get("record_version", 1)
+        else:
+            raise FileNotFoundError(f"Record head not found: {record_uuid}")
+
+        for v in sorted((v for v in archived if version <= v < start), reverse=True):
+            doc = apply_patch(doc, self._read_json(self._patch_path(record_uuid, v)))
+        return doc
+
+    def delete(self, record_uuid: str) -> None:
+        """删除记录的全部历史版本 (包括已打包的)"""
+        shutil.rmtree(self._record_dir(record_uuid), ignore_errors=True)
+        if self.pack is not None:
+            self.pack.remove(self.pack.keys_with_prefix(f"{record_uuid}/"))
+
+    def cold_files(self, older_than: float) -> list[Path]:
+        """修改时间早于 older_than (时间戳) 的散文件，compact 时打包"""
+        return [
+            path for path in self.history_dir.glob("*/v.*.json")
+            if path.stat().st_mtime < older_than
+        ]
+
+    def pack_cold(self, older_than: float, codec: Optional[str] = None) -> dict:
+        """
+        把冷的历史版本散文件打包 (需持有存储锁)
+
+        先写包和索引，再删除散文件；中途崩溃时散文件仍然有效。
+        """
+        if self.pack is None:
+            raise RuntimeError("VersionStore has no pack store")
+        files = self.cold_files(older_than)
+        items = {self._pack_key(path): path.read_bytes() for path in files}
+        result = {"packed": len(items), "loose_bytes": sum(len(v) for v in items.values())}
+        if items:
+            result.update(self.pack.rewrite(items, codec=codec))
+            for path in files:
+                path.unlink()
+                try:
+                    path.parent.rmdir()
+                except OSError:
+                    pass  # 目录中还有较新的散文件
+        return result
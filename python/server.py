@@ -17,6 +17,10 @@ if not os.environ.get("AIRALOGY_API_KEY"):
     os.environ["AIRALOGY_API_KEY"] = "mock-api-key"
 if not os.environ.get("AIRALOGY_PROTOCOL_ID"):
     os.environ["AIRALOGY_PROTOCOL_ID"] = "mock-protocol-id"
+# Session edits (session_set_var, session_upload, ...) are journaled immediately
+# and flushed to the record snapshot in the background at most once per interval.
+# Only the server's own clients autosave; clients created by assigner.py do not.
+AUTOSAVE_INTERVAL = float(os.environ.get("AIRALOGY_AUTOSAVE_INTERVAL") or 2.0)
 
 # Try to import airalogy SDK components
 try:
@@ -63,7 +67,7 @@ class ProjectManager:
         self.current_project_path: Optional[str] = None
         self.var_model: Optional[Type] = None
         self.has_assigners = False
-        self.mock_client = Airalogy() if HAS_MOCK else None
+        self.mock_client = Airalogy(autosave_interval=AUTOSAVE_INTERVAL) if HAS_MOCK else None
         self.overrides: Dict[str, Any] = {}  # Runtime variable overrides
 
     def load_project(self, project_path: str) -> bool:
@@ -105,7 +109,7 @@ class ProjectManager:
             
             # Only recreate client if path changed or not exists, to preserve active sessions
             if (not self.mock_client or self.current_project_path != project_path) and HAS_MOCK and Airalogy:
-                self.mock_client = Airalogy(storage_dir=storage_dir)
+                self.mock_client = Airalogy(storage_dir=storage_dir, autosave_interval=AUTOSAVE_INTERVAL)
             
             # Reset overrides on project reload
             self.overrides = {}
@@ -517,9 +521,12 @@ def handle_request(method: str, params: Optional[Dict[str, Any]] = None) -> Any:
             raise ValueError("Mock client not available")
         
         protocol_id = params.get("protocol_id", "mock-protocol")
-        session = manager.mock_client.start_record_session(protocol_id=protocol_id)
+        session = manager.mock_client.start_record_session(
+            protocol_id=protocol_id, activate=params.get("activate", True)
+        )
         return {
             "success": True, 
+            "session_id": session.session_id,
             "record_id": session.airalogy_record_id,
             "protocol_id": session.airalogy_protocol_id
         }
@@ -529,7 +536,9 @@ def handle_request(method: str, params: Optional[Dict[str, Any]] = None) -> Any:
             raise ValueError("Mock client not available")
         
         save = params.get("save", True)
-        record_id = manager.mock_client.end_record_session(save=save)
+        record_id = manager.mock_client.end_record_session(
+            save=save, session_id=params.get("session_id")
+        )
         return {
             "success": True, 
             "saved": save,
@@ -548,7 +557,7 @@ def handle_request(method: str, params: Optional[Dict[str, Any]] = None) -> Any:
         if not var_id or not file_name or not file_base64:
             raise ValueError("Missing parameters for session_upload")
             
-        session = manager.mock_client.get_active_session()
+        session = manager.mock_client.get_session(params.get("session_id"))
         if not session:
             raise ValueError("No active session")
             
@@ -572,17 +581,125 @@ def handle_request(method: str, params: Optional[Dict[str, Any]] = None) -> Any:
         var_id = params.get("var_id")
         value = params.get("value")
         
-        session = manager.mock_client.get_active_session()
+        session = manager.mock_client.get_session(params.get("session_id"))
         if not session:
             raise ValueError("No active session")
             
         session.set_var(var_id, value)
         return {"success": True}
 
+    elif method == "session_get_var":
+        if not manager.mock_client:
+            raise ValueError("Mock client not available")
+        
+        var_id = params.get("var_id")
+        session = manager.mock_client.get_session(params.get("session_id"))
+        if not session:
+            raise ValueError("No active session")
+        return {"var_id": var_id, "value": session.get_var(var_id)}
+
+    elif method == "session_batch":
+        if not manager.mock_client:
+            raise ValueError("Mock client not available")
+        
+        return manager.mock_client.apply_batch(
+            params.get("operations") or [],
+            session_id=params.get("session_id"),
+            atomic=params.get("atomic", False),
+            save=params.get("save", False),
+        )
+
+    elif method == "list_sessions":
+        if not manager.mock_client:
+            raise ValueError("Mock client not available")
+        return manager.mock_client.list_sessions()
+
     elif method == "list_records":
         if not manager.mock_client:
             raise ValueError("Mock client not available")
-        return manager.mock_client.list_records()
+        if "limit" not in params and "cursor" not in params:
+            return manager.mock_client.list_records()
+        return manager.mock_client.list_records_page(
+            sort=params.get("sort", "-updated_at"),
+            limit=params.get("limit") or 50,
+            cursor=params.get("cursor"),
+            fields=params.get("fields"),
+            filter=params.get("filter"),
+        )
+
+    elif method == "list_files":
+        if not manager.mock_client:
+            raise ValueError("Mock client not available")
+        return manager.mock_client.list_files_page(
+            sort=params.get("sort", "-uploaded_at"),
+            limit=params.get("limit") or 50,
+            cursor=params.get("cursor"),
+            fields=params.get("fields"),
+            filter=params.get("filter"),
+        )
+
+    elif method == "query_records":
+        if not manager.mock_client:
+            raise ValueError("Mock client not available")
+        return manager.mock_client.query_records(
+            params.get("filter"),
+            sort=params.get("sort"),
+            limit=params.get("limit"),
+            offset=params.get("offset", 0),
+        )
+
+    elif method == "gc_files":
+        if not manager.mock_client:
+            raise ValueError("Mock client not available")
+        return manager.mock_client.collect_garbage(
+            dry_run=params.get("dry_run", True),
+            quarantine=params.get("quarantine", False),
+            grace_period=params.get("grace_period", 3600.0),
+        )
+
+    elif method == "storage_stats":
+        if not manager.mock_client:
+            raise ValueError("Mock client not available")
+        return {
+            "record_cache": manager.mock_client.cache_stats(),
+            "packs": manager.mock_client.pack_stats(),
+        }
+
+    elif method == "compact_storage":
+        if not manager.mock_client:
+            raise ValueError("Mock client not available")
+        return manager.mock_client.compact(
+            cold_after=params.get("cold_after", 7 * 24 * 3600),
+            codec=params.get("codec"),
+        )
+
+    elif method == "export_records":
+        if not manager.mock_client:
+            raise ValueError("Mock client not available")
+        path = params.get("path")
+        if not path:
+            raise ValueError("Missing 'path'")
+        size = manager.mock_client.export_records_ndjson(
+            path, params.get("record_ids"), gzip=params.get("gzip", False),
+        )
+        return {"path": path, "bytes": size}
+
+    elif method == "import_records":
+        if not manager.mock_client:
+            raise ValueError("Mock client not available")
+        path = params.get("path")
+        if not path:
+            raise ValueError("Missing 'path'")
+        with open(path, "rb") as f:
+            return manager.mock_client.import_records_ndjson(f, overwrite=params.get("overwrite", False))
+
+    elif method == "search_records":
+        if not manager.mock_client:
+            raise ValueError("Mock client not available")
+        query = params.get("query")
+        if not query:
+            raise ValueError("Missing 'query'")
+        return manager.mock_client.search_records(query, limit=params.get("limit", 20))
 
     elif method == "session_load":
         if not manager.mock_client:
@@ -592,13 +709,22 @@ def handle_request(method: str, params: Optional[Dict[str, Any]] = None) -> Any:
         if not record_id:
             raise ValueError("Missing 'record_id'")
             
-        session = manager.mock_client.load_record_session(record_id)
-        return {
+        lazy = params.get("lazy", False)
+        session = manager.mock_client.load_record_session(
+            record_id, activate=params.get("activate", True), lazy=lazy
+        )
+        result = {
             "success": True, 
+            "session_id": session.session_id,
             "record_id": session.airalogy_record_id,
             "protocol_id": session.airalogy_protocol_id,
-            "data": session.to_record()
         }
+        if lazy:
+            # Large table vars are listed in lazy_vars and fetched via session_get_var
+            result.update(session.preview())
+        else:
+            result["data"] = session.to_record(inline=True)
+        return result
 
     elif method == "delete_record":
         if not manager.mock_client:
@@ -608,7 +734,10 @@ def handle_request(method: str, params: Optional[Dict[str, Any]] = None) -> Any:
         if not record_id:
             raise ValueError("Missing 'record_id'")
             
-        success = manager.mock_client.delete_record(record_id)
+        if params.get("all_versions"):
+            success = manager.mock_client.purge_record(record_id)
+        else:
+            success = manager.mock_client.delete_record(record_id)
         return {"success": success}
 
     elif method == "rename_record":
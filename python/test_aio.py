@@ -0,0 +1,78 @@
+"""Async facade tests."""
+
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from airalogy_mock.client import Airalogy
+
+
+@pytest.mark.parametrize("max_threads", [4, 2])
+def test_async_facade_runs_blocking_calls_in_bounded_pool(tmp_path, max_threads):
+    anyio = pytest.importorskip("anyio")
+    from airalogy_mock.aio import AsyncAiralogy
+
+    client = Airalogy(storage_dir=str(tmp_path))
+    aclient = AsyncAiralogy(client, max_threads=max_threads)
+    # max_threads calls must all be inside the pool at once to pass the barrier;
+    # a serial pool breaks it (timeout), an unbounded one shows up in peak
+    barrier = threading.Barrier(max_threads, timeout=5)
+    lock = threading.Lock()
+    running = peak = 0
+
+    def blocking_call():
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        try:
+            barrier.wait()
+        finally:
+            with lock:
+                running -= 1
+
+    async def main():
+        async with anyio.create_task_group() as tg:
+            for _ in range(4):
+                tg.start_soon(aclient.run, blocking_call)
+        return await aclient.create_record({"x": 1})
+
+    record = anyio.run(main)
+    assert peak == max_threads
+    assert client.get_record(record["airalogy_record_id"])["data"]["var"]["x"] == 1
+
+
+def test_async_facade_iterates_exports_in_the_pool(tmp_path):
+    anyio = pytest.importorskip("anyio")
+    from airalogy_mock.aio import AsyncAiralogy
+
+    client = Airalogy(storage_dir=str(tmp_path))
+    for i in range(3):
+        client.create_record({"x": i})
+    aclient = AsyncAiralogy(client, max_threads=1)
+    threads = set()
+    original = client.iter_records_ndjson
+
+    def iter_records_ndjson(*args, **kwargs):
+        for chunk in original(*args, **kwargs):
+            threads.add(threading.get_ident())
+            yield chunk
+
+    async def main():
+        chunks = []
+        async for chunk in aclient.iterate(iter_records_ndjson):
+            # Between chunks the single I/O thread is free for other calls
+            assert aclient.stats()["busy"] == 0
+            chunks.append(chunk)
+        return b"".join(chunks)
+
+    assert anyio.run(main) == b"".join(original())
+    assert threads and threading.get_ident() not in threads
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,41 @@
+"""Assigner dependency ordering tests."""
+
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def test_assign_plan_runs_in_dependency_order():
+    from types import SimpleNamespace
+    from airalogy_mock.assignplan import assignment_order, iter_assign
+
+    deps = {"report": ["ic50"], "ic50": ["od_mean"], "od_mean": ["od"], "blank": ["od"], "cycle": ["cycle"]}
+    assert assignment_order(dict.fromkeys(deps), deps.get) == ["od_mean", "blank", "cycle", "ic50", "report"]
+
+    class FakeAssigner:
+        @staticmethod
+        def all_assigned_fields():
+            return {field: {"mode": "auto"} for field in ["report", "ic50", "od_mean"]}
+
+        @staticmethod
+        def get_dependent_fields_of_assigned_key(field):
+            return deps[field]
+
+        @staticmethod
+        def assign(field, data):
+            if field == "ic50":
+                raise RuntimeError("fit did not converge")
+            return SimpleNamespace(success=True, assigned_fields={field: sum(data["od"])})
+
+    data = {"od": [0.5, 0.7]}
+    results = list(iter_assign(FakeAssigner, data))
+    assert [(r["field"], r["status"]) for r in results] == [("od_mean", "ok"), ("ic50", "error"), ("report", "skipped")]
+    assert data["od_mean"] == 1.2
+    assert "fit did not converge" in results[1]["error"]
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
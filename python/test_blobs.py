@@ -0,0 +1,128 @@
+"""Lazy loading and blob offload tests for large table variables."""
+
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from airalogy_mock.client import Airalogy
+from airalogy_mock.merkle import verify_record
+
+
+def test_lazy_session_load_defers_large_tables(tmp_path):
+    client = Airalogy(storage_dir=str(tmp_path))
+    session = client.start_record_session(protocol_id="lazy_test")
+    table = [{"well": f"A{i}", "od": i / 10} for i in range(500)]
+    session.set_vars({"operator": "kirk", "plate": table, "notes": "line1\nline2"})
+    record_id = session.save()
+    client.end_record_session()
+    expected = Airalogy(storage_dir=str(tmp_path)).get_record(record_id)
+
+    reopened = Airalogy(storage_dir=str(tmp_path))
+    lazy = reopened.load_record_session(record_id, lazy=True)
+    preview = lazy.preview()
+    assert preview["data"]["var"] == {"operator": "kirk", "notes": "line1\nline2"}
+    assert list(preview["lazy_vars"]) == ["plate"]
+
+    assert lazy.get_var("plate") == table
+    assert lazy.lazy_vars() == {}
+    assert lazy.save() == record_id
+    assert reopened.get_record(record_id) == expected
+
+    # Hand-edited / compact JSON falls back to a full parse
+    path = tmp_path / "records" / f"{record_id}.json"
+    path.write_text(json.dumps(expected))
+    assert Airalogy(storage_dir=str(tmp_path)).load_record_session(record_id, lazy=True).lazy_vars() == {}
+
+
+def test_large_tables_are_offloaded_to_shared_blobs(tmp_path):
+    client = Airalogy(storage_dir=str(tmp_path), blob_threshold=1024)
+    session = client.start_record_session(protocol_id="blob_test")
+    table = [{"well": f"A{i}", "od": i / 10} for i in range(200)]
+    session.set_vars({"operator": "kirk", "quantum_measurements": table})
+    v1 = session.save()
+    client.end_record_session()
+
+    stored = client.get_record(v1, inline=False)
+    ref = stored["data"]["var"]["quantum_measurements"]
+    assert ref["type"] == "table" and ref["rows"] == 200 and ref["columns"] == ["well", "od"]
+    assert verify_record(stored)
+    assert client.get_record(v1)["data"]["var"]["quantum_measurements"] == table
+
+    # Unchanged tables are shared across versions; resumed sessions read them on demand
+    v2 = client.update_record(v1, {"operator": "spock"})["airalogy_record_id"]
+    assert client.get_record(v2, inline=False)["data"]["var"]["quantum_measurements"] == ref
+    assert len(list((tmp_path / "blobs").glob("*/*.json"))) == 1
+    resumed = Airalogy(storage_dir=str(tmp_path), blob_threshold=1024).load_record_session(v2)
+    assert resumed.lazy_vars() == {"quantum_measurements": ref["bytes"]}
+    assert resumed.to_record()["data"]["var"]["quantum_measurements"] == ref
+    assert resumed.to_record(inline=True)["data"]["var"]["quantum_measurements"] == table
+    resumed.set_var("quantum_measurements", table[:100])
+    v3 = resumed.save()
+    assert len(list((tmp_path / "blobs").glob("*/*.json"))) == 2
+
+    # Exports are self-contained; blobs referenced only by deleted records are collected
+    exported = json.loads(b"".join(client.iter_records_ndjson([v3])))
+    assert exported["data"]["var"]["quantum_measurements"] == table[:100]
+    client.purge_record(v3)
+    report = client.collect_garbage(dry_run=False, grace_period=0)
+    assert report["blobs"]["removed"] == 2
+
+
+def test_blob_reads_do_not_share_the_cached_payload(tmp_path):
+    client = Airalogy(storage_dir=str(tmp_path), blob_threshold=256)
+    nested = {"wells": [{"id": f"A{i}", "reads": [i, i + 1]} for i in range(20)], "extra": [1]}
+    table = [{"well": f"A{i}", "tags": ["raw"]} for i in range(20)]
+    session = client.start_record_session(protocol_id="blob_copy_test")
+    session.set_vars({"layout": nested, "plate": table})
+    record_id = session.save()
+    client.end_record_session()
+    refs = client.get_record(record_id, inline=False)["data"]["var"]
+    assert refs["layout"]["type"] == "json" and refs["plate"]["type"] == "table"
+
+    # Lazy sessions resolve straight from the blob store's shared cache
+    first = client.load_record_session(record_id, lazy=True)
+    layout, plate = first.get_var("layout"), first.get_var("plate")
+    layout["wells"][0]["reads"].append(99)
+    layout["extra"].clear()
+    plate[0]["tags"].append("edited")
+    client.end_record_session()
+    assert client.get_record(record_id)["data"]["var"] == {"layout": nested, "plate": table}
+
+
+def test_saves_only_recheck_changed_vars_and_keep_lazy_tables_raw(tmp_path, monkeypatch):
+    client = Airalogy(storage_dir=str(tmp_path), blob_threshold=1 << 20)
+    session = client.start_record_session(protocol_id="lazy_save")
+    table = [{"well": f"A{i}", "od": i / 10} for i in range(500)]
+    session.set_vars({"operator": "kirk", "plate": table})
+    v1 = session.save()
+    client.end_record_session()
+    v2 = client.update_record(v1, {"operator": "spock"})["airalogy_record_id"]
+
+    reopened = Airalogy(storage_dir=str(tmp_path), blob_threshold=1 << 20)
+    offloaded = []
+    original = reopened._blobs.offload
+    monkeypatch.setattr(reopened._blobs, "offload", lambda value, threshold: offloaded.append(value) or original(value, threshold))
+    lazy = reopened.load_record_session(v2, lazy=True)
+    lazy.set_var("operator", "uhura")
+    assert lazy.save() == v2
+    lazy.set_var("notes", "rerun")
+    lazy.save()
+    # Only the edited variables are re-serialized; the table is written back unparsed
+    assert offloaded == ["uhura", "rerun"]
+    assert list(lazy.lazy_vars()) == ["plate"]
+    reopened.end_record_session()
+
+    fresh = Airalogy(storage_dir=str(tmp_path))
+    record = fresh.get_record(v2)
+    assert record["data"]["var"] == {"operator": "uhura", "plate": table, "notes": "rerun"}
+    assert verify_record(record)
+    assert fresh.get_record(v1)["data"]["var"] == {"operator": "kirk", "plate": table}
+    assert Airalogy(storage_dir=str(tmp_path)).load_record_session(v2, lazy=True).lazy_vars() == lazy.lazy_vars()
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,56 @@
+"""Environment diagnostics tests."""
+
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def test_diagnostics_probe_is_cached_until_install_changes(tmp_path):
+    import subprocess
+    import types
+    from airalogy_mock.diagnostics import Diagnostics
+
+    def git(*args):
+        subprocess.run(
+            ["git", "-c", "user.name=t", "-c", "user.email=t@example.com", *args],
+            cwd=tmp_path, check=True, capture_output=True,
+        )
+
+    package = tmp_path / "fakesdk"
+    package.mkdir()
+    (package / "__init__.py").write_text("__version__ = '9.9'\n")
+    git("init", "-q")
+    git("add", ".")
+    git("commit", "-q", "-m", "first")
+
+    module = types.ModuleType("fakesdk")
+    module.__file__ = str(package / "__init__.py")
+    module.__version__ = "9.9"
+    diagnostics = Diagnostics(module)
+    diagnostics.start().join()
+
+    info = diagnostics.sdk_info()
+    assert info["install_source"] == "github_editable"
+    assert info["dirty"] is False
+    for _ in range(3):
+        assert diagnostics.sdk_info() is info
+    assert diagnostics.probes == 1
+
+    (package / "extra.py").write_text("")
+    git("add", ".")
+    git("commit", "-q", "-m", "second")
+    updated = diagnostics.sdk_info()
+    assert diagnostics.probes == 2
+    assert updated["commit_id"] != info["commit_id"]
+    assert updated["commit_short"] == updated["commit_id"][:len(updated["commit_short"])]
+
+    runtime = diagnostics.runtime()
+    assert runtime["uptime_seconds"] >= 0
+    assert runtime["pid"] == os.getpid()
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,71 @@
+"""Orphaned file garbage collection tests."""
+
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from airalogy_mock.client import Airalogy
+
+
+def test_gc_removes_only_unreferenced_files(tmp_path):
+    client = Airalogy(storage_dir=str(tmp_path))
+    old_image = client.upload_file_bytes("plate.png", b"old" * 100)["id"]
+    new_image = client.upload_file_bytes("plate.png", b"new" * 100)["id"]
+    table_file = client.upload_file_bytes("raw.csv", b"a,b\n1,2\n")["id"]
+    stray = client.upload_file_bytes("stray.txt", b"unused")["id"]
+
+    session = client.start_record_session(protocol_id="gc_test")
+    session.set_var("image", old_image)
+    session.set_var("runs", [{"name": "r1", "raw": table_file}])
+    record_id = session.save()
+    client.end_record_session()
+    # Re-uploading the image keeps the old file alive through version history
+    client.update_record(record_id, {"image": new_image})
+
+    report = client.collect_garbage(grace_period=0)
+    assert report["dry_run"] is True
+    assert [o["id"] for o in report["orphans"]] == [stray]
+    assert report["reclaimable_bytes"] == 6
+    assert (client.files_dir / stray).exists()
+
+    # Recent uploads are protected by the grace period
+    assert client.collect_garbage(dry_run=False)["removed"] == 0
+
+    report = client.collect_garbage(dry_run=False, quarantine=True, grace_period=0)
+    assert report["removed"] == 1
+    assert not (client.files_dir / stray).exists()
+    assert os.path.exists(os.path.join(report["quarantine_dir"], stray))
+    assert {f["id"] for f in client.list_files_page()["items"]} == {old_image, new_image, table_file}
+
+    # Once the record (and its history) is gone, all of its files are orphans
+    client.purge_record(record_id)
+    assert client.collect_garbage(dry_run=False, grace_period=0)["removed"] == 3
+
+
+
+def test_gc_keeps_files_referenced_from_offloaded_tables(tmp_path):
+    client = Airalogy(storage_dir=str(tmp_path), blob_threshold=256)
+    raw = client.upload_file_bytes("raw.csv", b"a,b\n1,2\n")["id"]
+    session = client.start_record_session(protocol_id="gc_test")
+    session.set_var("runs", [{"well": f"A{i}", "raw": raw if i == 0 else None} for i in range(20)])
+    record_id = session.save()
+    client.end_record_session()
+    assert "$blob" in client.get_record(record_id, inline=False)["data"]["var"]["runs"]
+
+    report = client.collect_garbage(dry_run=False, grace_period=0)
+    assert report["removed"] == 0
+    assert report["blobs"]["removed"] == 0
+    assert client.download_file_bytes(raw) == b"a,b\n1,2\n"
+
+    # Once the table's record is gone, the blob and the file are both reclaimed
+    client.purge_record(record_id)
+    report = client.collect_garbage(dry_run=False, grace_period=0)
+    assert report["removed"] == 1
+    assert report["blobs"]["removed"] == 1
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,55 @@
+"""ETag helper tests."""
+
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from airalogy_mock.client import Airalogy
+
+
+def test_generation_etags_change_on_every_write(tmp_path):
+    from airalogy_mock.httpcache import etag_matches, generation_etag, json_etag
+
+    client = Airalogy(storage_dir=str(tmp_path))
+    before = generation_etag(client.store_generation(), "/api/records?")
+    assert etag_matches(before, before)
+    assert etag_matches(f'"other", W/{before}', before)
+    assert etag_matches("*", before)
+    assert not etag_matches(None, before)
+    assert generation_etag(client.store_generation(), "/api/records?limit=5") != before
+
+    client.upload_file_bytes("a.txt", b"hello")
+    after_upload = generation_etag(client.store_generation(), "/api/records?")
+    assert after_upload != before
+    client.create_record({"temp": 37.0})
+    assert generation_etag(client.store_generation(), "/api/records?") != after_upload
+
+    assert json_etag({"a": 1, "b": 2}) == json_etag({"b": 2, "a": 1})
+
+
+
+def test_record_etag_changes_when_only_the_alias_changes(tmp_path):
+    from airalogy_mock.httpcache import record_etag
+
+    client = Airalogy(storage_dir=str(tmp_path))
+    session = client.start_record_session(protocol_id="etag_test")
+    session.set_var("temp", 37.0)
+    record_id = session.save()
+    client.end_record_session()
+
+    before = record_etag(client.get_record(record_id))
+    assert record_etag(client.get_record(record_id)) == before
+    assert record_etag(client.get_record(record_id), inline=False) != before
+
+    client.rename_record(record_id, "plate 1")
+    renamed = client.get_record(record_id)
+    assert renamed["metadata"]["sha1"] in before
+    assert record_etag(renamed) != before
+    assert record_etag({"data": {}}) is None
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
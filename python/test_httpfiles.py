@@ -0,0 +1,45 @@
+"""HTTP range/streaming helper tests."""
+
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from airalogy_mock.client import Airalogy
+
+
+@pytest.mark.parametrize("header,expected", [
+    ("bytes=0-9", (0, 9)),
+    ("bytes=90-", (90, 99)),
+    ("bytes=-10", (90, 99)),
+    ("bytes=50-500", (50, 99)),
+    ("bytes=0-1,5-6", None),
+    (None, None),
+])
+def test_range_header_parsing(header, expected):
+    from airalogy_mock.httpfiles import parse_range
+
+    assert parse_range(header, 100) == expected
+
+
+def test_streamed_file_ranges_match_content(tmp_path):
+    from airalogy_mock.httpfiles import RangeNotSatisfiable, iter_file, media_type_for, parse_range
+
+    client = Airalogy(storage_dir=str(tmp_path))
+    payload = os.urandom(200_000)
+    file_id = client.upload_file_bytes("stack.tiff", payload)["id"]
+    info = client.stat_file(file_id)
+    assert info["size"] == len(payload)
+    assert len(info["sha256"]) == 64
+    assert media_type_for(file_id) == "image/tiff"
+
+    start, end = parse_range("bytes=70000-", info["size"])
+    assert b"".join(iter_file(info["path"], start, end - start + 1, chunk_size=4096)) == payload[70000:]
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range("bytes=200000-", info["size"])
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,106 @@
+"""Journal and autosave tests for airalogy_mock record sessions."""
+
+import gc
+import time
+import os
+import sys
+import weakref
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from airalogy_mock.client import Airalogy, _autosave_clients
+from airalogy_mock.journal import RecordJournal
+
+
+def test_journal_replay_after_crash(tmp_path):
+    client = Airalogy(storage_dir=str(tmp_path))
+    session = client.start_record_session(protocol_id="journal_test")
+    session.set_var("culture_temp", 37.0)
+    session.complete_step("open_portal", annotation="calibrated")
+    session.pass_check("dimension_stability")
+    record_id = session.airalogy_record_id
+
+    # Simulate a crash: no save(), new client restores from snapshot + journal
+    restored = Airalogy(storage_dir=str(tmp_path)).get_active_session()
+    assert restored is not None
+    assert restored.airalogy_record_id == record_id
+    assert restored.get_var("culture_temp") == 37.0
+    assert restored.get_step("open_portal") == {"checked": True, "annotation": "calibrated"}
+    assert restored.get_check("dimension_stability")["checked"] is True
+
+
+def test_journal_compaction(tmp_path):
+    client = Airalogy(storage_dir=str(tmp_path), journal_compact_threshold=3)
+    session = client.start_record_session(protocol_id="journal_test")
+    for i in range(3):
+        session.set_var(f"v{i}", i)
+
+    # Threshold reached: snapshot written and journal cleared
+    assert session._journal.count() == 0
+    assert client.get_record(session.airalogy_record_id)["data"]["var"]["v2"] == 2
+
+
+def test_end_without_save_discards_journal(tmp_path):
+    client = Airalogy(storage_dir=str(tmp_path))
+    session = client.start_record_session(protocol_id="journal_test")
+    session.set_var("culture_temp", 40.0)
+    record_id = session.airalogy_record_id
+    client.end_record_session(save=False)
+
+    reloaded = client.load_record_session(record_id)
+    assert reloaded.get_var("culture_temp") is None
+
+
+def test_append_does_not_skip_lines_from_other_writers(tmp_path):
+    path = tmp_path / "shared.jsonl"
+    ours, theirs = RecordJournal(path), RecordJournal(path)
+    theirs.append({"op": "var", "id": "a", "value": 1})
+    ours.append({"op": "var", "id": "b", "value": 2})
+    # Our line followed a foreign one: both are left for read_new()
+    assert [e["id"] for e in ours.read_new()] == ["a", "b"]
+    assert [e["id"] for e in theirs.read_new()] == ["b"]
+
+    ours.append({"op": "var", "id": "c", "value": 3})
+    assert ours.read_new() == []
+    assert ours.count() == 3
+
+
+def test_autosave_coalesces_edits(tmp_path):
+    client = Airalogy(storage_dir=str(tmp_path), autosave_interval=0.2)
+    session = client.start_record_session(protocol_id="autosave_test")
+    for i in range(20):
+        session.set_var("counter", i)
+
+    time.sleep(0.6)
+    assert client._autosave.writes == 1
+    assert client.get_record(session.airalogy_record_id)["data"]["var"]["counter"] == 19
+    assert session._journal.count() == 0
+
+
+def test_discarded_session_is_not_written_by_a_pending_autosave(tmp_path):
+    client = Airalogy(storage_dir=str(tmp_path), autosave_interval=60)
+    session = client.start_record_session(protocol_id="autosave_test")
+    session.save()
+    session.set_var("culture_temp", 40.0)
+    record_id = session.airalogy_record_id
+
+    # The autosave thread has already taken the session off the dirty list
+    client.end_record_session(save=False)
+    assert client._autosave.pending() == 0
+    client._autosave._save_all([session])
+    assert "culture_temp" not in client.get_record(record_id)["data"]["var"]
+
+
+def test_autosave_clients_are_not_kept_alive(tmp_path):
+    client = Airalogy(storage_dir=str(tmp_path), autosave_interval=60)
+    assert client in _autosave_clients
+    ref = weakref.ref(client)
+    del client
+    gc.collect()
+    assert ref() is None
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
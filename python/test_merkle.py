@@ -0,0 +1,37 @@
+"""Merkle record hashing tests."""
+
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from airalogy_mock.client import Airalogy
+from airalogy_mock.merkle import compute_merkle, diff_merkle, verify_record
+
+
+def test_merkle_root_tracks_incremental_edits(tmp_path):
+    client = Airalogy(storage_dir=str(tmp_path))
+    session = client.start_record_session(protocol_id="merkle_test")
+    session.set_vars({"culture_temp": 37.0, "table": [{"a": 1}, {"a": 2}]})
+    session.pass_check("temperature_check")
+    before = session.to_record()
+
+    session.set_var("culture_temp", 38.5)
+    after = session.to_record()
+
+    # Incremental hashes match a from-scratch computation
+    assert after["metadata"]["sha1"] == compute_merkle(after["data"])["root"]
+    assert verify_record(after)
+    assert diff_merkle(before["metadata"]["merkle"], after["metadata"]["merkle"]) == {
+        "var": {"added": [], "removed": [], "changed": ["culture_temp"]},
+    }
+
+    updated = client.update_record(session.save(), {"var": {"culture_temp": 39.0}})
+    assert verify_record(updated)
+    assert verify_record(updated, sections=["var"], keys=["culture_temp"])
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,40 @@
+"""Prometheus metrics registry tests."""
+
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def test_metrics_registry_renders_prometheus_text():
+    from airalogy_mock.metrics import MetricsRegistry
+
+    registry = MetricsRegistry()
+    requests = registry.counter("demo_requests_total", "Requests", ("route",))
+    latency = registry.histogram("demo_latency_seconds", "Latency", ("route",), buckets=(0.1, 1.0))
+    registry.callback("demo_sessions", "Sessions", lambda: 3)
+    registry.callback("demo_broken", "Skipped when the source fails", lambda: 1 / 0)
+
+    requests.inc(route="/api/records/{record_id}")
+    requests.inc(2, route='/quote"d')
+    for seconds in (0.05, 0.5, 5.0):
+        latency.observe(seconds, route="/api/records")
+    with pytest.raises(ValueError):
+        requests.inc(path="/api/records")
+
+    lines = registry.render().splitlines()
+    assert "# TYPE demo_latency_seconds histogram" in lines
+    assert 'demo_requests_total{route="/api/records/{record_id}"} 1' in lines
+    assert 'demo_requests_total{route="/quote\\"d"} 2' in lines
+    assert 'demo_latency_seconds_bucket{route="/api/records",le="0.1"} 1' in lines
+    assert 'demo_latency_seconds_bucket{route="/api/records",le="1"} 2' in lines
+    assert 'demo_latency_seconds_bucket{route="/api/records",le="+Inf"} 3' in lines
+    assert 'demo_latency_seconds_count{route="/api/records"} 3' in lines
+    assert "demo_sessions 3" in lines
+    assert not any(line.startswith("demo_broken") for line in lines)
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,72 @@
+"""NDJSON bulk export/import tests."""
+
+import io
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from airalogy_mock.client import Airalogy
+
+
+@pytest.mark.parametrize("gzip", [False, True])
+def test_ndjson_export_import_roundtrip(tmp_path, gzip):
+    source = Airalogy(storage_dir=str(tmp_path / "source"))
+    ids = []
+    for i in range(5):
+        session = source.start_record_session(protocol_id="export_test")
+        session.set_var("index", i)
+        ids.append(session.save())
+    source.end_record_session()
+    ids.append(source.update_record(ids[0], {"index": 100})["airalogy_record_id"])
+
+    stream = source.iter_records_ndjson(gzip=gzip)
+    first = next(stream)
+    assert first.startswith(b"\x1f\x8b") if gzip else first.endswith(b"\n")
+    payload = io.BytesIO(first + b"".join(stream))
+
+    target = Airalogy(storage_dir=str(tmp_path / "target"))
+    assert target.import_records_ndjson(payload) == {"imported": 5, "skipped": 0, "errors": []}
+    assert target.get_record(ids[-1])["data"]["var"]["index"] == 100
+
+    # Re-importing skips records that already exist at the same version
+    payload.seek(0)
+    assert target.import_records_ndjson(payload)["skipped"] == 5
+
+
+
+def test_import_runs_alongside_updates(tmp_path):
+    client = Airalogy(storage_dir=str(tmp_path))
+    session = client.start_record_session(protocol_id="export_test")
+    session.set_var("index", 0)
+    record_id = session.save()
+    client.end_record_session()
+    payload = b"".join(client.iter_records_ndjson())
+    client.list_records_page()  # build the in-memory index so writes update it
+
+    errors = []
+
+    def run(work):
+        try:
+            for _ in range(30):
+                work()
+        except Exception as e:  # pragma: no cover - reported below
+            errors.append(e)
+
+    threads = [
+        threading.Thread(target=run, args=(lambda: client.import_records_ndjson(io.BytesIO(payload), overwrite=True),), daemon=True),
+        threading.Thread(target=run, args=(lambda: client.update_record(record_id, {"index": 1}),), daemon=True),
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=30)
+    assert not any(thread.is_alive() for thread in threads), "import and update deadlocked"
+    assert errors == []
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
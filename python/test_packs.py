@@ -0,0 +1,70 @@
+"""Pack file compaction tests."""
+
+import os
+import sys
+import json
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from airalogy_mock.client import Airalogy
+
+
+def test_compact_packs_cold_objects_transparently(tmp_path):
+    client = Airalogy(storage_dir=str(tmp_path), snapshot_interval=4)
+    image = client.upload_file_bytes("gel.png", b"png" * 10)["id"]
+    session = client.start_record_session(protocol_id="pack_test")
+    session.set_var("image", image)
+    ids = [session.save()]
+    client.end_record_session()
+    for i in range(5):
+        ids.append(client.update_record(ids[-1], {"round": i})["airalogy_record_id"])
+    expected = [client.get_record(rid) for rid in ids]
+
+    result = client.compact(cold_after=0, codec="zlib")
+    assert result["history"]["packed"] == 5
+    assert result["file_meta"]["packed"] == 1
+    assert list(client.history_dir.glob("*/*.json")) == []
+    assert list(client.files_dir.glob("*.meta.json")) == []
+
+    # Reads go through the offset index, from this and other processes
+    reopened = Airalogy(storage_dir=str(tmp_path))
+    assert [reopened.get_record(rid) for rid in ids] == expected
+    assert reopened.list_record_versions(ids[-1]) == ids
+    assert reopened.get_file_meta(image)["file_name"] == "gel.png"
+    assert reopened.list_files_page()["items"][0]["id"] == image
+
+    # New versions stay loose until the next compaction; GC still sees packed references
+    ids.append(reopened.update_record(ids[-1], {"round": 99})["airalogy_record_id"])
+    assert len(list(reopened.history_dir.glob("*/*.json"))) == 1
+    assert reopened.collect_garbage(grace_period=0)["orphans"] == []
+
+    reopened.purge_record(ids[-1])
+    assert reopened.pack_stats()["history"]["objects"] == 0
+
+
+def test_packs_indexed_under_the_old_gzip_name_are_read_as_zlib(tmp_path):
+    client = Airalogy(storage_dir=str(tmp_path))
+    first = client.create_record({"round": 0})["airalogy_record_id"]
+    second = client.update_record(first, {"round": 1})["airalogy_record_id"]
+    expected = client.get_record(first)
+    client.compact(cold_after=0, codec="zlib")
+
+    index_path = tmp_path / "packs" / "history.idx.json"
+    index = json.loads(index_path.read_text())
+    assert index["codec"] == "zlib"
+    index["codec"] = "gzip"
+    index_path.write_text(json.dumps(index))
+
+    reopened = Airalogy(storage_dir=str(tmp_path))
+    assert reopened.get_record(first) == expected
+    assert reopened.pack_stats()["history"]["codec"] == "zlib"
+    reopened.update_record(second, {"round": 2})
+    reopened.compact(cold_after=0, codec="gzip")
+    assert json.loads(index_path.read_text())["codec"] == "zlib"
+    assert reopened.get_record(first) == expected
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,53 @@
+"""Record cache tests."""
+
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from airalogy_mock.client import Airalogy
+
+
+def test_record_cache_serves_hot_reads_without_stale_data(tmp_path):
+    client = Airalogy(storage_dir=str(tmp_path), cache_max_bytes=4096)
+    session = client.start_record_session(protocol_id="cache_test")
+    session.set_var("culture_temp", 37.0)
+    record_id = session.save()
+    client.end_record_session()
+
+    for _ in range(5):
+        assert client.get_record(record_id)["data"]["var"]["culture_temp"] == 37.0
+    assert client.cache_stats()["hits"] == 5
+
+    # Another writer replaces the file behind the cache's back
+    other = Airalogy(storage_dir=str(tmp_path))
+    other.rename_record(record_id, "edited elsewhere")
+    assert client.get_record(record_id)["alias"] == "edited elsewhere"
+
+    # Writes refresh the cached copy; updating never mutates the cached head
+    head = client.get_record(record_id)
+    updated = client.update_record(record_id, {"culture_temp": 38.0})
+    assert head["data"]["var"]["culture_temp"] == 37.0
+    assert client.get_record(updated["airalogy_record_id"]) == updated
+
+    # Callers get copies; mutating them never corrupts the cached record
+    for record in (updated, client.get_record(updated["airalogy_record_id"])):
+        record["alias"] = "mutated"
+        record["data"]["var"]["culture_temp"] = 0
+    cached = client.get_record(updated["airalogy_record_id"])
+    assert cached["alias"] == "edited elsewhere"
+    assert cached["data"]["var"]["culture_temp"] == 38.0
+
+    # Records larger than the byte budget are never cached
+    session = client.start_record_session(protocol_id="cache_test")
+    session.set_var("blob", "x" * 8192)
+    big_id = session.save()
+    client.end_record_session()
+    client.get_record(big_id)
+    assert client.cache_stats()["bytes"] <= 4096
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,145 @@
+"""Record query and paginated listing tests."""
+
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from airalogy_mock.client import Airalogy
+
+
+def test_query_records_uses_secondary_indexes(tmp_path):
+    client = Airalogy(storage_dir=str(tmp_path))
+    for protocol, temp in [("cck8", 36.5), ("cck8", 37.5), ("cck8", 39.0), ("elisa", 38.0)]:
+        session = client.start_record_session(protocol_id=protocol)
+        session.set_vars({"culture_temp": temp, "operator": "alice"})
+        session.save()
+    client.end_record_session()
+
+    result = client.query_records(
+        {"protocol_id": "cck8", "var.culture_temp": {"$gt": 37}},
+        sort="-var.culture_temp",
+    )
+    assert result["total"] == 2
+    assert [item["var"]["culture_temp"] for item in result["items"]] == [39.0, 37.5]
+
+    # Index is maintained on write
+    hot = result["items"][0]
+    client.update_record(hot["id"], {"culture_temp": 36.0})
+    assert client.query_records({"var.culture_temp": {"$gte": 37, "$lt": 38.5}})["total"] == 2
+    client.delete_record(client.query_records({"protocol_id": "elisa"})["items"][0]["id"])
+    assert client.query_records({"var.operator": "alice"}, limit=2)["total"] == 3
+
+    with pytest.raises(ValueError):
+        client.query_records({"var.culture_temp": {"$regex": "3"}})
+
+    # Sort accepts the same aliases as paginated listing and rejects unindexed fields
+    by_protocol = client.query_records(sort="-protocol")["items"]
+    assert [item["short_protocol_id"] for item in by_protocol] == ["cck8"] * 3
+    with pytest.raises(ValueError):
+        client.query_records(sort="culture_temp")
+
+
+def test_paginated_listing_with_cursor(tmp_path):
+    client = Airalogy(storage_dir=str(tmp_path))
+    for i in range(7):
+        session = client.start_record_session(protocol_id="page_test")
+        session.set_var("rank", i % 3)
+        session.save()
+    client.end_record_session()
+
+    seen, cursor = [], None
+    while True:
+        page = client.list_records_page(sort="var.rank", limit=3, cursor=cursor, fields=["var.rank"])
+        assert page["total"] == 7
+        seen.extend(page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert [item["var"]["rank"] for item in seen] == [0, 0, 0, 1, 1, 2, 2]
+    assert len({item["id"] for item in seen}) == 7
+    assert set(seen[0]) == {"id", "var"}
+
+    for name, size in [("a.txt", 30), ("b.png", 10), ("c.txt", 20)]:
+        client.upload_file_bytes(name, b"x" * size)
+    first = client.list_files_page(sort="-size", limit=2, fields=["size"])
+    assert [f["size"] for f in first["items"]] == [30, 20]
+    rest = client.list_files_page(sort="-size", limit=2, cursor=first["next_cursor"])
+    assert [f["file_name"] for f in rest["items"]] == ["b.png"]
+    assert rest["next_cursor"] is None
+
+    with pytest.raises(ValueError):
+        client.list_files_page(sort="size", cursor=first["next_cursor"])
+
+
+def test_records_sort_and_filter_by_serialized_size(tmp_path):
+    client = Airalogy(storage_dir=str(tmp_path))
+    ids = {}
+    for name, length in [("medium", 500), ("small", 10), ("large", 2000)]:
+        session = client.start_record_session(protocol_id="size_test")
+        session.set_var("notes", "x" * length)
+        ids[name] = session.save()
+    client.end_record_session()
+
+    page = client.list_records_page(sort="-size", limit=2, fields=["size"])
+    assert [item["id"] for item in page["items"]] == [ids["large"], ids["medium"]]
+    sizes = [item["size"] for item in page["items"]]
+    assert sizes[0] == (tmp_path / "records" / f"{ids['large']}.json").stat().st_size
+    rest = client.list_records_page(sort="-size", limit=2, cursor=page["next_cursor"])
+    assert [item["id"] for item in rest["items"]] == [ids["small"]]
+
+    # Kept up to date on write and when the index is rebuilt from disk
+    client.update_record(ids["small"], {"notes": "x" * 5000})
+    for reader in (client, Airalogy(storage_dir=str(tmp_path))):
+        largest = reader.list_records_page(sort="-size", limit=1)["items"][0]
+        assert largest["record_id"] == ids["small"].split(".")[3]
+        assert reader.query_records({"size": {"$gt": sizes[0]}})["total"] == 1
+
+
+def test_indexes_persist_and_follow_other_writers_incrementally(tmp_path, monkeypatch):
+    writer = Airalogy(storage_dir=str(tmp_path))
+    ids = [writer.create_record({"rank": i})["airalogy_record_id"] for i in range(3)]
+    writer.upload_file_bytes("a.txt", b"a")
+    assert writer.query_records()["total"] == 3
+    assert writer.list_files_page()["total"] == 1
+
+    def no_scan(*args, **kwargs):
+        raise AssertionError("records/ was rescanned")
+
+    # A new process loads the persisted summaries instead of reading every record
+    reader = Airalogy(storage_dir=str(tmp_path))
+    monkeypatch.setattr(reader, "_iter_latest_records", no_scan)
+    monkeypatch.setattr(reader, "list_files", no_scan)
+    assert reader.query_records({"var.rank": {"$gte": 1}})["total"] == 2
+    assert reader.list_files_page()["total"] == 1
+    records, files = reader._record_index, reader._file_index
+
+    # Other writers' changes are applied from the change log, not by rebuilding
+    writer.create_record({"rank": 9})
+    writer.delete_record(ids[0])
+    writer.rename_record(ids[1], "renamed elsewhere")
+    writer.upload_file_bytes("b.txt", b"bb")
+    assert reader.query_records({"var.rank": {"$gte": 1}})["total"] == 3
+    assert reader.query_records({"alias": "renamed elsewhere"})["total"] == 1
+    assert reader.list_files_page(sort="-size")["items"][0]["file_name"] == "b.txt"
+    assert reader._record_index is records and reader._file_index is files
+    assert reader.search_records("renamed")[0]["id"] == ids[1]
+
+    # After another process compacts the log, the snapshot is reloaded (still no scan)
+    writer._record_store.compact_threshold = 2
+    for i in range(3):
+        writer.create_record({"rank": 10 + i})
+    assert reader.query_records({"var.rank": {"$gte": 10}})["total"] == 3
+    assert reader.query_records()["total"] == 6
+
+    # Stores without an index snapshot (older layouts) are scanned once and persisted
+    for path in (tmp_path / "index").glob("records.*"):
+        path.unlink()
+    assert Airalogy(storage_dir=str(tmp_path)).query_records()["total"] == 6
+    assert (tmp_path / "index" / "records.json").exists()
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
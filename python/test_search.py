@@ -0,0 +1,71 @@
+"""Full-text record search tests."""
+
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from airalogy_mock.client import Airalogy
+
+
+def test_search_records_ranks_and_snippets(tmp_path):
+    client = Airalogy(storage_dir=str(tmp_path))
+    session = client.start_record_session(protocol_id="search_test")
+    session.set_var("notes", "Plate B showed contamination after 24h")
+    session.pass_check("sterility", annotation="培养基出现污染，已更换")
+    contaminated = session.save()
+
+    session = client.start_record_session(protocol_id="search_test")
+    session.set_var("notes", "All wells clean")
+    session.save()
+    client.end_record_session()
+
+    results = client.search_records("contamination")
+    assert [r["id"] for r in results] == [contaminated]
+    assert results[0]["snippets"][0]["field"] == "var.notes"
+    assert client.search_records("污染")[0]["snippets"][0]["field"] == "check.sterility"
+
+    # The index persists next to records/ and is kept up to date on write
+    client.rename_record(contaminated, "contaminated run")
+    reopened = Airalogy(storage_dir=str(tmp_path))
+    assert reopened.search_records("contaminated")[0]["alias"] == "contaminated run"
+    reopened.delete_record(contaminated)
+    assert reopened.search_records("contamination") == []
+
+
+def test_search_log_is_compacted_on_write(tmp_path):
+    client = Airalogy(storage_dir=str(tmp_path))
+    client._search_index.compact_threshold = 5
+    log_path = client._search_index._log.path
+    for i in range(12):
+        client.create_record({"notes": f"batch {i}"})
+        # Writers never search; the log still stays bounded
+        assert client._search_index._log.count() < 5
+    assert len(log_path.read_text(encoding="utf-8").splitlines()) < 5
+
+    reopened = Airalogy(storage_dir=str(tmp_path))
+    assert len(reopened.search_records("batch", limit=50)) == 12
+
+
+def test_writes_before_the_first_search_never_drop_existing_records(tmp_path):
+    client = Airalogy(storage_dir=str(tmp_path))
+    old = client.create_record({"notes": "legacy plate"})["airalogy_record_id"]
+    # A store written before the search index existed: records but no snapshot
+    for path in (tmp_path / "index").glob("search.*"):
+        path.unlink()
+
+    writer = Airalogy(storage_dir=str(tmp_path))
+    writer._search_index.compact_threshold = 5
+    for i in range(12):
+        writer.create_record({"notes": f"batch {i}"})
+    assert not (tmp_path / "index" / "search.json").exists()
+
+    reader = Airalogy(storage_dir=str(tmp_path))
+    assert [r["id"] for r in reader.search_records("legacy")] == [old]
+    assert len(reader.search_records("batch", limit=50)) == 12
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,220 @@
+"""HTTP and WebSocket route tests for the mock server (needs fastapi, httpx and the airalogy SDK)."""
+
+import os
+import sys
+import json
+import base64
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="module")
+def server(tmp_path_factory):
+    pytest.importorskip("fastapi")
+    pytest.importorskip("httpx")
+    pytest.importorskip("airalogy")
+    with pytest.MonkeyPatch.context() as mp:
+        # The module-level client reads its storage directory on import
+        mp.setenv("AIRALOGY_STORAGE_DIR", str(tmp_path_factory.mktemp("storage")))
+        mp.delenv("AIRALOGY_WORKERS", raising=False)
+        from airalogy_mock import server
+    return server
+
+
+@pytest.fixture
+def http(server):
+    from fastapi.testclient import TestClient
+
+    with TestClient(server.app) as test_client:
+        yield test_client
+
+
+def _start_session(http, protocol_id):
+    response = http.post("/api/session/start", json={"protocol_id": protocol_id})
+    assert response.status_code == 200
+    return response.json()["session_id"]
+
+
+def test_session_channel_pushes_changes_made_over_http(http):
+    from starlette.websockets import WebSocketDisconnect
+
+    session_id = _start_session(http, "ws_test")
+
+    with http.websocket_connect(f"/ws/session/{session_id}") as ws:
+        snapshot = ws.receive_json()
+        assert snapshot["type"] == "snapshot"
+
+        assert http.post(f"/api/sessions/{session_id}/var", json={"var_id": "culture_temp", "value": 37.5}).status_code == 200
+        event = ws.receive_json()
+        assert event["type"] == "event" and event["op"] == "var"
+        assert event["id"] == "culture_temp" and event["value"] == 37.5
+        assert event["seq"] > snapshot["seq"]
+
+        ws.send_json({"type": "mutate", "id": 1, "ops": [{"op": "var", "id": "operator", "value": "kirk"}]})
+        replies = [ws.receive_json() for _ in range(2)]
+        assert {reply["type"] for reply in replies} == {"event", "ack"}
+
+    assert http.get(f"/api/sessions/{session_id}/var/operator").json()["value"] == "kirk"
+    with pytest.raises(WebSocketDisconnect) as closed:
+        with http.websocket_connect("/ws/session/missing-session") as ws:
+            ws.receive_json()
+    assert closed.value.code == 4404
+
+
+class _FakeAssigner:
+    """od_mean <- od, report <- od_mean; ic50 always fails"""
+
+    deps = {"report": ["od_mean"], "od_mean": ["od"], "ic50": ["od"]}
+
+    @classmethod
+    def all_assigned_fields(cls):
+        return {field: {"mode": "auto"} for field in cls.deps}
+
+    @classmethod
+    def get_dependent_fields_of_assigned_key(cls, field):
+        return cls.deps[field]
+
+    @staticmethod
+    def assign(field, data):
+        if field == "ic50":
+            return SimpleNamespace(success=False, assigned_fields=None, error_message="fit did not converge")
+        if field == "od_mean":
+            return SimpleNamespace(success=True, assigned_fields={"od_mean": sum(data["od"]) / len(data["od"])})
+        return SimpleNamespace(success=True, assigned_fields={"report": f"mean={data['od_mean']}"})
+
+
+def _parse_sse(text):
+    events = []
+    for block in text.split("\n\n"):
+        if not block:
+            continue
+        fields = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((int(fields["id"]), fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def test_assign_all_stream_emits_framed_server_sent_events(http, server, monkeypatch):
+    monkeypatch.setattr(server, "DefaultAssigner", _FakeAssigner)
+
+    response = http.post("/api/assigner/assign-all/stream", json={"data": {"od": [0.5, 0.7]}})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.headers["cache-control"] == "no-cache"
+    assert response.text.endswith("\n\n")
+
+    events = _parse_sse(response.text)
+    assert [event_id for event_id, _, _ in events] == [1, 2, 3, 4]
+    by_field = {data["field"]: (name, data) for _, name, data in events[:-1]}
+    assert by_field["od_mean"][0] == "assigned"
+    assert by_field["od_mean"][1]["assigned_fields"] == {"od_mean": 0.6}
+    assert by_field["ic50"][0] == "failed" and "fit did not converge" in by_field["ic50"][1]["error"]
+    # report depends on od_mean, so it is streamed after it
+    assert list(by_field).index("report") > list(by_field).index("od_mean")
+
+    _, name, done = events[-1]
+    assert name == "done"
+    assert (done["succeeded"], done["failed"]) == (2, 1)
+    assert done["data"]["report"] == "mean=0.6"
+
+
+def test_atomic_batch_rolls_back_when_an_upload_fails(http, server, monkeypatch):
+    session_id = _start_session(http, "batch_test")
+    image = base64.b64encode(b"\x89PNG").decode()
+    operations = [
+        {"op": "vars", "value": {"od_1": 0.41}},
+        {"op": "upload", "var_id": "plate_image", "file_name": "plate.png", "file_base64": image},
+        {"op": "upload", "var_id": "gel_image", "file_name": "gel.png", "file_base64": image},
+        {"op": "step", "id": "read_plate", "checked": True},
+    ]
+    files_before = {item["id"] for item in http.get("/api/files").json()}
+
+    upload = server.client.upload_file_bytes
+    calls = []
+
+    def flaky_upload(file_name, content):
+        calls.append(file_name)
+        if len(calls) == 2:
+            raise OSError("disk full")
+        return upload(file_name, content)
+
+    monkeypatch.setattr(server.client, "upload_file_bytes", flaky_upload)
+    response = http.post("/api/batch", json={"session_id": session_id, "operations": operations, "atomic": True, "save": True})
+    assert response.status_code == 200
+    report = response.json()
+    assert not report["success"] and report["applied"] == 0
+    assert "disk full" in report["error"]
+    assert [r["status"] for r in report["results"]] == ["skipped"] * 4
+    assert report["record_id"] is None
+
+    # The first upload was removed and the session is untouched
+    assert {item["id"] for item in http.get("/api/files").json()} == files_before
+    assert http.get(f"/api/sessions/{session_id}/vars").json() == {}
+
+    monkeypatch.setattr(server.client, "upload_file_bytes", upload)
+    report = http.post("/api/batch", json={"session_id": session_id, "operations": operations, "atomic": True}).json()
+    assert report["success"] and report["applied"] == 4
+    assert http.get(f"/api/sessions/{session_id}/vars").json()["od_1"] == 0.41
+
+
+def _metric(text, name, **labels):
+    """Value of one sample in Prometheus text format (0 when absent)"""
+    wanted = ",".join(f'{key}="{value}"' for key, value in labels.items())
+    for line in text.splitlines():
+        if line.startswith(f"{name}{{{wanted}}} "):
+            return float(line.rsplit(" ", 1)[1])
+    return 0.0
+
+
+def test_metrics_label_requests_by_route_template(http):
+    route = "/api/records/{record_id}"
+    before = http.get("/metrics").text
+    record_id = http.post("/api/records", json={"data": {"x": 1}}).json()["airalogy_record_id"]
+    for _ in range(2):
+        assert http.get(f"/api/records/{record_id}").status_code == 200
+    assert http.get("/api/no-such-route").status_code == 404
+
+    response = http.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    text = response.text
+    requests = "airalogy_http_requests_total"
+    assert _metric(text, requests, method="GET", route=route, status="200") - _metric(before, requests, method="GET", route=route, status="200") == 2
+    assert _metric(text, requests, method="GET", route="unmatched", status="404") >= 1
+    assert _metric(text, "airalogy_http_request_duration_seconds_count", method="GET", route=route) >= 2
+    assert _metric(text, "airalogy_http_response_body_bytes_total", route=route) > 0
+    # Raw paths never become label values
+    assert record_id not in text
+    assert "/api/no-such-route" not in text
+
+
+def test_tracing_names_spans_by_route_template(http, server, monkeypatch, tmp_path):
+    trace_file = tmp_path / "traces.jsonl"
+    monkeypatch.setattr(server.tracer, "path", str(trace_file))
+    monkeypatch.setattr(server.tracer, "sample_rate", 0.0)
+    record_id = http.post("/api/records", json={"data": {"x": 1}}).json()["airalogy_record_id"]
+    assert not trace_file.exists()
+
+    response = http.get(f"/api/records/{record_id}", headers={"X-Airalogy-Trace": "1"})
+    trace_id = response.headers["x-trace-id"]
+    events = [json.loads(line) for line in trace_file.read_text().splitlines()]
+    assert {event["args"]["trace_id"] for event in events} == {trace_id}
+    spans = {event["name"]: event for event in events}
+
+    root = spans["GET /api/records/{record_id}"]
+    assert root["cat"] == "http" and root["args"]["parent_id"] is None
+    assert root["args"]["status"] == 200 and root["args"]["path"].endswith(record_id)
+    # http -> route -> endpoint -> storage call in the I/O pool
+    route = spans["route /api/records/{record_id}"]
+    endpoint = spans["get_record"]
+    storage = spans["Airalogy.get_record"]
+    assert route["args"]["parent_id"] == root["args"]["span_id"]
+    assert endpoint["args"]["parent_id"] == route["args"]["span_id"]
+    assert storage["args"]["parent_id"] == endpoint["args"]["span_id"]
+    assert not any(record_id in event["name"] for event in events)
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
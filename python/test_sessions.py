@@ -0,0 +1,142 @@
+"""Record session management tests: concurrent sessions, events, batches, sharing."""
+
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from airalogy_mock.client import Airalogy
+
+
+def test_concurrent_sessions_are_isolated_and_evicted(tmp_path):
+    client = Airalogy(storage_dir=str(tmp_path), max_sessions=2)
+    active = client.start_record_session(protocol_id="multi_session")
+    first = client.start_record_session(protocol_id="multi_session", activate=False)
+    second = client.start_record_session(protocol_id="multi_session", activate=False)
+    assert client.get_active_session() is active
+
+    client.get_session(first.session_id).set_var("sample", "A")
+    client.get_session(second.session_id).set_var("sample", "B")
+    active.set_var("sample", "main")
+
+    # Only one background session fits: the least recently used one is flushed and dropped
+    in_memory = {s["session_id"] for s in client.list_sessions()}
+    assert in_memory == {active.session_id, second.session_id}
+    assert client.get_record(first.airalogy_record_id)["data"]["var"]["sample"] == "A"
+
+    # Evicted sessions rehydrate from disk on next access
+    restored = client.get_session(first.session_id)
+    assert restored is not first
+    assert restored.get_var("sample") == "A"
+    assert client.get_session(second.session_id).get_var("sample") == "B"
+    assert active.get_var("sample") == "main"
+
+    client.end_record_session(session_id=second.session_id)
+    assert client.get_record(second.airalogy_record_id)["data"]["var"]["sample"] == "B"
+    assert client.get_active_session() is active
+    with pytest.raises(FileNotFoundError):
+        client.get_session("00000000-0000-0000-0000-000000000000")
+
+
+def test_session_events_support_batches_and_resume(tmp_path):
+    client = Airalogy(storage_dir=str(tmp_path), max_sessions=1)
+    session = client.start_record_session(protocol_id="live", activate=False)
+    received = []
+    unsubscribe = session.events.subscribe(received.append)
+    start = session.events.seq
+
+    seq = session.apply_ops([
+        {"op": "var", "id": "temp", "value": 37.0},
+        {"op": "step", "id": "step_1", "checked": True},
+        {"op": "check", "id": "check_1", "checked": False, "annotation": "low"},
+    ])
+    assert seq == start + 3
+    assert [(e["op"], e.get("id")) for e in received] == [("var", "temp"), ("step", "step_1"), ("check", "check_1")]
+    with pytest.raises(ValueError):
+        session.apply_ops([{"op": "var", "id": "ok", "value": 1}, {"op": "check", "id": "c"}])
+    assert session.get_var("ok") is None
+
+    # Resume from a sequence number, or fall back to a snapshot on epoch mismatch
+    assert [e["seq"] for e in session.events.since(start + 1, session.events.epoch)] == [start + 2, start + 3]
+    assert session.events.since(start + 3) == []
+    assert session.events.since(start, "another-epoch") is None
+    assert session.snapshot()["record"]["data"]["var"]["temp"] == 37.0
+
+    # Sessions with live subscribers are not evicted
+    client.start_record_session(protocol_id="live", activate=False)
+    assert session.session_id in {s["session_id"] for s in client.list_sessions()}
+
+    client.end_record_session(session_id=session.session_id)
+    assert [e["op"] for e in received[-2:]] == ["saved", "ended"]
+    unsubscribe()
+    assert session.events.subscribers == 0
+
+
+def test_batch_is_all_or_nothing_when_atomic(tmp_path):
+    import base64
+
+    client = Airalogy(storage_dir=str(tmp_path))
+    session = client.start_record_session(protocol_id="batch")
+    image = base64.b64encode(b"\x89PNG").decode()
+    operations = [
+        {"op": "vars", "value": {"od_1": 0.41, "od_2": 0.39}},
+        {"op": "upload", "var_id": "plate_image", "file_name": "plate.png", "file_base64": image},
+        {"op": "step", "id": "read_plate", "checked": True},
+        {"op": "check", "id": "blank_ok"},
+    ]
+
+    report = client.apply_batch(operations, atomic=True)
+    assert not report["success"]
+    assert [r["status"] for r in report["results"]] == ["skipped", "skipped", "skipped", "error"]
+    assert session.get_all_vars() == {}
+    assert client.list_files() == []
+
+    operations[-1]["checked"] = True
+    report = client.apply_batch(operations, atomic=True, save=True)
+    assert report["success"] and report["applied"] == 4
+    saved = client.get_record(report["record_id"])
+    assert saved["data"]["var"]["plate_image"] == report["results"][1]["file_id"]
+    assert saved["data"]["check"]["blank_ok"]["checked"] is True
+
+    # Without atomic, valid operations apply and failures are reported per item
+    report = client.apply_batch([{"op": "var", "id": "od_1", "value": 0.5}, {"op": "nope"}])
+    assert [r["status"] for r in report["results"]] == ["ok", "error"]
+    assert session.get_var("od_1") == 0.5
+
+
+def test_shared_sessions_follow_other_workers(tmp_path):
+    worker_a = Airalogy(storage_dir=str(tmp_path), shared_sessions=True, autosave_interval=0)
+    worker_b = Airalogy(storage_dir=str(tmp_path), shared_sessions=True, autosave_interval=0)
+    session_a = worker_a.start_record_session(protocol_id="shared")
+    session_b = worker_b.get_active_session()
+    assert session_b.session_id == session_a.session_id
+    received = []
+    session_b.events.subscribe(received.append)
+
+    # Unsaved edits are picked up from the journal tail
+    session_a.set_var("temp", 37.0)
+    session_b.set_var("ph", 7.4)
+    assert worker_b.get_session(session_a.session_id).get_var("temp") == 37.0
+    assert worker_a.get_session(session_a.session_id).get_var("ph") == 7.4
+    assert [e["op"] for e in received] == ["var", "var"]
+
+    # A save elsewhere reloads the same object; nothing is lost when saving back
+    session_a.save()
+    session_b.set_var("note", "ok")
+    assert [e["op"] for e in received][-2:] == ["reloaded", "var"]
+    record = worker_a.get_record(session_b.save())
+    assert record["data"]["var"] == {"temp": 37.0, "ph": 7.4, "note": "ok"}
+
+    # Discarded edits and session switches propagate too
+    session_a.set_var("draft", 1)
+    worker_a.end_record_session(save=False)
+    assert worker_b.get_session(session_a.session_id).get_var("draft") is None
+    assert worker_b.get_active_session() is None
+    other = worker_a.start_record_session(protocol_id="shared")
+    assert worker_b.get_active_session().session_id == other.session_id
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
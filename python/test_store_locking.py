@@ -0,0 +1,47 @@
+"""Multi-process store locking tests."""
+
+import multiprocessing
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from airalogy_mock.client import Airalogy
+
+
+def _bump_counter(storage_dir, record_uuid, times):
+    client = Airalogy(storage_dir=storage_dir)
+    for _ in range(times):
+        head = client._head_version(record_uuid)
+        client.update_record(f"airalogy.id.record.{record_uuid}.v.{head}", {"touched": True})
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="needs fork")
+def test_concurrent_writers_share_store(tmp_path):
+    client = Airalogy(storage_dir=str(tmp_path))
+    session = client.start_record_session(protocol_id="lock_test")
+    session.save()
+    client.end_record_session()
+    assert client.query_records()["total"] == 1
+
+    ctx = multiprocessing.get_context("fork")
+    workers = [ctx.Process(target=_bump_counter, args=(str(tmp_path), session._record_uuid, 5)) for _ in range(3)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    # Every update got its own version: no lost writes between processes
+    assert len(client.list_record_versions(session.airalogy_record_id)) == 16
+
+    # The generation counter tells this process its cached index is stale
+    assert client.query_records()["items"][0]["version"] == 16
+    other = Airalogy(storage_dir=str(tmp_path))
+    other.start_record_session(protocol_id="lock_test").save()
+    assert client.query_records()["total"] == 2
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
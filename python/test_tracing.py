@@ -0,0 +1,45 @@
+"""Request tracing tests."""
+
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def test_tracing_nests_spans_across_threads(tmp_path):
+    import contextvars
+    import threading
+    from airalogy_mock.tracing import Tracer, span, to_chrome_trace
+
+    path = tmp_path / "traces.jsonl"
+    assert span("outside a trace").span_id is None
+    with Tracer(str(path), sample_rate=0.0).trace("GET /unsampled"):
+        with span("ignored"):
+            pass
+    assert not path.exists()
+
+    tracer = Tracer(str(path), sample_rate=0.0)
+    with tracer.trace("POST /api/assigner/assign", force=True) as root:
+        with span("assign_field", "endpoint") as endpoint:
+            def work():
+                with span("Airalogy.get_record", "storage", record_id="r1"):
+                    pass
+            worker = threading.Thread(target=contextvars.copy_context().run, args=(work,))
+            worker.start()
+            worker.join()
+
+    events = {e["name"]: e for e in to_chrome_trace(path.read_text().splitlines())["traceEvents"]}
+    assert set(events) == {"POST /api/assigner/assign", "assign_field", "Airalogy.get_record"}
+    storage = events["Airalogy.get_record"]
+    assert storage["ph"] == "X" and storage["cat"] == "storage"
+    assert storage["args"]["parent_id"] == endpoint.span_id
+    assert storage["args"]["record_id"] == "r1"
+    assert events["assign_field"]["args"]["parent_id"] == root.span_id
+    assert {e["args"]["trace_id"] for e in events.values()} == {root.trace_id}
+    assert storage["tid"] != events["assign_field"]["tid"]
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
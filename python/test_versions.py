@@ -0,0 +1,104 @@
+"""Delta-compressed version history tests."""
+
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from airalogy_mock.client import Airalogy
+
+
+def test_version_history_is_delta_compressed(tmp_path):
+    client = Airalogy(storage_dir=str(tmp_path), snapshot_interval=3)
+    session = client.start_record_session(protocol_id="history_test")
+    session.set_var("table", [{"row": i} for i in range(50)])
+    record_id = session.save()
+    client.end_record_session()
+
+    ids = [record_id]
+    for i in range(6):
+        ids.append(client.update_record(ids[-1], {"counter": i})["airalogy_record_id"])
+
+    # Only the head stays in records/; older versions are snapshots or patches
+    assert len(list(client.records_dir.glob("*.json"))) == 1
+    kinds = client._versions.versions(session._record_uuid)
+    assert kinds == {1: "delta", 2: "delta", 3: "snapshot", 4: "delta", 5: "delta", 6: "snapshot"}
+    assert client.list_record_versions(ids[-1]) == ids
+
+    for version, rid in enumerate(ids, start=1):
+        record = client.get_record(rid)
+        assert record["record_version"] == version
+        assert record["data"]["var"].get("counter") == (version - 2 if version > 1 else None)
+        assert len(record["data"]["var"]["table"]) == 50
+
+    listed = client.list_records()
+    assert len(listed) == 1
+    assert listed[0]["id"] == ids[-1]
+    assert listed[0]["version_count"] == 7
+
+    assert client.purge_record(ids[-1])
+    assert client.list_records() == []
+    assert client.list_record_versions(ids[-1]) == []
+
+
+
+def test_older_versions_survive_in_place_head_rewrites(tmp_path):
+    client = Airalogy(storage_dir=str(tmp_path))
+    session = client.start_record_session(protocol_id="history_test")
+    session.set_vars({"b": "orig", "keep": 1})
+    v1 = session.save()
+    client.end_record_session()
+    v2 = client.update_record(v1, {"keep": 2})["airalogy_record_id"]
+
+    # A session saving the head rewrites v2 in place; v1 must not pick up the edit
+    session = client.load_record_session(v2)
+    session.set_var("b", "edited-in-v2")
+    assert session.save() == v2
+    client.rename_record(v2, "renamed")
+
+    assert client.get_record(v1)["data"]["var"] == {"b": "orig", "keep": 1}
+    assert client.get_record(v1).get("alias") is None
+    assert client.get_record(v2)["data"]["var"]["b"] == "edited-in-v2"
+    v3 = client.update_record(v2, {"b": "v3"})["airalogy_record_id"]
+    assert client.get_record(v1)["data"]["var"]["b"] == "orig"
+    assert client.get_record(v2)["data"]["var"]["b"] == "edited-in-v2"
+    assert client.get_record(v3)["data"]["var"]["b"] == "v3"
+
+
+def test_single_versions_can_be_deleted_and_renamed(tmp_path):
+    client = Airalogy(storage_dir=str(tmp_path), snapshot_interval=3)
+    ids = [client.create_record({"n": 0})["airalogy_record_id"]]
+    for i in range(1, 6):
+        ids.append(client.update_record(ids[-1], {"n": i})["airalogy_record_id"])
+    expected = {rid: client.get_record(rid) for rid in ids}
+
+    # Deleting a historical version rebases its older neighbour onto the next one
+    assert client.delete_record(ids[1]) and client.delete_record(ids[3])
+    assert not client.delete_record(ids[3])
+    remaining = [ids[0], ids[2], ids[4], ids[5]]
+    assert client.list_record_versions(ids[-1]) == remaining
+    assert [client.get_record(rid) for rid in remaining] == [expected[rid] for rid in remaining]
+
+    # Renaming a historical version touches only that version
+    assert client.rename_record(ids[2], "third")
+    assert client.get_record(ids[2])["alias"] == "third"
+    assert client.get_record(ids[2])["data"] == expected[ids[2]]["data"]
+    assert [client.get_record(rid).get("alias") for rid in (ids[0], ids[4], ids[5])] == [None, None, None]
+
+    # Deleting the head promotes the previous version
+    assert client.delete_record(ids[5])
+    assert client.list_record_versions(ids[4]) == [ids[0], ids[2], ids[4]]
+    assert client.get_record(ids[4]) == expected[ids[4]]
+    assert client.get_record(ids[0]) == expected[ids[0]]
+    assert client.query_records()["items"][0]["id"] == ids[4]
+    assert client.query_records()["items"][0]["version_count"] == 3
+
+    assert client.purge_record(ids[0])
+    assert client.list_record_versions(ids[4]) == []
+    assert client.query_records()["total"] == 0
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))